@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from benchmarks.synthetic import generate_history
+from src.analytics import _analyze_period
+from src.load import IncrementalGoldLoader, save_to_gold
+from src.llm_summary import gerar_prompt, select_llm_currencies
+from src.prompt_context import HistoryContext
+from src.rolling import RollingMetrics
+from src.shared_history import SharedHistory, build_shared_history
+from src.transformation import transform_to_silver
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Um caso é regressão se a mediana passar de `tolerance` vezes a da baseline
+DEFAULT_TOLERANCE = 1.5
+# Diferença absoluta mínima (s) para contar como regressão: em casos de poucos
+# milissegundos, o rácio das medianas é dominado pelo ruído da máquina
+DEFAULT_MIN_DELTA_S = 0.005
+
+
+def scenario_key(years, currencies, targets=None, full_universe=False):
+    key = f"{years:g}y_{currencies}c"
+    if targets:
+        key += f"_{targets}t"
+    return key + ("_full" if full_universe else "")
+
+
+def _measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "repeat": repeat}
+
+
+def _prepare(workdir, years, currencies, seed, targets=None, full_universe=False):
+    """Gera o histórico sintético, ou reutiliza-o se `workdir` já tiver o mesmo cenário."""
+    marker = os.path.join(workdir, ".scenario.json")
+    scenario = {"years": years, "currencies": currencies, "seed": seed}
+    if targets or full_universe:
+        scenario.update(targets=targets, full_universe=full_universe)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == scenario:
+                with open(os.path.join(workdir, ".dates.json")) as f:
+                    return json.load(f)
+    dates = generate_history(
+        workdir, years=years, currencies=currencies, seed=seed, targets=targets, full_universe=full_universe
+    )
+    with open(os.path.join(workdir, ".dates.json"), "w") as f:
+        json.dump(dates, f)
+    with open(marker, "w") as f:
+        json.dump(scenario, f)
+    return dates
+
+
+def run_benchmarks(years=1, currencies=6, repeat=5, seed=0, workdir=None, targets=None, full_universe=False):
+    """
+    Mede os caminhos críticos do pipeline e do dashboard sobre um histórico
+    sintético de `years` anos e `currencies` moedas na camada raw, das quais
+    `targets` são moedas-alvo (todas, por defeito). Com `full_universe=True`,
+    a silver e a gold guardam todas as moedas. Devolve um dicionário
+    {caso: {"median_s", "min_s", "repeat"}}.
+    """
+    cleanup = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="cambio-bench-")
+    cwd = os.getcwd()
+    try:
+        dates = _prepare(workdir, years, currencies, seed, targets, full_universe)
+        os.chdir(workdir)
+        last = dates[-1]
+        start = (pd.Timestamp(last) - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        results = {}
+        # Camadas do pipeline para o dia mais recente, como na execução diária
+        results["transform_to_silver"] = _measure(lambda: transform_to_silver(last), repeat)
+        results["save_to_gold"] = _measure(lambda: save_to_gold(last), repeat)
+
+        # Dashboard: carga do histórico (a frio e com partições já lidas) e métricas do período
+        results["load_gold_data_cold"] = _measure(lambda: IncrementalGoldLoader().load(), repeat)
+        loader = IncrementalGoldLoader()
+        df_history = loader.load()
+        results["load_gold_data_warm"] = _measure(loader.load, repeat)
+        # Dashboard: abertura do histórico partilhado, mapeado em memória
+        build_shared_history()
+        results["shared_history_open"] = _measure(SharedHistory, repeat)
+        results["period_metrics_build"] = _measure(lambda: RollingMetrics(df_history), repeat)
+        metrics = RollingMetrics(df_history)
+        selected = metrics.currencies[:3]
+        results["period_metrics_window"] = _measure(lambda: metrics.window(start, last, selected), repeat)
+        # Análise completa do dashboard, sem a memoização
+        start_day, last_day = pd.Timestamp(start).date(), pd.Timestamp(last).date()
+        results["analyze_period"] = _measure(
+            lambda: _analyze_period(metrics, start_day, last_day, tuple(selected)), repeat
+        )
+
+        # Resumo LLM: contexto histórico (uma vez por lote) e prompt de cada data,
+        # só com as moedas-alvo, como em `load_history_context` e `load_gold_data`
+        df_llm = select_llm_currencies(df_history)
+        results["history_context_build"] = _measure(lambda: HistoryContext(df_llm), repeat)
+        context = HistoryContext(df_llm)
+        df_gold = select_llm_currencies(pd.read_parquet(os.path.join("gold", f"{last}.parquet")))
+        results["gerar_prompt"] = _measure(
+            lambda: gerar_prompt(df_gold, last, top_n=5, context=context.for_date(last)), repeat
+        )
+        return results
+    finally:
+        os.chdir(cwd)
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA_S):
+    """
+    Devolve [(caso, atual, baseline, rácio)] dos casos mais lentos que
+    `tolerance` × baseline e, em valor absoluto, mais de `min_delta` segundos.
+    """
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get(case)
+        if reference:
+            ratio = result["median_s"] / reference
+            if ratio > tolerance and result["median_s"] - reference > min_delta:
+                regressions.append((case, result["median_s"], reference, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline e do dashboard sobre dados sintéticos")
+    parser.add_argument("--years", type=float, default=1, help="Anos de histórico (ex.: 1 a 20)")
+    parser.add_argument("--currencies", type=int, default=6, help="Número de moedas na camada raw (ex.: 6 a 160)")
+    parser.add_argument("--targets", type=int, help="Número de moedas-alvo (por defeito, todas)")
+    parser.add_argument("--full-universe", action="store_true", help="Silver e gold com todas as moedas, não só as moedas-alvo")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições de cada caso")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Diretório dos dados sintéticos, reutilizado entre execuções")
+    parser.add_argument("--output", help="Ficheiro JSON onde gravar os resultados")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Ficheiro da baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como baseline do cenário")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_S * 1000,
+                        help="Diferença mínima (ms) face à baseline para contar como regressão")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    key = scenario_key(args.years, args.currencies, args.targets, args.full_universe)
+    results = run_benchmarks(
+        args.years, args.currencies, args.repeat, args.seed, args.workdir, args.targets, args.full_universe
+    )
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(key, {})
+
+    print(f"Cenário {key} ({args.repeat} repetições)")
+    for case, result in results.items():
+        reference = baseline.get(case)
+        versus = f"  ({result['median_s'] / reference:.2f}x baseline)" if reference else ""
+        print(f"  {case:<24} {result['median_s'] * 1000:10.2f} ms{versus}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "scenario": {
+                    "years": args.years, "currencies": args.currencies, "seed": args.seed,
+                    "targets": args.targets, "full_universe": args.full_universe,
+                },
+                "python": platform.python_version(),
+                "results": results,
+            }, f, indent=2)
+
+    if args.save_baseline:
+        baselines[key] = {case: round(result["median_s"], 6) for case, result in results.items()}
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline de {key} gravada em {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+    for case, current, reference, ratio in regressions:
+        print(f"REGRESSÃO: {case} demorou {current * 1000:.2f} ms ({ratio:.2f}x a baseline de {reference * 1000:.2f} ms)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
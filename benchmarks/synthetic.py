@@ -0,0 +1,112 @@
+import os
+import json
+import string
+import itertools
+import numpy as np
+import pandas as pd
+from src.raw_store import record_path_for, write_raw_record
+from src.load import DEFAULT_WINDOWS, rebuild_gold_history
+from src.transformation import transform_many
+from src.utils import ensure_dir
+
+BASE_CURRENCY = "BRL"
+# As primeiras moedas são as do config.yaml; as restantes recebem códigos sintéticos
+KNOWN_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "AUD", "LBP"]
+END_DATE = "2025-09-17"
+
+
+def currency_codes(n):
+    """`n` códigos de moeda: as moedas conhecidas seguidas de códigos de três letras."""
+    synthetic = (
+        "".join(letters) for letters in itertools.product(string.ascii_uppercase, repeat=3)
+        if "".join(letters) not in KNOWN_CURRENCIES + [BASE_CURRENCY]
+    )
+    return (KNOWN_CURRENCIES + list(itertools.islice(synthetic, max(n - len(KNOWN_CURRENCIES), 0))))[:n]
+
+
+def synthetic_rates(years, currencies, seed=0, missing_day_prob=0.01):
+    """
+    Matriz data × moeda de cotações em passeio aleatório geométrico, com
+    níveis entre 1e-3 e 2e4 (como o LBP) e alguns dias sem dados da API.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=END_DATE, periods=max(int(round(365 * years)), 2), freq="D")
+    levels = 10 ** rng.uniform(-3, 4.3, size=len(currencies))
+    log_returns = rng.normal(0, 0.005, size=(len(dates), len(currencies)))
+    rates = levels * np.exp(np.cumsum(log_returns, axis=0))
+    keep = rng.random(len(dates)) >= missing_day_prob
+    keep[-1] = True
+    return pd.DataFrame(rates[keep], index=dates[keep], columns=currencies)
+
+
+def write_raw(rates):
+    """Grava cada dia na camada raw (JSON da API e registo colunar)."""
+    ensure_dir("raw")
+    for day, row in rates.iterrows():
+        date = day.strftime("%Y-%m-%d")
+        data = {
+            "result": "success",
+            "base_code": BASE_CURRENCY,
+            "time_last_update_unix": int(day.timestamp()),
+            "conversion_rates": {BASE_CURRENCY: 1, **row.to_dict()},
+        }
+        path = os.path.join("raw", f"{date}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        write_raw_record(data, record_path_for(path), date)
+
+
+def write_gold(rates, windows=DEFAULT_WINDOWS):
+    """
+    Grava a camada gold com o mesmo esquema de `save_to_gold` (variação
+    diária face à observação anterior e variações/volatilidades por janela),
+    calculada de uma só vez sobre todo o histórico, e reconstrói o histórico
+    consolidado.
+    """
+    ensure_dir("gold")
+    calendar = rates.reindex(pd.date_range(rates.index.min(), rates.index.max(), freq="D"))
+    filled = calendar.ffill()
+    columns = {"daily_change_pct": (rates / rates.shift(1) - 1) * 100}
+    for window in windows:
+        columns[f"change_{window}d_pct"] = ((filled / filled.shift(window) - 1) * 100).reindex(rates.index)
+        columns[f"volatility_{window}d"] = calendar.rolling(window, min_periods=2).std().reindex(rates.index)
+
+    for position, day in enumerate(rates.index):
+        df = pd.DataFrame({
+            "base_currency": BASE_CURRENCY,
+            "currency": rates.columns,
+            "rate": rates.iloc[position].to_numpy(),
+            "timestamp": int(day.timestamp()),
+        })
+        for name, values in columns.items():
+            df[name] = values.iloc[position].to_numpy()
+        df["daily_change_pct"] = df["daily_change_pct"].fillna(0.0)
+        df.to_parquet(os.path.join("gold", f"{day:%Y-%m-%d}.parquet"), index=False)
+    rebuild_gold_history()
+
+
+def generate_history(workdir, years=1, currencies=6, seed=0, targets=None, full_universe=False):
+    """
+    Gera em `workdir` um histórico sintético completo (config.yaml, raw,
+    silver e gold) com `years` anos e `currencies` moedas na camada raw.
+    As moedas-alvo são as `targets` primeiras (todas, por defeito); com
+    `full_universe=True`, a silver e a gold guardam todas as moedas, como com
+    `full_universe: true` no config.yaml. Devolve a lista ordenada de datas geradas.
+    """
+    codes = currency_codes(currencies)
+    target_codes = codes[:targets] if targets else codes
+    rates = synthetic_rates(years, codes, seed=seed)
+    cwd = os.getcwd()
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    try:
+        with open("config.yaml", "w") as f:
+            f.write(f"base_currency: {BASE_CURRENCY}\ntarget_currencies: [{', '.join(target_codes)}]\n")
+            f.write(f"full_universe: {'true' if full_universe else 'false'}\n")
+        dates = [day.strftime("%Y-%m-%d") for day in rates.index]
+        write_raw(rates)
+        transform_many(dates)
+        write_gold(rates if full_universe else rates[target_codes])
+    finally:
+        os.chdir(cwd)
+    return dates
@@ -1,12 +1,27 @@
 import streamlit as st
 import pandas as pd
 import os
-import glob
-import numpy as np
+import sys
 from datetime import datetime, timedelta, date
 import altair as alt
 import openai
 
+# Permite importar os módulos de src/ ao executar `streamlit run dashboard/app.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.shared_history import SharedHistory, history_version
+from src.utils import load_config
+from src.rolling import RollingMetrics
+from src.analytics import (
+    POSITION_COLUMN, RISK_COLUMN, STATUS_COLUMN, STATUS_GAIN, STATUS_LOSS, analyze_period,
+)
+from src.llm_cache import get_llm_cache, stream_in_background
+from src.report_index import index_path, load_report_index, read_report
+from src.report_archive import search_reports, sync_archive
+from src.insights import (
+    INSIGHT_MAX_TOKENS, INSIGHT_MODEL, INSIGHT_SYSTEM_MESSAGE, INSIGHT_TEMPERATURE,
+    build_insight_prompt, find_insight, insights_path, load_insights,
+)
+
 # --- Configuração da Página ---
 st.set_page_config(
     page_title="Dashboard de Contexto Cambial",
@@ -17,43 +32,77 @@ st.set_page_config(
 
 # --- Funções de Ajuda e Carregamento de Dados ---
 
-@st.cache_data
-def load_gold_data() -> pd.DataFrame:
-    """Carrega e consolida todos os arquivos Parquet da pasta 'gold/'."""
-    gold_dir = "gold/"
-    if not os.path.exists(gold_dir): return pd.DataFrame()
-
-    all_files = sorted(glob.glob(os.path.join(gold_dir, "*.parquet")))
-    if not all_files: return pd.DataFrame()
-
-    df_list = []
-    for file in all_files:
-        try:
-            df = pd.read_parquet(file)
-            date_str = os.path.basename(file).split('.')[0]
-            df['date'] = pd.to_datetime(date_str).date()
-            df_list.append(df)
-        except Exception as e:
-            st.error(f"Erro ao ler o arquivo {file}: {e}")
-            
-    if not df_list: return pd.DataFrame()
-
-    full_df = pd.concat(df_list, ignore_index=True)
-    full_df['rate'] = pd.to_numeric(full_df['rate'], errors='coerce')
-    return full_df.sort_values(by="date")
-
-def get_all_report_files(report_dir="reports"):
-    """Encontra e ordena todos os caminhos dos arquivos de relatório (.txt)."""
-    search_path = os.path.join(report_dir, "*.txt")
-    list_of_files = glob.glob(search_path)
-    if not list_of_files: return []
-    list_of_files.sort(key=os.path.getmtime, reverse=True)
-    return [os.path.basename(f) for f in list_of_files]
-
-@st.cache_data
-def get_llm_actionable_insight(currency, delta, volatility, avg_volatility):
+@st.cache_resource(max_entries=1)
+def get_shared_history(version) -> SharedHistory:
+    """
+    Histórico da gold mapeado em memória a partir de gold/history.arrow,
+    partilhado por todas as sessões (e, pela cache de páginas, por todos os
+    processos do dashboard). O ficheiro é gerado pelo pipeline a cada
+    gravação da gold; o dashboard só o abre, de novo apenas quando muda.
+    """
+    return SharedHistory() if version is not None else None
+
+def load_gold_data() -> SharedHistory:
     """
-    Chama a API da OpenAI para gerar uma recomendação de ação baseada nos dados.
+    Devolve o histórico da camada gold, só de leitura, ou None se ainda não
+    existir. A cada execução do script apenas se consulta o mtime do ficheiro.
+    """
+    try:
+        return get_shared_history(history_version())
+    except Exception as e:
+        st.error(f"Erro ao ler os dados da camada gold: {e}")
+        return None
+
+@st.cache_resource(max_entries=1)
+def get_rolling_metrics(_df: pd.DataFrame, version: int) -> RollingMetrics:
+    """Matriz data × moeda com somas acumuladas, reconstruída só quando a gold muda."""
+    return RollingMetrics(_df)
+
+@st.cache_data(max_entries=1)
+def get_report_index(mtime):
+    """
+    Entradas de reports/index.json (mais recentes primeiro), mantido pela
+    etapa de resumos. Relido só quando o índice muda.
+    """
+    return load_report_index()
+
+def report_index_mtime():
+    """Versão de reports/index.json (mtime), ou None se ainda não existir."""
+    path = index_path()
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+@st.cache_resource(max_entries=1)
+def sync_report_archive(mtime):
+    """
+    Acrescenta ao arquivo SQLite os relatórios novos do índice, uma só vez
+    por versão de reports/index.json (e não a cada pesquisa).
+    """
+    return sync_archive()
+
+@st.cache_data(max_entries=32)
+def get_precomputed_insights(date_str, base_currency, mtime):
+    """Insights pré-calculados pelo pipeline para a data; relidos só quando o ficheiro muda."""
+    return load_insights(date_str, base_currency)
+
+def lookup_precomputed_insight(start_date, end_date, currency, base_currency, prompt):
+    """
+    Recomendação pré-calculada para um período padrão (7/30/90 dias até ao
+    último dia), ou None. Só é usada se tiver sido gerada para o mesmo
+    `prompt`, ou seja, com a mesma volatilidade média das moedas selecionadas.
+    """
+    date_str = end_date.strftime("%Y-%m-%d")
+    path = insights_path(date_str, base_currency)
+    if not os.path.exists(path):
+        return None
+    insights = get_precomputed_insights(date_str, base_currency, os.path.getmtime(path))
+    return find_insight(insights, start_date.strftime("%Y-%m-%d"), date_str, currency, prompt)
+
+def start_llm_actionable_insight(currency, delta, volatility, avg_volatility):
+    """
+    Inicia, numa thread em segundo plano, o pedido à API da OpenAI de uma
+    recomendação de ação baseada nos dados, e devolve um gerador com o texto
+    à medida que chega. Respostas já em cache são entregues de imediato.
+    Sem chave configurada, devolve a mensagem de aviso.
     """
     try:
         # Tenta obter a chave da API dos secrets do Streamlit
@@ -61,50 +110,40 @@ def get_llm_actionable_insight(currency, delta, volatility, avg_volatility):
     except (KeyError, FileNotFoundError):
         return "AVISO: A chave da API da OpenAI não foi configurada nos secrets do Streamlit. Mostrando análise simulada."
 
-    volatility_context = "acima da média do período (maior risco)" if volatility > avg_volatility else "abaixo da média do período (menor risco)"
-    
-    prompt = f"""
-    Aja como um consultor financeiro sênior, extremamente conciso e direto.
-    Contexto: A moeda {currency} está com uma variação de {delta:.2f}% em relação à sua média no período selecionado.
-    Sua volatilidade (risco) é de {volatility:.5f}, que está {volatility_context}.
-    Tarefa: Forneça uma única recomendação acionável em uma frase curta. Comece com "Ação Recomendada:".
-    Exemplo: "Ação Recomendada: Adiar compras não essenciais em {currency} devido à alta volatilidade e perda de força do BRL."
-    """
-    
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Você é um consultor financeiro sênior, focado em recomendações acionáveis."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=100
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Erro ao chamar a API da LLM: {e}"
+    prompt = build_insight_prompt(currency, delta, volatility, avg_volatility)
+
+    # A cache em disco é partilhada com o pipeline e sobrevive a reinícios do Streamlit
+    return stream_in_background(get_llm_cache().stream_completion(
+        openai,
+        model=INSIGHT_MODEL,
+        system_message=INSIGHT_SYSTEM_MESSAGE,
+        prompt=prompt,
+        temperature=INSIGHT_TEMPERATURE,
+        max_tokens=INSIGHT_MAX_TOKENS,
+    ))
 
 # --- Carregamento Inicial ---
-df_raw = load_gold_data()
+gold_history = load_gold_data()
+df_raw = gold_history.frame if gold_history is not None else pd.DataFrame()
 
 if df_raw.empty:
     st.title("📊 Dashboard de Cotações Cambiais")
     st.warning("Nenhum dado encontrado na pasta /gold/. Execute o pipeline de dados primeiro.")
     st.stop()
-    
-df_raw['date'] = pd.to_datetime(df_raw['date'])
+
 max_date_geral = df_raw["date"].max().date()
 
 # --- Sidebar e Filtros ---
 st.sidebar.title("Análise da LLM")
-available_reports = get_all_report_files()
+report_index_version = report_index_mtime()
+available_reports = {os.path.basename(entry["path"]): entry for entry in get_report_index(report_index_version)}
 if available_reports:
-    selected_report_filename = st.sidebar.selectbox("Selecione o Relatório por Data:", options=available_reports)
+    selected_report_filename = st.sidebar.selectbox("Selecione o Relatório por Data:", options=list(available_reports))
     try:
-        with open(os.path.join("reports", selected_report_filename), 'r', encoding='utf-8') as f:
-            report_content = f.read()
-        date_part = selected_report_filename.split('_')[0]
+        selected_report = available_reports[selected_report_filename]
+        # Corpo servido de uma cache LRU limitada, indexada pelo hash do índice
+        report_content = read_report(selected_report["path"], selected_report["sha256"])
+        date_part = selected_report["date"]
         display_date = datetime.strptime(date_part, '%Y-%m-%d').strftime('%d/%m/%Y')
         with st.sidebar.expander(f"Ver Resumo Completo de {display_date}"):
             st.markdown(report_content)
@@ -112,6 +151,20 @@ if available_reports:
         st.sidebar.error(f"Erro ao carregar o relatório: {e}")
 else:
     st.sidebar.warning("Nenhum relatório (.txt) encontrado.")
+
+# Pesquisa de texto integral no arquivo SQLite dos relatórios (ver src/report_archive.py)
+search_query = st.sidebar.text_input("Pesquisar nos Relatórios:", placeholder="ex.: Fed juros, turismo, USD")
+if search_query:
+    any_terms = st.sidebar.checkbox("Basta um dos termos", value=False)
+    try:
+        sync_report_archive(report_index_version)
+        results = search_reports(search_query, any_terms=any_terms, limit=20, sync=False)
+        st.sidebar.caption(f"{len(results)} relatórios encontrados (máx. 20).")
+        for result in results:
+            result_date = datetime.strptime(result["date"], '%Y-%m-%d').strftime('%d/%m/%Y')
+            st.sidebar.markdown(f"**{result_date}** — {' '.join(result['snippet'].split())}")
+    except Exception as e:
+        st.sidebar.error(f"Erro na pesquisa dos relatórios: {e}")
 st.sidebar.divider()
 
 st.sidebar.header("Filtros do Dashboard")
@@ -128,6 +181,11 @@ if len(date_range) != 2: st.stop()
 start_date, end_date = date_range
 
 available_currencies = sorted(df_raw["currency"].unique())
+# Com o universo completo na gold, a lista parte das moedas-alvo do config.yaml
+config = load_config()
+if config.get("full_universe", False) and config.target_currencies:
+    if not st.sidebar.checkbox(f"Mostrar todas as moedas ({len(available_currencies)})", value=False):
+        available_currencies = [c for c in available_currencies if c in config.target_currencies]
 default_currencies = ["USD", "EUR", "GBP"]
 selected_currencies = st.sidebar.multiselect(
     "Selecione as moedas:",
@@ -137,85 +195,89 @@ selected_currencies = st.sidebar.multiselect(
 
 st.sidebar.info(f"Dados atualizados até: {max_date_geral.strftime('%d/%m/%Y')}")
 
-# --- LÓGICA DE CÁLCULO CORRIGIDA ---
+# --- LÓGICA DE CÁLCULO ---
 
-# Filtra o DataFrame principal para o período E moedas selecionados no sidebar
-df_period_filtered = df_raw[
-    (df_raw["date"].dt.date >= start_date) & 
-    (df_raw["date"].dt.date <= end_date) &
-    (df_raw["currency"].isin(selected_currencies))
-].copy()
+# Média, volatilidade e delta vs. média do período, obtidos em O(1) por moeda
+# a partir das somas acumuladas. Inclui apenas as moedas cotadas no último dia
+# DENTRO do período filtrado. O resultado é memoizado pelos filtros, pelo que
+# uma nova execução que só muda o relatório selecionado não refaz os cálculos.
+rolling_metrics = get_rolling_metrics(df_raw, gold_history.version)
+analysis = analyze_period(rolling_metrics, start_date, end_date, selected_currencies)
 
 # Validação se há dados após a filtragem completa
-if df_period_filtered.empty:
+if analysis is None:
     st.title("📊 Dashboard de Cotações Cambiais")
     st.warning("Nenhuma moeda selecionada ou dados insuficientes para o período e moedas escolhidas.")
     st.stop()
 
-# 1. Determinar o último dia DENTRO do período filtrado
-end_date_in_period = df_period_filtered["date"].max().date()
-
-# 2. Calcular a Média e Volatilidade DENTRO do período selecionado
-context_metrics = df_period_filtered.groupby('currency')['rate'].agg(
-    rate_avg_period='mean',
-    rate_std_period='std'
-).reset_index()
-
-# 3. Obter os dados do último dia DENTRO do período filtrado
-df_latest_in_period = df_period_filtered[df_period_filtered['date'].dt.date == end_date_in_period].copy()
-
-# 4. Juntar os dados mais recentes com as métricas do período para análise
-df_analysis = pd.merge(df_latest_in_period, context_metrics, on='currency', how='left')
-
-# 5. Calcular o delta da cotação atual vs. a média do período
-df_analysis['delta_vs_period_pct'] = ((df_analysis['rate'] - df_analysis['rate_avg_period']) / df_analysis['rate_avg_period']) * 100
+df_analysis = analysis.frame
+outlier_currency_row = analysis.outlier
 
+# Períodos padrão usam a recomendação pré-calculada pelo pipeline; nos restantes,
+# o pedido à LLM corre em segundo plano enquanto os KPIs e o gráfico são desenhados
+insight_prompt = build_insight_prompt(
+    outlier_currency_row['currency'], outlier_currency_row[POSITION_COLUMN],
+    outlier_currency_row[RISK_COLUMN], analysis.avg_volatility,
+)
+llm_advice = lookup_precomputed_insight(
+    start_date, end_date, outlier_currency_row['currency'], analysis.base_currency, insight_prompt
+)
+if llm_advice is None:
+    llm_advice = start_llm_actionable_insight(
+        currency=outlier_currency_row['currency'],
+        delta=outlier_currency_row[POSITION_COLUMN],
+        volatility=outlier_currency_row[RISK_COLUMN],
+        avg_volatility=analysis.avg_volatility
+    )
 
 # --- Layout da Página Principal e KPIs ---
 st.title("🧠 Dashboard de Contexto Cambial (Base BRL)")
-st.markdown(f"Análise do dia **{end_date_in_period.strftime('%d/%m/%Y')}** em contexto com o período de **{start_date.strftime('%d/%m/%Y')}** a **{end_date.strftime('%d/%m/%Y')}**.")
+st.markdown(f"Análise do dia **{analysis.end_date.strftime('%d/%m/%Y')}** em contexto com o período de **{start_date.strftime('%d/%m/%Y')}** a **{end_date.strftime('%d/%m/%Y')}**.")
 st.markdown("---")
 
 st.subheader("1. KPIs de Benchmarking e Risco")
-kpi_cols = st.columns(len(df_analysis) if len(df_analysis) > 0 else 1)
-base_currency = df_analysis['base_currency'].iloc[0]
+kpi_cols = st.columns(len(df_analysis))
 
-for idx, row in df_analysis.iterrows():
-    with kpi_cols[df_analysis.index.get_loc(idx)]:
-        delta_brl_strength = -row['delta_vs_period_pct'] if pd.notna(row['delta_vs_period_pct']) else 0.0
+for col, currency, rate, delta, strength, std in zip(
+    kpi_cols, df_analysis["currency"], df_analysis["rate"], df_analysis["delta_vs_period_pct"],
+    df_analysis["brl_strength_pct"], df_analysis["rate_std_period"],
+):
+    with col:
         st.metric(
-            label=f"**{base_currency}** vs **{row['currency']}**",
-            value=f"R$ {row['rate']:,.4f}".replace(",", "X").replace(".", ",").replace("X", "."),
-            delta=f"{delta_brl_strength:.2f}% vs. Média do Período",
-            help=f"A cotação atual está {abs(row['delta_vs_period_pct']):.2f}% {'acima' if row['delta_vs_period_pct'] > 0 else 'abaixo'} da média do período selecionado. Um delta positivo indica perda de força do BRL."
+            label=f"**{analysis.base_currency}** vs **{currency}**",
+            value=f"R$ {rate:,.4f}".replace(",", "X").replace(".", ",").replace("X", "."),
+            delta=f"{strength:.2f}% vs. Média do Período",
+            help=f"A cotação atual está {abs(delta):.2f}% {'acima' if delta > 0 else 'abaixo'} da média do período selecionado. Um delta positivo indica perda de força do BRL."
         )
-        st.caption(f"**Volatilidade (Período):** {row['rate_std_period']:.5f}")
+        st.caption(f"**Volatilidade (Período):** {std:.5f}")
+
+# Anomalias do último dia, já calculadas na gold pelo pipeline (ver src/anomaly.py)
+if "is_anomaly" in df_raw.columns:
+    df_day = df_raw[(df_raw["date"] == pd.Timestamp(analysis.end_date)) & df_raw["currency"].isin(df_analysis["currency"])]
+    df_flagged = df_day[df_day["is_anomaly"].fillna(False).astype(bool)]
+    for currency, change, score, is_jump in zip(
+        df_flagged["currency"], df_flagged["daily_change_pct"], df_flagged["anomaly_score"], df_flagged["is_jump"],
+    ):
+        motivo = "salto abrupto" if is_jump else f"score {score:.1f} face aos últimos dias"
+        st.warning(f"🚨 **{currency}**: variação diária de {change:.2f}% fora do padrão recente ({motivo}).")
 
 st.markdown("---")
 
 # --- Gráfico de Dispersão (Contexto/Risco) ---
 st.subheader("2. Posição de Risco (Variação vs. Volatilidade)")
 
-df_analysis['Posicionamento vs. Média (%)'] = df_analysis['delta_vs_period_pct']
-df_analysis['Risco (Volatilidade)'] = df_analysis['rate_std_period'].fillna(0)
-df_analysis['Status'] = np.where(df_analysis['Posicionamento vs. Média (%)'] > 0, 'Perda de Força do BRL', 'Ganho de Força do BRL') 
-
-if not df_analysis.empty:
-    scatter_chart = alt.Chart(df_analysis).mark_circle(size=100).encode(
-        x=alt.X("Risco (Volatilidade):Q", title="Risco: Volatilidade no Período"),
-        y=alt.Y("Posicionamento vs. Média (%):Q", title="Posicionamento (vs. Média do Período)"),
-        color=alt.Color("Status:N", scale=alt.Scale(domain=['Ganho de Força do BRL', 'Perda de Força do BRL'], range=['#2ca02c', '#d62728'])),
-        tooltip=["currency", "Posicionamento vs. Média (%)", "Risco (Volatilidade)"]
-    ).properties(title="Moedas em Contexto de Risco vs. Posição Atual").interactive()
-
-    avg_volatility = df_analysis['Risco (Volatilidade)'].mean()
-    ref_lines_data = pd.DataFrame({'y': [0], 'x': [avg_volatility]})
-    hline = alt.Chart(ref_lines_data).mark_rule(color='black', strokeDash=[5,5]).encode(y='y:Q')
-    vline = alt.Chart(ref_lines_data).mark_rule(color='gray', strokeDash=[3,3]).encode(x='x:Q')
-    
-    st.altair_chart(scatter_chart + hline + vline, use_container_width=True)
-else:
-    st.warning("Nenhum dado para o gráfico de dispersão.")
+scatter_chart = alt.Chart(df_analysis).mark_circle(size=100).encode(
+    x=alt.X(f"{RISK_COLUMN}:Q", title="Risco: Volatilidade no Período"),
+    y=alt.Y(f"{POSITION_COLUMN}:Q", title="Posicionamento (vs. Média do Período)"),
+    color=alt.Color(f"{STATUS_COLUMN}:N", scale=alt.Scale(domain=[STATUS_GAIN, STATUS_LOSS], range=['#2ca02c', '#d62728'])),
+    tooltip=["currency", POSITION_COLUMN, RISK_COLUMN]
+).properties(title="Moedas em Contexto de Risco vs. Posição Atual").interactive()
+
+ref_lines_data = pd.DataFrame({'y': [0], 'x': [analysis.avg_volatility]})
+hline = alt.Chart(ref_lines_data).mark_rule(color='black', strokeDash=[5,5]).encode(y='y:Q')
+vline = alt.Chart(ref_lines_data).mark_rule(color='gray', strokeDash=[3,3]).encode(x='x:Q')
+
+st.altair_chart(scatter_chart + hline + vline, use_container_width=True)
 
 st.markdown("---")
 
@@ -223,16 +285,14 @@ st.markdown("---")
 st.subheader("3. Análise Executiva da LLM (Ação Sugerida)")
 st.info("A LLM analisa a moeda mais relevante no gráfico acima e sugere uma ação.")
 
-# Encontra a moeda mais "interessante" (mais distante da origem do gráfico)
-df_analysis['distancia'] = np.sqrt(df_analysis['Risco (Volatilidade)']**2 + df_analysis['Posicionamento vs. Média (%)']**2)
-outlier_currency_row = df_analysis.loc[df_analysis['distancia'].idxmax()]
-
-# Gera a recomendação da LLM para a moeda em destaque
-llm_advice = get_llm_actionable_insight(
-    currency=outlier_currency_row['currency'],
-    delta=outlier_currency_row['Posicionamento vs. Média (%)'],
-    volatility=outlier_currency_row['Risco (Volatilidade)'],
-    avg_volatility=avg_volatility
-)
-
-st.success(llm_advice)
\ No newline at end of file
+# Mostra a recomendação para a moeda em destaque à medida que é gerada
+llm_placeholder = st.empty()
+if isinstance(llm_advice, str):
+    llm_placeholder.success(llm_advice)
+else:
+    try:
+        with llm_placeholder:
+            llm_text = st.write_stream(llm_advice)
+        llm_placeholder.success(llm_text)
+    except Exception as e:
+        llm_placeholder.error(f"Erro ao chamar a API da LLM: {e}")
@@ -1,38 +1,332 @@
 import argparse
-from datetime import datetime
-from src.ingest import fetch_exchange_rates
-from src.transformation import transform_to_silver
-from src.load import save_to_gold
-from src.llm_summary import gerar_resumo_llm
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from src.instrumentation import run_metrics, stage
+
+# As etapas importam os seus módulos (pandas, pyarrow, requests, openai) apenas
+# quando têm trabalho a fazer, para que execuções idempotentes arranquem depressa.
+
+DATE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})")
+STAGES = ["ingest", "silver", "gold", "insights", "summary", "all"]
+# Espelham os valores por defeito de src.load (DEFAULT_WINDOWS, GAP_TOLERANCE_DAYS)
+# e de src.anomaly (window_days), que importam pandas
+GOLD_DEFAULT_WINDOWS = [7, 30, 90]
+GOLD_GAP_TOLERANCE_DAYS = 7
+ANOMALY_DEFAULT_WINDOW_DAYS = 60
+
+
+def _is_up_to_date(target, *sources):
+    """Indica se `target` existe e é mais recente que todas as fontes existentes."""
+    if not os.path.exists(target):
+        return False
+    target_mtime = os.path.getmtime(target)
+    return all(os.path.getmtime(src) <= target_mtime for src in sources if os.path.exists(src))
+
+
+def run_ingest(date):
+    """Etapa de ingestão; não faz nada se o raw da data já existir."""
+    raw_path = os.path.join("raw", f"{date}.json")
+    if os.path.exists(raw_path):
+        print(f"Ingestão: {raw_path} já existe. Nada a fazer.")
+        return raw_path
+    from src.ingest import fetch_exchange_rates
+    return fetch_exchange_rates(date)
+
+
+def run_silver(date):
+    """Etapa silver; não faz nada se a silver for mais recente que o raw e o config.yaml."""
+    from src.utils import load_config
+    silver_path = os.path.join("silver", f"{date}.parquet")
+    raw_path = os.path.join("raw", f"{date}.json")
+    if _is_up_to_date(silver_path, raw_path, os.path.splitext(raw_path)[0] + ".arrow", load_config().path):
+        print(f"Silver: {silver_path} já está atualizado. Nada a fazer.")
+        return silver_path
+    from src.transformation import transform_to_silver
+    return transform_to_silver(date)
+
+
+def _gold_sources(date):
+    """
+    Ficheiros silver lidos por `save_to_gold` para a data: o próprio dia e os
+    anteriores dentro da maior janela (de `gold_windows` ou da deteção de
+    anomalias) mais a tolerância de falhas.
+    """
+    from src.utils import load_config
+    config = load_config()
+    windows = [int(w) for w in config.get("gold_windows", GOLD_DEFAULT_WINDOWS)]
+    anomaly_window = int((config.get("anomaly") or {}).get("window_days", ANOMALY_DEFAULT_WINDOW_DAYS))
+    lookback = max(windows + [anomaly_window]) + GOLD_GAP_TOLERANCE_DAYS
+    oldest = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=lookback)).strftime("%Y-%m-%d")
+    if not os.path.isdir("silver"):
+        return []
+    return [
+        os.path.join("silver", name) for name in os.listdir("silver")
+        if name.endswith(".parquet") and oldest <= name[:10] <= date
+    ]
+
+
+def run_gold(date):
+    """
+    Etapa gold; não faz nada se a gold for mais recente que todas as silver
+    da janela que ela usa (ex.: uma silver anterior reprocessada depois
+    altera as variações e as volatilidades do dia). Depois de gravar a gold,
+    regenera gold/history.arrow, o histórico que o dashboard abre.
+    """
+    gold_path = os.path.join("gold", f"{date}.parquet")
+    if _is_up_to_date(gold_path, *_gold_sources(date)) and os.path.exists(os.path.join("gold", "history.arrow")):
+        print(f"Gold: {gold_path} já está atualizado. Nada a fazer.")
+        return gold_path
+    from src.load import save_to_gold
+    from src.shared_history import build_shared_history
+    save_to_gold(date)
+    # Cópia do histórico que o dashboard mapeia em memória
+    build_shared_history()
+    return gold_path
+
+
+def run_insights(date):
+    """Etapa de insights do dashboard; não faz nada se o ficheiro for mais recente que a gold da data."""
+    from src.utils import load_config, load_env
+    load_env()
+    insights_path = os.path.join("reports", "insights", f"{date}_{load_config().base_currency}_insights.json")
+    if _is_up_to_date(insights_path, os.path.join("gold", f"{date}.parquet")):
+        print(f"Insights: {insights_path} já está atualizado. Nada a fazer.")
+        return insights_path
+    from src.insights import generate_insights
+    return generate_insights(date)
+
+
+def run_summary(date, top_n=5):
+    """Etapa de resumo LLM; não faz nada se o relatório da data já existir."""
+    from src.utils import load_config, load_env
+    load_env()
+    report_path = os.path.join("reports", f"{date}_{load_config().base_currency}_summary.txt")
+    if os.path.exists(report_path):
+        print(f"Resumo: {report_path} já existe. Nada a fazer.")
+        return report_path
+    from src.llm_summary import gerar_resumo_llm
+    gerar_resumo_llm(date=date, top_n=top_n)
+    return report_path
+
+
+def run_summaries(dates, top_n=5, workers=None):
+    """Gera em lote, com pedidos concorrentes, os resumos LLM em falta para as datas indicadas."""
+    from src.llm_summary import gerar_resumos_llm
+    print(f"\n=== Gerando resumos LLM para {len(dates)} datas ===")
+    return gerar_resumos_llm(dates, top_n=top_n, max_workers=workers or 4)
+
 
 def run_all(date=None, top_n=5):
     """
-    Executa o pipeline completo de ingestão, transformação, carga e resumo LLM.
+    Executa o pipeline completo de ingestão, transformação, carga, insights do
+    dashboard e resumo LLM.
     A moeda base é lida a partir do config.yaml nas etapas relevantes.
     """
     # Corrigir a lógica para usar a data do argumento se ela for fornecida
     if date is None:
         date = datetime.today().strftime("%Y-%m-%d")
-    
+
     print(f"=== Iniciando pipeline para a data: {date} ===")
-   
-    fetch_exchange_rates(date)
-    transform_to_silver(date)
-    save_to_gold(date)
+
+    with stage("ingest"):
+        run_ingest(date)
+    with stage("silver"):
+        run_silver(date)
+    with stage("gold"):
+        run_gold(date)
+
+    print("\n=== Gerando insights do dashboard ===")
+    with stage("insights"):
+        run_insights(date)
 
     print("\n=== Gerando resumo LLM ===")
-    # Chamada corrigida: remover base_currency, pois é lido do config.yaml
-    gerar_resumo_llm(date=date, top_n=top_n)
-    
+    with stage("summary"):
+        run_summary(date, top_n=top_n)
+
     print("\n=== Pipeline concluído com sucesso! ===")
 
 
+def date_range(start, end):
+    """Gera as datas (YYYY-MM-DD) entre start e end, inclusive."""
+    start_obj = datetime.strptime(start, "%Y-%m-%d")
+    end_obj = datetime.strptime(end, "%Y-%m-%d")
+    if end_obj < start_obj:
+        raise ValueError(f"Data final {end} anterior à data inicial {start}.")
+    return [
+        (start_obj + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range((end_obj - start_obj).days + 1)
+    ]
+
+
+def read_dates_from(path):
+    """
+    Lê a lista de datas a processar. Se `path` for um diretório (ex.: raw/),
+    as datas são extraídas dos nomes dos ficheiros; caso contrário, o ficheiro
+    é lido com uma data por linha.
+    """
+    if os.path.isdir(path):
+        names = os.listdir(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f]
+    dates = {m.group(1) for m in map(DATE_PATTERN.match, names) if m}
+    return sorted(dates)
+
+
+def _ingest_and_transform(date):
+    """Etapas independentes por dia: ingestão e camada silver."""
+    raw_path = os.path.join("raw", f"{date}.json")
+    today = datetime.today().strftime("%Y-%m-%d")
+    if not os.path.exists(raw_path) and date != today:
+        # A ingestão de datas passadas é feita antes, em lote, pelo endpoint
+        # 'history'; aqui o endpoint 'latest' gravaria a cotação de hoje.
+        logging.warning(f"Ficheiro raw para {date} não existe e a data não é hoje. A pular.")
+        return None
+    from src.ingest import fetch_exchange_rates
+    from src.transformation import transform_to_silver
+    fetch_exchange_rates(date)
+    transform_to_silver(date, update_history=False)
+    return date
+
+
+def _load_gold(date):
+    """
+    Etapa gold de um dia; depende da silver do dia anterior. O histórico
+    consolidado é reconstruído uma única vez no fim do backfill, para que
+    processos paralelos não reescrevam a mesma partição mensal.
+    """
+    from src.load import save_to_gold
+    save_to_gold(date, update_history=False)
+    return date
+
+
+def _run_stage(executor, func, dates):
+    """
+    Executa `func` para cada data no pool e devolve (concluídas, falhadas).
+    Datas para as quais `func` devolve None são consideradas ignoradas.
+    """
+    done, failed = [], []
+    futures = {date: executor.submit(func, date) for date in dates}
+    for date, future in futures.items():
+        try:
+            if future.result() is not None:
+                done.append(date)
+        except Exception as e:
+            logging.error(f"Falha ao processar {date} em {func.__name__}: {e}")
+            failed.append(date)
+    return done, failed
+
+
+def run_backfill(dates, workers=None, top_n=5, summary=False, bases=None):
+    """
+    Reprocessa um conjunto de datas em paralelo, reutilizando os mesmos
+    processos de trabalho para todas elas.
+
+    Os ficheiros raw em falta são primeiro buscados em lote, com pedidos HTTP
+    concorrentes, para a moeda base configurada e para as `bases` adicionais.
+    Apenas a moeda base configurada segue para as camadas silver e gold.
+    A ingestão e a camada silver de cada dia são independentes e correm em
+    simultâneo. A camada gold só começa depois de todas as silver estarem
+    gravadas, pois `save_to_gold` lê a silver do dia anterior. No fim, são
+    gerados os insights do dashboard de cada data e, com `summary`, os resumos LLM.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from src.ingest import fetch_exchange_rates_bulk
+    from src.load import rebuild_gold_history, rebuild_silver_history
+    from src.shared_history import build_shared_history
+
+    dates = sorted(set(dates))
+    print(f"=== Iniciando backfill de {len(dates)} datas ({dates[0]} a {dates[-1]}) ===")
+
+    missing = [d for d in dates if not os.path.exists(os.path.join("raw", f"{d}.json"))]
+    if missing or bases:
+        try:
+            with stage("ingest"):
+                fetch_exchange_rates_bulk(dates, bases=bases)
+        except ValueError as e:
+            logging.error(f"Ingestão em lote indisponível: {e}")
+
+    # Os contadores das etapas que correm noutros processos não chegam a esta
+    # execução; para elas ficam registados apenas os tempos.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        with stage("silver"):
+            silver_dates, failed_silver = _run_stage(executor, _ingest_and_transform, dates)
+        if silver_dates:
+            # Uma só escrita do histórico da silver, de onde a gold lê as janelas
+            with stage("silver_history"):
+                rebuild_silver_history()
+        with stage("gold"):
+            gold_dates, failed_gold = _run_stage(executor, _load_gold, silver_dates)
+
+    if gold_dates:
+        with stage("gold_history"):
+            rebuild_gold_history()
+            build_shared_history()
+        # Insights do dashboard, como em `run_all`, já com o histórico completo
+        with stage("insights"):
+            for date in gold_dates:
+                run_insights(date)
+
+    if summary and gold_dates:
+        with stage("summary"):
+            run_summaries(gold_dates, top_n=top_n)
+
+    failed = sorted(failed_silver + failed_gold)
+    skipped = len(dates) - len(silver_dates) - len(failed_silver)
+    print(
+        f"\n=== Backfill concluído: {len(gold_dates)} datas processadas, "
+        f"{skipped} ignoradas, {len(failed)} com falha ==="
+    )
+    if failed:
+        print(f"Datas com falha: {', '.join(failed)}")
+    return gold_dates
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Executa pipeline completo de cotações + resumo LLM")
+    parser.add_argument("command", nargs="?", choices=STAGES, default="all",
+                        help="Etapa a executar (por defeito, todas)")
     parser.add_argument("--date", help="Data no formato YYYY-MM-DD", required=False)
     # Argumento base_currency removido, pois a configuração é centralizada
     parser.add_argument("--top_n", type=int, default=5, help="Quantidade de moedas a incluir no resumo")
+    parser.add_argument("--start", help="Data inicial do backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final do backfill (YYYY-MM-DD), por defeito hoje")
+    parser.add_argument("--dates-from", help="Ficheiro com uma data por linha ou diretório (ex.: raw/) de onde extrair as datas")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos no backfill (por defeito, nº de CPUs) ou de pedidos LLM em simultâneo no comando 'summary'")
+    parser.add_argument("--summary", action="store_true", help="No backfill, gerar também os resumos LLM")
+    parser.add_argument("--bases", help="No backfill, moedas base adicionais a ingerir, separadas por vírgula (ex.: USD,EUR)")
     args = parser.parse_args()
 
-    # Chamada corrigida: remover base_currency
-    run_all(date=args.date, top_n=args.top_n)
+    backfill_dates = None
+    if args.start or args.dates_from:
+        if args.command not in ("all", "summary"):
+            parser.error("O backfill (--start/--dates-from) só está disponível com os comandos 'all' e 'summary'.")
+        if args.dates_from:
+            backfill_dates = read_dates_from(args.dates_from)
+        else:
+            backfill_dates = date_range(args.start, args.end or datetime.today().strftime("%Y-%m-%d"))
+        if not backfill_dates:
+            parser.error("Nenhuma data encontrada para o backfill.")
+
+    if backfill_dates is not None:
+        with run_metrics(f"{args.command}-backfill", f"{backfill_dates[0]}_{backfill_dates[-1]}"):
+            if args.command == "summary":
+                gold_dates = [d for d in backfill_dates if os.path.exists(os.path.join("gold", f"{d}.parquet"))]
+                with stage("summary"):
+                    run_summaries(gold_dates, top_n=args.top_n, workers=args.workers)
+            else:
+                bases = [b.strip().upper() for b in args.bases.split(",")] if args.bases else None
+                run_backfill(backfill_dates, workers=args.workers, top_n=args.top_n, summary=args.summary, bases=bases)
+    else:
+        date = args.date or datetime.today().strftime("%Y-%m-%d")
+        with run_metrics(args.command, date):
+            if args.command == "all":
+                run_all(date=date, top_n=args.top_n)
+            elif args.command == "summary":
+                with stage("summary"):
+                    run_summary(date, top_n=args.top_n)
+            else:
+                with stage(args.command):
+                    {"ingest": run_ingest, "silver": run_silver, "gold": run_gold, "insights": run_insights}[args.command](date)
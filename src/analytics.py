@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+# Colunas de apresentação usadas pelo gráfico de dispersão do dashboard
+POSITION_COLUMN = "Posicionamento vs. Média (%)"
+RISK_COLUMN = "Risco (Volatilidade)"
+STATUS_COLUMN = "Status"
+STATUS_GAIN = "Ganho de Força do BRL"
+STATUS_LOSS = "Perda de Força do BRL"
+# Consultas memoizadas por objeto `RollingMetrics`
+ANALYSIS_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True, eq=False)
+class PeriodAnalysis:
+    """
+    Resultado da análise de um período: uma linha por moeda com as métricas
+    do período, as colunas do gráfico de dispersão e a distância à origem,
+    mais os agregados que o dashboard mostra. `frame` é partilhado entre
+    chamadas memoizadas e deve ser tratado como só de leitura.
+    """
+    frame: pd.DataFrame
+    end_date: object
+    base_currency: str
+    avg_volatility: float
+    outlier: pd.Series
+
+
+def analyze_period(metrics, start, end, currencies):
+    """
+    Análise do período [start, end] para as moedas indicadas, a partir de um
+    `RollingMetrics`. Devolve None se não houver dados.
+
+    O resultado é memoizado pelos argumentos na cache do próprio `metrics`,
+    pelo que repetir a mesma consulta (ex.: numa nova execução do script do
+    Streamlit que só mudou o relatório selecionado) não refaz nenhum cálculo,
+    e os resultados desaparecem com as métricas quando a gold muda.
+    """
+    key = ("analyze_period", pd.Timestamp(start).date(), pd.Timestamp(end).date(), tuple(sorted(currencies)))
+    cache = metrics.cache
+    with metrics.cache_lock:
+        if key in cache:
+            return cache[key]
+    # Calculado fora do lock, para não serializar as sessões; numa corrida,
+    # fica o primeiro resultado gravado
+    result = _analyze_period(metrics, *key[1:])
+    with metrics.cache_lock:
+        if key not in cache and len(cache) >= ANALYSIS_CACHE_SIZE:
+            # Descarta a consulta mais antiga
+            cache.pop(next(iter(cache)))
+        return cache.setdefault(key, result)
+
+
+def _analyze_period(metrics, start, end, currencies):
+    df = metrics.window(start, end, list(currencies))
+    if df.empty:
+        return None
+
+    df = df.reset_index(drop=True)
+    df["brl_strength_pct"] = -df["delta_vs_period_pct"].fillna(0.0)
+    df[POSITION_COLUMN] = df["delta_vs_period_pct"]
+    df[RISK_COLUMN] = df["rate_std_period"].fillna(0)
+    df[STATUS_COLUMN] = np.where(df[POSITION_COLUMN] > 0, STATUS_LOSS, STATUS_GAIN)
+    # Moeda mais "interessante": a mais distante da origem do gráfico
+    df["distancia"] = np.sqrt(df[RISK_COLUMN] ** 2 + df[POSITION_COLUMN] ** 2)
+
+    return PeriodAnalysis(
+        frame=df,
+        end_date=df["date"].max().date(),
+        base_currency=df["base_currency"].iloc[0],
+        avg_volatility=float(df[RISK_COLUMN].mean()),
+        outlier=df.loc[df["distancia"].idxmax()],
+    )
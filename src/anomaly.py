@@ -0,0 +1,101 @@
+import logging
+import numpy as np
+import pandas as pd
+from src.utils import load_config
+
+ANOMALY_COLUMNS = ["anomaly_zscore", "anomaly_mad_score", "anomaly_score", "is_jump", "is_anomaly"]
+DEFAULT_SETTINGS = {
+    # Dias de variações anteriores usados como referência
+    "window_days": 60,
+    # Mínimo de observações na janela para calcular os scores
+    "min_observations": 10,
+    "zscore_threshold": 3.0,
+    "mad_threshold": 5.0,
+    # Variação diária (%, em valor absoluto) considerada salto, qualquer que seja o histórico
+    "jump_pct": 5.0,
+}
+# Fator que torna o MAD comparável ao desvio padrão numa distribuição normal
+MAD_SCALE = 0.6745
+
+
+def anomaly_settings(config=None):
+    """Parâmetros da deteção: os valores por defeito com a secção `anomaly` do config.yaml por cima."""
+    config = config or load_config()
+    return {**DEFAULT_SETTINGS, **(config.get("anomaly") or {})}
+
+
+def score_changes(window, today, settings=None):
+    """
+    Scores da variação diária de hoje (`today`, Series indexada pela moeda)
+    face à janela de variações anteriores (`window`, DataFrame data × moeda):
+    z-score, score robusto pela mediana/MAD, salto absoluto e a flag
+    combinada. Tudo vetorizado sobre as moedas.
+    """
+    settings = settings or anomaly_settings()
+    past = window.reindex(columns=today.index).to_numpy(dtype="float64")
+    x = today.to_numpy(dtype="float64")
+
+    valid = ~np.isnan(past)
+    n = valid.sum(axis=0)
+    enough = n >= settings["min_observations"]
+    past = past[:, enough]
+
+    zscore = np.full(len(x), np.nan)
+    robust = np.full(len(x), np.nan)
+    if enough.any():
+        mean = np.nanmean(past, axis=0)
+        std = np.nanstd(past, axis=0, ddof=1)
+        median = np.nanmedian(past, axis=0)
+        mad = np.nanmedian(np.abs(past - median), axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            zscore[enough] = np.where(std > 0, (x[enough] - mean) / std, np.nan)
+            robust[enough] = np.where(mad > 0, MAD_SCALE * (x[enough] - median) / mad, np.nan)
+
+    score = np.fmax(np.abs(zscore), np.abs(robust))
+    is_jump = np.abs(np.nan_to_num(x)) >= settings["jump_pct"]
+    is_anomaly = (
+        (np.abs(np.nan_to_num(zscore)) >= settings["zscore_threshold"])
+        | (np.abs(np.nan_to_num(robust)) >= settings["mad_threshold"])
+        | is_jump
+    )
+    return pd.DataFrame({
+        "anomaly_zscore": zscore,
+        "anomaly_mad_score": robust,
+        "anomaly_score": score,
+        "is_jump": is_jump,
+        "is_anomaly": is_anomaly,
+    }, index=today.index)
+
+
+def detect_anomalies(df_gold, date, previous_date=None, prior_rates=None):
+    """
+    Acrescenta ao DataFrame da gold do dia as colunas de `ANOMALY_COLUMNS`,
+    a partir da coluna `daily_change_pct`.
+
+    A janela de variações anteriores vem de `prior_rates`, a matriz data ×
+    moeda das cotações anteriores que `save_to_gold` já lê para as janelas
+    de variação e volatilidade; a deteção não faz leituras próprias.
+    """
+    settings = anomaly_settings()
+    current = pd.Timestamp(date)
+    oldest = current - pd.Timedelta(days=int(settings["window_days"]))
+    today = pd.Series(df_gold["daily_change_pct"].to_numpy(dtype="float64"), index=df_gold["currency"].astype(str).to_numpy())
+    if previous_date is None:
+        # Sem observação anterior, a variação gravada na gold é só um 0 de preenchimento
+        today[:] = np.nan
+
+    if prior_rates is not None and len(prior_rates):
+        window = prior_rates.ffill().pct_change(fill_method=None) * 100
+    else:
+        window = pd.DataFrame(index=pd.DatetimeIndex([]), dtype="float64")
+    window = window[window.index > oldest]
+
+    scores = score_changes(window, today, settings)
+    df_gold = df_gold.copy()
+    for column in ANOMALY_COLUMNS:
+        df_gold[column] = scores[column].to_numpy()
+
+    flagged = df_gold.loc[df_gold["is_anomaly"], "currency"].tolist()
+    if flagged:
+        logging.info(f"Anomalias detetadas em {date}: {', '.join(map(str, flagged))}")
+    return df_gold
@@ -0,0 +1,243 @@
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from src.load import IncrementalGoldLoader
+from src.rolling import RollingMetrics
+from src.utils import setup_logging
+
+# Intervalo (s) entre verificações de novos ficheiros na gold
+DEFAULT_REFRESH_SECONDS = 5.0
+
+
+class GoldSnapshot:
+    """
+    Índice imutável do histórico da gold em memória: para cada moeda, os
+    vetores ordenados de datas e cotações, a última linha de cada moeda e as
+    somas acumuladas para as estatísticas de período.
+    """
+
+    def __init__(self, df, version):
+        self.version = version
+        self.loaded_at = time.time()
+        self.series = {}
+        self.latest = {}
+        self.metrics = None
+        self.base_currency = None
+        if df.empty:
+            return
+
+        df = df.sort_values(by=["currency", "date"], kind="stable")
+        self.base_currency = str(df["base_currency"].iloc[-1]) if "base_currency" in df.columns else None
+        currencies = df["currency"].astype(str).to_numpy()
+        dates = df["date"].to_numpy().astype("datetime64[D]")
+        rates = df["rate"].to_numpy(dtype="float64")
+        changes = (
+            df["daily_change_pct"].to_numpy(dtype="float64")
+            if "daily_change_pct" in df.columns else np.full(len(df), np.nan)
+        )
+        bounds = np.flatnonzero(currencies[1:] != currencies[:-1]) + 1
+        for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(df)]])):
+            currency = currencies[lo]
+            self.series[currency] = (dates[lo:hi], rates[lo:hi])
+            self.latest[currency] = {
+                "date": str(dates[hi - 1]),
+                "rate": _number(rates[hi - 1]),
+                "daily_change_pct": _number(changes[hi - 1]),
+            }
+        self.metrics = RollingMetrics(df)
+
+    def history(self, currency, start=None, end=None):
+        dates, rates = self.series[currency]
+        lo = np.searchsorted(dates, np.datetime64(start, "D"), side="left") if start else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end else len(dates)
+        return [{"date": str(d), "rate": _number(r)} for d, r in zip(dates[lo:hi], rates[lo:hi])]
+
+
+def _number(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+
+class GoldIndex:
+    """
+    Mantém o `GoldSnapshot` atual. `refresh` relê incrementalmente a gold
+    (apenas partições novas ou alteradas) e só reconstrói o índice quando
+    os dados mudaram; os pedidos leem sempre um snapshot completo.
+    """
+
+    def __init__(self, gold_dir="gold"):
+        self.loader = IncrementalGoldLoader(gold_dir)
+        self.snapshot = GoldSnapshot(pd.DataFrame(), version=-1)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            df = self.loader.load()
+            if self.loader.version != self.snapshot.version:
+                self.snapshot = GoldSnapshot(df, self.loader.version)
+                logging.info(f"Índice da API atualizado: {len(self.snapshot.series)} moedas (versão {self.loader.version}).")
+        return self.snapshot
+
+    def start_refresher(self, interval=DEFAULT_REFRESH_SECONDS):
+        """Verifica periodicamente, numa thread em segundo plano, se chegaram novos ficheiros à gold."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Erro ao atualizar o índice da API: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _currencies_param(params, snapshot):
+    raw = params.get("currencies", [""])[0] or params.get("currency", [""])[0]
+    if not raw:
+        return sorted(snapshot.series)
+    return [c.strip().upper() for c in raw.split(",") if c.strip()]
+
+
+def _date_param(params, name):
+    value = params.get(name, [None])[0]
+    if value is None:
+        return None
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d")
+    except ValueError:
+        raise ApiError(400, f"Data inválida em '{name}': {value}")
+
+
+def handle_latest(snapshot, params):
+    currencies = _currencies_param(params, snapshot)
+    return {
+        "base_currency": snapshot.base_currency,
+        "rates": {c: snapshot.latest[c] for c in currencies if c in snapshot.latest},
+    }
+
+
+def handle_history(snapshot, params):
+    currency = params.get("currency", [""])[0].upper()
+    if not currency:
+        raise ApiError(400, "Parâmetro 'currency' obrigatório.")
+    if currency not in snapshot.series:
+        raise ApiError(404, f"Moeda desconhecida: {currency}")
+    return {
+        "base_currency": snapshot.base_currency,
+        "currency": currency,
+        "history": snapshot.history(currency, _date_param(params, "start"), _date_param(params, "end")),
+    }
+
+
+def handle_stats(snapshot, params):
+    start, end = _date_param(params, "start"), _date_param(params, "end")
+    if start is None or end is None:
+        raise ApiError(400, "Parâmetros 'start' e 'end' obrigatórios.")
+    if snapshot.metrics is None:
+        return {"base_currency": snapshot.base_currency, "stats": []}
+    df = snapshot.metrics.window(start, end, _currencies_param(params, snapshot))
+    stats = [
+        {
+            "currency": currency,
+            "date": date.strftime("%Y-%m-%d"),
+            "rate": _number(rate),
+            "rate_avg_period": _number(avg),
+            "rate_std_period": _number(std),
+            "delta_vs_period_pct": _number(delta),
+        }
+        for currency, date, rate, avg, std, delta in zip(
+            df["currency"], df["date"], df["rate"], df["rate_avg_period"],
+            df["rate_std_period"], df["delta_vs_period_pct"],
+        )
+    ]
+    return {"base_currency": snapshot.base_currency, "start": start, "end": end, "stats": stats}
+
+
+ROUTES = {
+    "/latest": handle_latest,
+    "/history": handle_history,
+    "/stats": handle_stats,
+}
+
+
+def make_handler(index):
+    """Classe de handler HTTP ligada ao índice indicado."""
+
+    class GoldApiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            snapshot = index.snapshot
+            try:
+                if url.path == "/health":
+                    body = {"status": "ok", "version": snapshot.version, "currencies": len(snapshot.series)}
+                elif url.path in ROUTES:
+                    body = ROUTES[url.path](snapshot, parse_qs(url.query))
+                else:
+                    raise ApiError(404, f"Caminho desconhecido: {url.path}")
+                self._send(200, body)
+            except ApiError as e:
+                self._send(e.status, {"error": str(e)})
+            except Exception as e:
+                logging.error(f"Erro ao responder a {self.path}: {e}", exc_info=True)
+                self._send(500, {"error": "Erro interno."})
+
+        def _send(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return GoldApiHandler
+
+
+def create_server(host="127.0.0.1", port=8000, gold_dir="gold", refresh_interval=DEFAULT_REFRESH_SECONDS):
+    """
+    Cria o servidor HTTP só de leitura sobre a gold, com o índice já
+    carregado e, se `refresh_interval` for indicado, atualizado em segundo plano.
+    """
+    index = GoldIndex(gold_dir)
+    index.refresh()
+    if refresh_interval:
+        index.start_refresher(refresh_interval)
+    server = ThreadingHTTPServer((host, port), make_handler(index))
+    server.index = index
+    return server
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="API HTTP só de leitura com as cotações e métricas da camada gold")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--gold-dir", default="gold")
+    parser.add_argument("--refresh", type=float, default=DEFAULT_REFRESH_SECONDS, help="Segundos entre verificações de novos ficheiros na gold")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.gold_dir, args.refresh)
+    logging.info(f"API disponível em http://{args.host}:{server.server_address[1]} (/latest, /history, /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
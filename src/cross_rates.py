@@ -0,0 +1,120 @@
+import os
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from src.raw_store import RAW_DIR, load_raw_history, read_raw_record, record_path_for
+from src.utils import ensure_dir, load_config, setup_logging
+
+CROSS_DIR = os.path.join("gold", "cross")
+
+
+def load_rate_matrix(currencies=None, start=None, end=None, raw_dir=RAW_DIR):
+    """
+    Matriz data × moeda das cotações guardadas na camada raw, todas face à
+    moeda base configurada (que entra como coluna de valor 1). Devolve
+    (datas, moedas, valores), com NaN onde a API não trouxe a moeda.
+    """
+    stored_base = load_config().base_currency
+    wanted = None if currencies is None else sorted(set(currencies) - {stored_base})
+    df = load_raw_history(currencies=wanted, start=start, end=end, base_currency=stored_base, raw_dir=raw_dir)
+    df = df[df["currency"] != stored_base]
+    pivot = df.pivot_table(index="date", columns="currency", values="rate", aggfunc="last", observed=True).sort_index()
+    pivot.columns = [str(c) for c in pivot.columns]
+    pivot[stored_base] = 1.0
+    columns = sorted(pivot.columns) if currencies is None else [c for c in currencies if c in pivot.columns]
+    return pivot.index.values.astype("datetime64[D]"), columns, pivot[columns].to_numpy(dtype="float64")
+
+
+def cross_tensor(values):
+    """
+    Taxas cruzadas de todos os pares, de uma só vez: para valores T × N face a
+    uma base comum, devolve T × N × N com [t, i, j] = unidades da moeda j por
+    uma unidade da moeda i.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return values[:, None, :] / values[:, :, None]
+
+
+def cross_rates(base, quotes=None, start=None, end=None, raw_dir=RAW_DIR):
+    """
+    Cotações de `quotes` (todas as moedas, por defeito) face a `base` no
+    período indicado, derivadas dos vetores já guardados na camada raw, sem
+    novos pedidos à API. Devolve um DataFrame (date, base_currency, currency,
+    rate) no mesmo formato da silver.
+    """
+    currencies = None if quotes is None else list(dict.fromkeys([base] + list(quotes)))
+    dates, columns, values = load_rate_matrix(currencies, start, end, raw_dir)
+    if base not in columns:
+        raise ValueError(f"Moeda base {base} não encontrada na camada raw.")
+
+    quote_columns = [c for c in columns if c != base] if quotes is None else [c for c in quotes if c in columns]
+    positions = [columns.index(c) for c in quote_columns]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crossed = values[:, positions] / values[:, [columns.index(base)]]
+
+    df = pd.DataFrame({
+        "date": np.repeat(dates, len(quote_columns)).astype("datetime64[ns]"),
+        "base_currency": base,
+        "currency": np.tile(quote_columns, len(dates)),
+        "rate": crossed.reshape(-1),
+    })
+    return df.dropna(subset=["rate"]).reset_index(drop=True)
+
+
+def _matrix_currencies(config):
+    settings = config.get("cross_rates") or {}
+    currencies = settings.get("currencies") or [config.base_currency] + list(config.target_currencies)
+    return list(dict.fromkeys(currencies))
+
+
+def save_cross_matrix(date, currencies=None, raw_dir=RAW_DIR, output_dir=CROSS_DIR):
+    """
+    Grava a matriz de taxas cruzadas de um dia em gold/cross/<data>.parquet:
+    uma linha por moeda base e uma coluna por moeda cotada. As moedas vêm,
+    por defeito, de `cross_rates.currencies` no config.yaml ou, na sua
+    falta, da moeda base e de `target_currencies`. Devolve o caminho, ou
+    None se o registo raw do dia não existir.
+    """
+    config = load_config()
+    currencies = list(currencies or _matrix_currencies(config))
+    record_path = record_path_for(os.path.join(raw_dir, f"{date}.json"))
+    if not os.path.exists(record_path):
+        logging.warning(f"Registo raw {record_path} não encontrado. A matriz de taxas cruzadas de {date} não foi gerada.")
+        return None
+
+    table, _ = read_raw_record(record_path, currencies=currencies)
+    rates = dict(zip(table.column("currency").to_pylist(), table.column("rate").to_pylist()))
+    rates[config.base_currency] = 1.0
+    currencies = [c for c in currencies if c in rates]
+    values = np.array([[rates[c] for c in currencies]], dtype="float64")
+
+    matrix = pd.DataFrame(cross_tensor(values)[0], columns=currencies)
+    matrix.insert(0, "base_currency", currencies)
+
+    ensure_dir(output_dir)
+    path = os.path.join(output_dir, f"{date}.parquet")
+    matrix.to_parquet(path, index=False)
+    logging.info(f"Matriz de taxas cruzadas ({len(currencies)} moedas) salva em {path}")
+    return path
+
+
+def load_cross_matrix(date, output_dir=CROSS_DIR):
+    """Lê a matriz de taxas cruzadas de um dia, indexada pela moeda base."""
+    path = os.path.join(output_dir, f"{date}.parquet")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Matriz de taxas cruzadas não encontrada para a data {date}")
+    return pd.read_parquet(path).set_index("base_currency")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Deriva cotações face a outra moeda base a partir da camada raw")
+    parser.add_argument("--base", required=True, help="Moeda base (ex.: USD)")
+    parser.add_argument("--quotes", help="Moedas cotadas, separadas por vírgula (por defeito, todas)")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    quotes = [q.strip().upper() for q in args.quotes.split(",")] if args.quotes else None
+    print(cross_rates(args.base.upper(), quotes, args.start, args.end).to_csv(index=False), end="")
@@ -1,10 +1,37 @@
 import os
+import time
 import requests
 import json
-import yaml
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from src.utils import load_env, setup_logging, ensure_dir
+from requests.adapters import HTTPAdapter
+from src.utils import load_env, load_config, setup_logging, ensure_dir
+from src.raw_store import record_path_for, write_raw_record
+from src.instrumentation import count, timed
+
+# Códigos HTTP que indicam limite de pedidos ou falha temporária do servidor
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def _load_api_settings():
+    """
+    Lê a chave da API das variáveis de ambiente e a URL e a moeda base da
+    configuração partilhada (variáveis de ambiente com fallback para o
+    config.yaml; moeda base 'BRL' por defeito).
+    """
+    api_key = os.getenv("EXCHANGE_API_KEY")
+    if not api_key:
+        raise ValueError("A variável de ambiente EXCHANGE_API_KEY não foi encontrada.")
+
+    config = load_config()
+    if not config.exists:
+        logging.info("Ficheiro config.yaml não encontrado. A usar apenas variáveis de ambiente.")
+
+    if not config.api_url:
+        raise ValueError("URL da API não definida. Configure a variável de ambiente API_URL ou a chave 'api_url' no config.yaml.")
+
+    return api_key, config.api_url, config.base_currency
+
 
 def fetch_exchange_rates(date=None):
     """
@@ -24,44 +51,22 @@ def fetch_exchange_rates(date=None):
         return output_path
     # ------------------------------------
 
-    api_key = os.getenv("EXCHANGE_API_KEY")
-    if not api_key:
-        raise ValueError("A variável de ambiente EXCHANGE_API_KEY não foi encontrada.")
-
-    api_url = os.getenv("API_URL")
-    base_currency = os.getenv("BASE_CURRENCY")
-
-    if not api_url or not base_currency:
-        config_path = os.getenv("CONFIG_PATH", "config.yaml")
-        if os.path.exists(config_path):
-            logging.info(f"A carregar configurações do ficheiro de fallback: {config_path}")
-            with open(config_path, "r") as file:
-                config = yaml.safe_load(file)
-            if not api_url:
-                api_url = config.get("api_url")
-            if not base_currency:
-                base_currency = config.get("base_currency")
-        else:
-            logging.info("Ficheiro config.yaml não encontrado. A usar apenas variáveis de ambiente.")
-
-    if not api_url:
-        raise ValueError("URL da API não definida. Configure a variável de ambiente API_URL ou a chave 'api_url' no config.yaml.")
-    
-    if not base_currency:
-        base_currency = "BRL"
-        logging.info("Moeda base não definida, a usar 'BRL' como padrão.")
+    api_key, api_url, base_currency = _load_api_settings()
 
     url = f"{api_url}/{api_key}/latest/{base_currency}"
     logging.info("A buscar dados de câmbio...")
 
     try:
-        response = requests.get(url)
+        with timed("api_wait_seconds"):
+            response = requests.get(url)
+        count("api_requests")
+        _count_response_bytes(response)
         response.raise_for_status()
         data = response.json()
 
         ensure_dir("raw")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        _write_raw_json(data, output_path)
+        write_raw_record(data, record_path_for(output_path), date)
 
         logging.info(f"Dados guardados com sucesso em {output_path}")
         return output_path
@@ -69,3 +74,132 @@ def fetch_exchange_rates(date=None):
     except requests.exceptions.RequestException as e:
         logging.error(f"Erro na API: {e}. Resposta: {e.response.text if e.response else 'N/A'}")
         raise
+
+
+def _count_response_bytes(response):
+    content = getattr(response, "content", None)
+    if isinstance(content, bytes):
+        count("api_bytes_fetched", len(content))
+
+
+def _write_raw_json(data, output_path):
+    """Grava a resposta da API em JSON compacto e contabiliza os bytes escritos."""
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    count("raw_files_written")
+    count("raw_bytes_written", os.path.getsize(output_path))
+
+
+def raw_path_for(date, base_currency, default_base):
+    """
+    Caminho do ficheiro raw de uma data. A moeda base configurada mantém o nome
+    histórico raw/<data>.json; outras bases usam raw/<data>_<base>.json.
+    """
+    if base_currency == default_base:
+        return os.path.join("raw", f"{date}.json")
+    return os.path.join("raw", f"{date}_{base_currency}.json")
+
+
+def _build_session(pool_size):
+    """Sessão HTTP partilhada com um pool de ligações keep-alive do tamanho indicado."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get_json_with_retry(session, url, timeout, max_retries, backoff):
+    """
+    Faz o GET com timeout, repetindo em caso de erro de rede, 429 ou 5xx com
+    backoff exponencial. Quando a API envia Retry-After, esse tempo é respeitado.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            with timed("api_wait_seconds"):
+                response = session.get(url, timeout=timeout)
+            count("api_requests")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            continue
+
+        if response.status_code in RETRY_STATUS and attempt < max_retries:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                wait = float(retry_after)
+            except (TypeError, ValueError):
+                wait = backoff * 2 ** attempt
+            logging.warning(f"Resposta {response.status_code} da API. Nova tentativa em {wait:.1f}s.")
+            time.sleep(wait)
+            continue
+
+        _count_response_bytes(response)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("result") == "error":
+            raise ValueError(f"Erro devolvido pela API: {data.get('error-type', 'desconhecido')}")
+        return data
+
+
+def fetch_exchange_rates_bulk(dates, bases=None, max_workers=8, timeout=10, max_retries=3, backoff=0.5):
+    """
+    Busca em simultâneo as taxas de todos os pares (moeda base, data) para as
+    `dates` indicadas, com a moeda base configurada e as `bases` adicionais,
+    e guarda cada resposta na camada raw.
+
+    Os pedidos partilham uma única sessão HTTP com até `max_workers` ligações
+    keep-alive, e nunca há mais de `max_workers` pedidos em curso. A data de
+    hoje usa o endpoint 'latest'; datas passadas usam o endpoint 'history'.
+    Pares cujo ficheiro raw já existe são ignorados.
+
+    Devolve um dicionário {(base, data): caminho}, com None nos pares que falharam.
+    """
+    load_env()
+    setup_logging()
+
+    api_key, api_url, default_base = _load_api_settings()
+    today = datetime.today().strftime("%Y-%m-%d")
+
+    results = {}
+    pending = []
+    for base_currency in dict.fromkeys([default_base] + list(bases or [])):
+        for date in dict.fromkeys(dates):
+            output_path = raw_path_for(date, base_currency, default_base)
+            if os.path.exists(output_path):
+                results[(base_currency, date)] = output_path
+            else:
+                pending.append((base_currency, date, output_path))
+
+    if not pending:
+        return results
+
+    ensure_dir("raw")
+    session = _build_session(max_workers)
+
+    def fetch_one(item):
+        base_currency, date, output_path = item
+        if date == today:
+            url = f"{api_url}/{api_key}/latest/{base_currency}"
+        else:
+            day = datetime.strptime(date, "%Y-%m-%d")
+            url = f"{api_url}/{api_key}/history/{base_currency}/{day.year}/{day.month}/{day.day}"
+        data = _get_json_with_retry(session, url, timeout, max_retries, backoff)
+        _write_raw_json(data, output_path)
+        write_raw_record(data, record_path_for(output_path), date)
+        return output_path
+
+    logging.info(f"A buscar {len(pending)} pares (base, data) com até {max_workers} pedidos em simultâneo...")
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_one, item): item for item in pending}
+        for future, (base_currency, date, _) in futures.items():
+            try:
+                results[(base_currency, date)] = future.result()
+            except Exception as e:
+                logging.error(f"Falha ao buscar {base_currency} para {date}: {e}")
+                results[(base_currency, date)] = None
+
+    fetched = sum(1 for base_currency, date, _ in pending if results[(base_currency, date)])
+    logging.info(f"Ingestão concorrente concluída: {fetched}/{len(pending)} pares guardados.")
+    return results
@@ -0,0 +1,182 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import ensure_dir, load_config, load_env, setup_logging
+from src.llm_cache import cache_key, get_llm_cache
+from src.instrumentation import count
+
+# Janelas (dias) pré-calculadas; correspondem aos períodos terminados no dia da gold
+STANDARD_WINDOWS = (7, 30, 90)
+INSIGHTS_DIR = os.path.join("reports", "insights")
+
+INSIGHT_MODEL = "gpt-3.5-turbo"
+INSIGHT_SYSTEM_MESSAGE = "Você é um consultor financeiro sênior, focado em recomendações acionáveis."
+INSIGHT_TEMPERATURE = 0.5
+INSIGHT_MAX_TOKENS = 100
+
+
+def build_insight_prompt(currency, delta, volatility, avg_volatility):
+    """Prompt da recomendação de ação para uma moeda, partilhado com o dashboard."""
+    volatility_context = "acima da média do período (maior risco)" if volatility > avg_volatility else "abaixo da média do período (menor risco)"
+
+    return f"""
+    Aja como um consultor financeiro sênior, extremamente conciso e direto.
+    Contexto: A moeda {currency} está com uma variação de {delta:.2f}% em relação à sua média no período selecionado.
+    Sua volatilidade (risco) é de {volatility:.5f}, que está {volatility_context}.
+    Tarefa: Forneça uma única recomendação acionável em uma frase curta. Comece com "Ação Recomendada:".
+    Exemplo: "Ação Recomendada: Adiar compras não essenciais em {currency} devido à alta volatilidade e perda de força do BRL."
+    """
+
+
+def insight_key(prompt):
+    """Chave da cache da LLM para o prompt de insight; identifica a pergunta exata feita ao modelo."""
+    return cache_key(INSIGHT_MODEL, INSIGHT_SYSTEM_MESSAGE, prompt, INSIGHT_TEMPERATURE)
+
+
+def insights_path(date, base_currency):
+    return os.path.join(INSIGHTS_DIR, f"{date}_{base_currency}_insights.json")
+
+
+def window_start(date, window):
+    """Primeiro dia do período padrão de `window` dias que termina em `date`, como no filtro do dashboard."""
+    return (datetime.strptime(str(date), "%Y-%m-%d") - timedelta(days=window)).strftime("%Y-%m-%d")
+
+
+def _window_stats(metrics, date, window, currencies):
+    """Delta vs. média e volatilidade de cada moeda no período, e a volatilidade média entre elas."""
+    df = metrics.window(window_start(date, window), date, currencies)
+    if df.empty:
+        return df, None
+    df = df.assign(rate_std_period=df["rate_std_period"].fillna(0))
+    return df, float(df["rate_std_period"].mean())
+
+
+def generate_insights(date, gold_dir="gold", windows=STANDARD_WINDOWS, max_workers=4, requests_per_minute=60):
+    """
+    Pré-calcula a "Ação Recomendada" do dashboard para cada janela padrão e
+    cada moeda de `target_currencies`, para o período que termina em `date`,
+    e grava-as em reports/insights/<data>_<base>_insights.json.
+
+    A volatilidade média de referência é a de todas as moedas-alvo na janela.
+    Cada recomendação é gravada com a chave do prompt (`insight_key`), para
+    que o dashboard só a use quando o seu próprio prompt for idêntico.
+    As respostas passam pela cache em disco da LLM, que o dashboard também
+    consulta. Pedidos que falhem ficam de fora do ficheiro. Devolve o caminho
+    gravado, ou None se não houver dados.
+    """
+    from src.load import IncrementalGoldLoader
+    from src.rolling import RollingMetrics
+    from src.llm_summary import RateLimiter, get_openai_client
+
+    load_env()
+    setup_logging()
+
+    config = load_config()
+    df_history = IncrementalGoldLoader(gold_dir).load()
+    if df_history.empty:
+        logging.warning(f"Nenhum dado na gold para gerar insights de {date}.")
+        return None
+    metrics = RollingMetrics(df_history)
+    currencies = list(config.target_currencies) or None
+
+    # Prompts idênticos (ex.: moeda sem variação em várias janelas) são pedidos uma só vez
+    jobs = {}
+    result = {
+        "date": date,
+        "base_currency": config.base_currency,
+        "model": INSIGHT_MODEL,
+        "windows": {},
+    }
+    for window in windows:
+        df, avg_volatility = _window_stats(metrics, date, window, currencies)
+        if df.empty:
+            continue
+        entry = {
+            "start": window_start(date, window),
+            "end": date,
+            "avg_volatility": avg_volatility,
+            "currencies": {},
+        }
+        result["windows"][str(window)] = entry
+        for row in df.itertuples(index=False):
+            stats = {"delta_pct": float(row.delta_vs_period_pct), "volatility": float(row.rate_std_period)}
+            entry["currencies"][row.currency] = stats
+            prompt = build_insight_prompt(row.currency, stats["delta_pct"], stats["volatility"], avg_volatility)
+            stats["prompt_key"] = insight_key(prompt)
+            jobs.setdefault(prompt, []).append(stats)
+
+    if not jobs:
+        logging.warning(f"Nenhuma moeda com cotação nos períodos de {date}.")
+        return None
+
+    try:
+        client = get_openai_client()
+    except Exception as e:
+        logging.error(f"Erro ao criar o cliente da LLM para os insights de {date}: {e}")
+        return None
+    cache = get_llm_cache()
+    limiter = RateLimiter(requests_per_minute)
+
+    def gerar(prompt):
+        limiter.acquire()
+        insight = cache.completion(
+            client, INSIGHT_MODEL, INSIGHT_SYSTEM_MESSAGE, prompt,
+            temperature=INSIGHT_TEMPERATURE, max_tokens=INSIGHT_MAX_TOKENS,
+        )
+        for stats in jobs[prompt]:
+            stats["insight"] = insight
+
+    logging.info(f"A gerar {len(jobs)} insights para {date} ({len(result['windows'])} janelas).")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(gerar, prompt) for prompt in jobs]:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                logging.error(f"Erro ao gerar insight de {date}: {e}")
+    if failed == len(jobs):
+        return None
+
+    path = insights_path(date, config.base_currency)
+    ensure_dir(INSIGHTS_DIR)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    count("insights_written", len(jobs) - failed)
+    logging.info(f"Insights de {date} salvos em {path} ({failed} falhas).")
+    return path
+
+
+def load_insights(date, base_currency):
+    """Lê o ficheiro de insights pré-calculados de uma data, ou devolve None se não existir."""
+    path = insights_path(date, base_currency)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_insight(insights, start, end, currency, prompt=None):
+    """
+    Procura, num ficheiro já lido, a recomendação para `currency` no período
+    [start, end]. Só períodos padrão (terminados no dia do ficheiro) têm
+    resposta; para os restantes devolve None. Com `prompt`, a recomendação só
+    é devolvida se tiver sido gerada exatamente para esse prompt (ex.: o
+    dashboard com outra seleção de moedas tem outra volatilidade média).
+    """
+    if not insights or str(end) != insights.get("date"):
+        return None
+    window = (datetime.strptime(str(end), "%Y-%m-%d") - datetime.strptime(str(start), "%Y-%m-%d")).days
+    entry = insights.get("windows", {}).get(str(window), {})
+    stats = entry.get("currencies", {}).get(currency, {})
+    if prompt is not None and stats.get("prompt_key") != insight_key(prompt):
+        return None
+    return stats.get("insight")
+
+
+if __name__ == "__main__":
+    generate_insights(datetime.today().strftime("%Y-%m-%d"))
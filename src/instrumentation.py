@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Só usa a biblioteca padrão: é importado pelo run_pipeline.py no arranque.
+
+METRICS_DIR = "metrics"
+PROMETHEUS_PREFIX = "cambio_pipeline"
+
+_ACTIVE = None
+_ACTIVE_LOCK = threading.Lock()
+
+
+class RunMetrics:
+    """
+    Métricas de uma execução do pipeline: duração de cada etapa, tempos
+    acumulados (ex.: espera pela API ou pela LLM) e contadores (linhas,
+    bytes, tokens). Seguro para uso entre threads.
+    """
+
+    def __init__(self, command, date=None):
+        self.command = command
+        self.date = date
+        self.started_at = datetime.now()
+        self.status = "running"
+        self.stages = {}
+        self.timers = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Cronometra uma etapa e regista se terminou com sucesso ou falhou."""
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            yield self
+            status = "ok"
+        finally:
+            with self._lock:
+                self.stages[name] = {"seconds": round(time.perf_counter() - start, 6), "status": status}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "command": self.command,
+                "date": self.date,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "duration_seconds": round(time.perf_counter() - self._start, 6),
+                "status": self.status,
+                "stages": dict(self.stages),
+                "timers": {name: round(value, 6) for name, value in self.timers.items()},
+                "counters": dict(self.counters),
+            }
+
+    def write(self, metrics_dir=METRICS_DIR):
+        """Grava o registo JSON da execução em metrics/<data>_<comando>_<hora de início>.json."""
+        record = self.to_dict()
+        os.makedirs(metrics_dir, exist_ok=True)
+        name = f"{self.date or 'sem-data'}_{self.command}_{self.started_at:%Y%m%dT%H%M%S}.json"
+        path = os.path.join(metrics_dir, name)
+        _write_atomic(path, json.dumps(record, ensure_ascii=False, indent=2))
+        return path
+
+    def write_prometheus(self, path):
+        """
+        Exporta as métricas no formato de texto do Prometheus, para o coletor
+        textfile do node_exporter. O ficheiro é substituído atomicamente.
+        """
+        record = self.to_dict()
+        labels = f'command="{self.command}"'
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds{{{labels}}} {record['duration_seconds']}",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_success gauge",
+            f"{PROMETHEUS_PREFIX}_run_success{{{labels}}} {int(record['status'] == 'ok')}",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_timestamp_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_timestamp_seconds{{{labels}}} {int(self.started_at.timestamp())}",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_duration_seconds gauge",
+        ]
+        lines += [
+            f'{PROMETHEUS_PREFIX}_stage_duration_seconds{{{labels},stage="{stage}"}} {info["seconds"]}'
+            for stage, info in sorted(record["stages"].items())
+        ]
+        for section in ("timers", "counters"):
+            for name, value in sorted(record[section].items()):
+                metric = f"{PROMETHEUS_PREFIX}_{name}"
+                lines += [f"# TYPE {metric} gauge", f"{metric}{{{labels}}} {value}"]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _write_atomic(path, "\n".join(lines) + "\n")
+        return path
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def run_metrics(command, date=None, metrics_dir=None, prometheus_textfile=None):
+    """
+    Ativa a recolha de métricas durante o bloco e, no fim (mesmo em caso de
+    erro), grava o registo JSON e, se indicado, o textfile do Prometheus.
+    Por defeito, ambos os destinos vêm da secção `metrics` do config.yaml.
+    """
+    global _ACTIVE
+    metrics = RunMetrics(command, date)
+    with _ACTIVE_LOCK:
+        previous, _ACTIVE = _ACTIVE, metrics
+    try:
+        yield metrics
+        metrics.status = "ok"
+    except BaseException:
+        metrics.status = "failed"
+        raise
+    finally:
+        with _ACTIVE_LOCK:
+            _ACTIVE = previous
+        if metrics_dir is None or prometheus_textfile is None:
+            from src.utils import load_config
+            settings = load_config().get("metrics") or {}
+            metrics_dir = metrics_dir or settings.get("dir", METRICS_DIR)
+            prometheus_textfile = prometheus_textfile or settings.get("prometheus_textfile")
+        metrics.write(metrics_dir)
+        if prometheus_textfile:
+            metrics.write_prometheus(prometheus_textfile)
+
+
+def current_metrics():
+    """Execução com métricas ativa neste processo, ou None."""
+    return _ACTIVE
+
+
+def count(name, value=1):
+    """Soma `value` ao contador `name` da execução ativa; sem execução ativa, não faz nada."""
+    metrics = _ACTIVE
+    if metrics is not None:
+        metrics.add(name, value)
+
+
+@contextmanager
+def timed(name):
+    """Acumula a duração do bloco no tempo `name` da execução ativa (ex.: 'llm_wait_seconds')."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _ACTIVE
+        if metrics is not None:
+            metrics.add_time(name, time.perf_counter() - start)
+
+
+@contextmanager
+def stage(name):
+    """Cronometra uma etapa na execução ativa; sem execução ativa, apenas executa o bloco."""
+    metrics = _ACTIVE
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(name):
+        yield
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import glob
+import hashlib
+import logging
+import threading
+import queue
+from src.utils import ensure_dir, load_config, setup_logging
+from src.instrumentation import count, timed
+
+# Valores por defeito da secção `llm_cache` do config.yaml
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_SIZE_MB = 50
+DEFAULT_MAX_AGE_DAYS = 30
+
+_CACHES = {}
+# Marca o fim de um fluxo produzido em segundo plano
+_END_OF_STREAM = object()
+
+
+def cache_key(model, system_message, prompt, temperature=None):
+    """Hash SHA-256 de (modelo, mensagem de sistema, prompt, temperatura)."""
+    payload = json.dumps(
+        {"model": model, "system": system_message, "prompt": prompt, "temperature": temperature},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache persistente de respostas da LLM, endereçada pelo conteúdo do pedido.
+
+    Cada resposta é guardada num ficheiro JSON `<dir>/<ab>/<hash>.json`,
+    gravado de forma atómica, para que vários processos (pipeline e
+    dashboard) a possam partilhar. Entradas mais antigas que `max_age_days`
+    são tratadas como falhas e removidas; quando o tamanho total passa de
+    `max_size_mb`, as entradas usadas há mais tempo são apagadas primeiro
+    (um acerto atualiza o mtime do ficheiro).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None
+        self.max_age = max_age_days * 86400 if max_age_days is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Devolve a resposta guardada para `key`, ou None se não existir ou tiver expirado."""
+        path = self._path(key)
+        try:
+            age = time.time() - os.stat(path).st_mtime
+            if self.max_age is not None and age > self.max_age:
+                os.remove(path)
+                entry = None
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count("llm_cache_misses" if entry is None else "llm_cache_hits")
+        return entry["response"] if entry is not None else None
+
+    def set(self, key, response, model=None):
+        """
+        Guarda a resposta de forma atómica. O tamanho total é seguido em
+        memória e o diretório só é percorrido quando o limite é ultrapassado.
+        """
+        path = self._path(key)
+        ensure_dir(os.path.dirname(path))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "created": time.time(), "response": response}, f, ensure_ascii=False)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry_size for _, entry_size, _ in self._entries())
+            else:
+                self._size += size
+            over_limit = self.max_bytes is not None and self._size > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*", "*.json")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove as entradas expiradas e, acima do limite de tamanho, as menos usadas. Devolve quantas removeu."""
+        entries = self._entries()
+        now = time.time()
+        removed = 0
+        kept = []
+        for mtime, size, path in entries:
+            if self.max_age is not None and now - mtime > self.max_age:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        if self.max_bytes is not None:
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+        with self._lock:
+            self._size = total
+        if removed:
+            logging.info(f"Cache da LLM: {removed} entradas removidas de {self.cache_dir}")
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def stats(self):
+        """Contadores de acertos/falhas deste processo e ocupação atual em disco."""
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+        }
+
+    def completion(self, client, model, system_message, prompt, temperature=None, **kwargs):
+        """
+        Devolve o texto da resposta do modelo para o prompt, consultando
+        primeiro a cache. Só respostas bem-sucedidas são guardadas; os erros
+        da API propagam-se ao chamador. `client` pode ser um cliente OpenAI ou
+        o próprio módulo `openai`.
+        """
+        key = cache_key(model, system_message, prompt, temperature)
+        cached = self.get(key)
+        if cached is not None:
+            logging.info(f"Resposta da LLM servida da cache ({key[:12]}).")
+            return cached
+
+        with timed("llm_wait_seconds"):
+            chat_completion = client.chat.completions.create(
+                **_request_params(model, system_message, prompt, temperature, kwargs)
+            )
+        count("llm_requests")
+        _count_usage(getattr(chat_completion, "usage", None))
+        response = chat_completion.choices[0].message.content.strip()
+        self.set(key, response, model=model)
+        return response
+
+    def stream_completion(self, client, model, system_message, prompt, temperature=None, **kwargs):
+        """
+        Como `completion`, mas devolve um gerador de fragmentos de texto à
+        medida que o modelo os produz. Uma resposta em cache é devolvida de
+        imediato, num único fragmento; uma resposta nova só é guardada depois
+        de o fluxo terminar sem erros.
+        """
+        key = cache_key(model, system_message, prompt, temperature)
+        cached = self.get(key)
+        if cached is not None:
+            logging.info(f"Resposta da LLM servida da cache ({key[:12]}).")
+            yield cached
+            return
+
+        stream = client.chat.completions.create(
+            stream=True, **_request_params(model, system_message, prompt, temperature, kwargs)
+        )
+        count("llm_requests")
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        response = "".join(parts).strip()
+        if response:
+            self.set(key, response, model=model)
+
+
+def _count_usage(usage):
+    """Contabiliza os tokens consumidos, quando a resposta os indica."""
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            count(f"llm_{field}", value)
+
+
+def _request_params(model, system_message, prompt, temperature, extra):
+    params = dict(extra)
+    if temperature is not None:
+        params["temperature"] = temperature
+    params["model"] = model
+    params["messages"] = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt},
+    ]
+    return params
+
+
+def stream_in_background(chunks):
+    """
+    Consome o iterável `chunks` numa thread em segundo plano e devolve um
+    gerador que entrega os fragmentos à medida que chegam. O pedido começa
+    logo, sem esperar pelo consumidor; uma exceção do produtor é relançada
+    no gerador.
+    """
+    buffer = queue.Queue()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                buffer.put(chunk)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            buffer.put(_END_OF_STREAM)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    def consume():
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    return consume()
+
+
+def get_llm_cache():
+    """
+    Cache partilhada no processo, configurada pela secção `llm_cache` do
+    config.yaml (`dir`, `max_size_mb`, `max_age_days`). É recriada se a
+    configuração ou o diretório resolvido mudarem.
+    """
+    settings = load_config().get("llm_cache") or {}
+    cache_dir = os.path.abspath(settings.get("dir", DEFAULT_CACHE_DIR))
+    max_size_mb = settings.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+    max_age_days = settings.get("max_age_days", DEFAULT_MAX_AGE_DAYS)
+    key = (cache_dir, max_size_mb, max_age_days)
+    if key not in _CACHES:
+        _CACHES.clear()
+        _CACHES[key] = LLMCache(cache_dir, max_size_mb, max_age_days)
+    return _CACHES[key]
+
+
+if __name__ == "__main__":
+    setup_logging()
+    cache = get_llm_cache()
+    cache.evict()
+    stats = cache.stats()
+    logging.info(f"Cache da LLM em {cache.cache_dir}: {stats['entries']} entradas, {stats['size_bytes'] / 1024:.1f} KiB")
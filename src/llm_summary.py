@@ -1,12 +1,29 @@
 import os
+import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-import yaml
 from datetime import datetime
-from src.utils import setup_logging, ensure_dir, load_env
+from src.utils import setup_logging, ensure_dir, load_env, load_config
+from src.llm_cache import get_llm_cache
+from src.prompt_context import HistoryContext, format_context
+from src.instrumentation import count
+from src.report_index import update_report_index
 from openai import OpenAI
 logger = logging.getLogger(__name__)
 
+SYSTEM_MESSAGE = (
+    "Você é um consultor financeiro sênior. "
+    "Escreva de forma clara e acessível para executivos não-técnicos."
+)
+MODEL = "gpt-4o-mini"
+# Estimativa de tokens da resposta, usada pelo limitador antes da chamada
+COMPLETION_TOKENS_ESTIMATE = 500
+
+_CLIENTS = {}
+
 
 def load_gold_data(date):
     """Carrega os dados do ficheiro Parquet na pasta 'gold/' para a data especificada."""
@@ -15,11 +32,30 @@ def load_gold_data(date):
         logging.error(f"Ficheiro {gold_path} não encontrado.")
         raise FileNotFoundError(f"Ficheiro {gold_path} não encontrado.")
     logging.info(f"A carregar dados de {gold_path}")
-    return pd.read_parquet(gold_path)
+    return select_llm_currencies(pd.read_parquet(gold_path))
+
 
+def select_llm_currencies(df):
+    """
+    Restringe os dados às `target_currencies` do config.yaml, que são as
+    moedas analisadas pela LLM mesmo quando a gold guarda o universo completo.
+    Sem moedas-alvo configuradas, devolve os dados sem alterações.
+    """
+    targets = load_config().target_currencies
+    if not targets or df.empty:
+        return df
+    return df[df["currency"].isin(targets)].reset_index(drop=True)
 
-def gerar_prompt(df, date, top_n=5):
-    """Gera um prompt avançado para a LLM com destaques e contexto."""
+
+def gerar_prompt(df, date, top_n=5, context=None):
+    """
+    Gera um prompt avançado para a LLM com destaques e contexto. Se
+    `context` (ver `HistoryContext.for_date`) for indicado, o prompt inclui
+    as tendências, sequências, máximas/mínimas e regime de volatilidade das
+    moedas em destaque. As moedas assinaladas pela deteção de anomalias da
+    gold (coluna `is_anomaly`) são listadas numa secção própria.
+    """
+    texto_anomalias = format_anomalies(df)
     df_copy = df.copy()
 
     if "daily_change_pct" not in df_copy.columns:
@@ -34,9 +70,8 @@ def gerar_prompt(df, date, top_n=5):
     ).head(top_n)
 
     texto_principais_moedas = "\n".join([
-        f"- {row['currency']}: {row['rate']:.4f} "
-        f"(Variação diária: {row['daily_change_pct']:.2%})"
-        for _, row in df_copy.iterrows()
+        f"- {currency}: {rate:.4f} (Variação diária: {change:.2%})"
+        for currency, rate, change in zip(df_copy["currency"], df_copy["rate"], df_copy["daily_change_pct"])
     ])
 
     max_change = df_copy["daily_change_pct"].max()
@@ -56,12 +91,20 @@ def gerar_prompt(df, date, top_n=5):
             "sem variações significativas entre as moedas analisadas."
         )
 
+    texto_contexto = ""
+    if context is not None and not context.empty:
+        ordem = {currency: i for i, currency in enumerate(df_copy["currency"])}
+        destaques = context[context["currency"].isin(ordem)]
+        texto_historico = format_context(destaques.sort_values(by="currency", key=lambda c: c.map(ordem)))
+        if texto_historico:
+            texto_contexto = f"\n**Contexto Histórico:**\n{texto_historico}\n"
+
     prompt = f"""
 **Contexto:** Análise das cotações em relação ao Real Brasileiro (BRL) na data {date}.
 
 **Dados Principais:**
 {texto_principais_moedas}
-{texto_destaques}
+{texto_destaques}{texto_contexto}{texto_anomalias}
 
 **Tarefa:**
 Escreva um resumo executivo (máx. 3 parágrafos) que aborde:
@@ -72,6 +115,105 @@ Escreva um resumo executivo (máx. 3 parágrafos) que aborde:
     return prompt.strip()
 
 
+def format_anomalies(df):
+    """Secção do prompt com as anomalias já gravadas na gold, ou "" se não houver nenhuma."""
+    if "is_anomaly" not in df.columns:
+        return ""
+    flagged = df[df["is_anomaly"].fillna(False).astype(bool)]
+    if flagged.empty:
+        return ""
+    linhas = []
+    for currency, zscore, mad_score, is_jump in zip(
+        flagged["currency"], flagged["anomaly_zscore"], flagged["anomaly_mad_score"], flagged["is_jump"],
+    ):
+        detalhes = [f"{nome} {valor:+.1f}" for nome, valor in (("z-score", zscore), ("MAD", mad_score)) if pd.notna(valor)]
+        if is_jump:
+            detalhes.append("salto abrupto")
+        linhas.append(f"- {currency}: variação diária fora do padrão recente ({', '.join(detalhes)})")
+    return "\n**Anomalias Detetadas:**\n" + "\n".join(linhas) + "\n"
+
+
+def load_history_context(gold_dir="gold"):
+    """
+    Constrói o contexto histórico a partir de todo o histórico da gold. Em
+    caso de erro, regista-o e devolve None, para que o resumo seja gerado
+    sem essa secção.
+    """
+    from src.load import IncrementalGoldLoader
+    try:
+        df_history = select_llm_currencies(IncrementalGoldLoader(gold_dir).load())
+        return HistoryContext(df_history) if not df_history.empty else None
+    except Exception as e:
+        logging.error(f"Erro ao construir o contexto histórico: {e}")
+        return None
+
+
+def get_openai_client():
+    """
+    Cliente OpenAI partilhado no processo, reutilizando o pool de ligações
+    HTTP. É recriado se a chave ou a URL base mudarem.
+    """
+    key = (os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
+    if key not in _CLIENTS:
+        _CLIENTS.clear()
+        _CLIENTS[key] = OpenAI()
+    return _CLIENTS[key]
+
+
+class RateLimiter:
+    """
+    Limitador de pedidos e tokens por minuto, numa janela deslizante de 60 s,
+    seguro para uso entre threads. `acquire` bloqueia até haver capacidade.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, period=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.period:
+                    self._events.popleft()
+                used_tokens = sum(t for _, t in self._events)
+                requests_ok = self.requests_per_minute is None or len(self._events) < self.requests_per_minute
+                tokens_ok = (
+                    self.tokens_per_minute is None
+                    or not self._events
+                    or used_tokens + tokens <= self.tokens_per_minute
+                )
+                if requests_ok and tokens_ok:
+                    self._events.append((now, tokens))
+                    return
+                wait = self.period - (now - self._events[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+def _report_path(date, base_currency):
+    return os.path.join("reports", f"{date}_{base_currency}_summary.txt")
+
+
+def _salvar_relatorio(report_path, resumo):
+    ensure_dir("reports")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(resumo)
+    update_report_index(report_path, resumo)
+    count("reports_written")
+    logging.info(f"Resumo salvo em {report_path}")
+
+
+def _chamar_llm(client, prompt_usuario):
+    """
+    Envia o prompt ao modelo e devolve o texto do resumo. Prompts idênticos a
+    um já respondido são servidos da cache em disco (ver src/llm_cache.py).
+    """
+    return get_llm_cache().completion(client, MODEL, SYSTEM_MESSAGE, prompt_usuario)
+
+
 def gerar_resumo_llm(date=None, top_n=5, save=True):
     """Gera resumo executivo usando LLM e salva em /reports/ (opcional)."""
     load_env()
@@ -80,14 +222,9 @@ def gerar_resumo_llm(date=None, top_n=5, save=True):
     if date is None:
         date = datetime.today().strftime("%Y-%m-%d")
 
-    config_path = "config.yaml"
-    base_currency = "BRL"
-    if os.path.exists(config_path):
-        with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
-        base_currency = config.get("base_currency", "BRL")
+    base_currency = load_config().base_currency
 
-    report_path = os.path.join("reports", f"{date}_{base_currency}_summary.txt")
+    report_path = _report_path(date, base_currency)
 
     if save and os.path.exists(report_path):
         logging.info(f"Relatório para {date} já existe em {report_path}.")
@@ -96,32 +233,17 @@ def gerar_resumo_llm(date=None, top_n=5, save=True):
 
     try:
         logger.info("Enviando dados para análise pela LLM...")
-        client = OpenAI()
+        client = get_openai_client()
         df = load_gold_data(date)
-        prompt_usuario = gerar_prompt(df, date, top_n=top_n)
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Você é um consultor financeiro sênior. "
-                        "Escreva de forma clara e acessível para executivos não-técnicos."
-                    ),
-                },
-                {"role": "user", "content": prompt_usuario},
-            ],
-            model="gpt-4o-mini",
-        )
+        history = load_history_context()
+        context = history.for_date(date) if history is not None else None
+        prompt_usuario = gerar_prompt(df, date, top_n=top_n, context=context)
 
-        resumo = chat_completion.choices[0].message.content.strip()
+        resumo = _chamar_llm(client, prompt_usuario)
 
         if save:
-            ensure_dir("reports")
-            with open(report_path, "w", encoding="utf-8") as f:
-                f.write(resumo)
-            logging.info(resumo)    
-            logging.info(f"Resumo salvo em {report_path}")
+            logging.info(resumo)
+            _salvar_relatorio(report_path, resumo)
 
         return resumo
 
@@ -130,5 +252,50 @@ def gerar_resumo_llm(date=None, top_n=5, save=True):
         return f"Erro ao gerar resumo: {e}"
 
 
+def gerar_resumos_llm(dates, top_n=5, max_workers=4, requests_per_minute=60, tokens_per_minute=None):
+    """
+    Gera os resumos de várias datas em simultâneo, com um único cliente
+    OpenAI partilhado, no máximo `max_workers` pedidos em curso e limites de
+    pedidos/tokens por minuto. Datas cujo relatório já existe são ignoradas e
+    cada relatório é gravado assim que a sua resposta chega.
+
+    Devolve um dicionário {data: resumo}, com a mensagem de erro nas datas que falharam.
+    """
+    load_env()
+    setup_logging()
+
+    base_currency = load_config().base_currency
+    pending = [d for d in dict.fromkeys(dates) if not os.path.exists(_report_path(d, base_currency))]
+    logging.info(f"{len(pending)} de {len(set(dates))} datas sem relatório. A gerar com {max_workers} pedidos em simultâneo.")
+    if not pending:
+        return {}
+
+    client = get_openai_client()
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    # O contexto de todas as datas sai de uma única passagem pelo histórico
+    history = load_history_context()
+
+    def gerar(date):
+        context = history.for_date(date) if history is not None else None
+        prompt_usuario = gerar_prompt(load_gold_data(date), date, top_n=top_n, context=context)
+        # Estimativa grosseira: ~4 caracteres por token
+        limiter.acquire(len(SYSTEM_MESSAGE + prompt_usuario) // 4 + COMPLETION_TOKENS_ESTIMATE)
+        resumo = _chamar_llm(client, prompt_usuario)
+        _salvar_relatorio(_report_path(date, base_currency), resumo)
+        return resumo
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(gerar, date): date for date in pending}
+        for future in as_completed(futures):
+            date = futures[future]
+            try:
+                results[date] = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao gerar resumo de {date}: {e}")
+                results[date] = f"Erro ao gerar resumo: {e}"
+    return results
+
+
 if __name__ == "__main__":
     gerar_resumo_llm()
@@ -1,16 +1,83 @@
 import pandas as pd
 import os
+import glob
+import uuid
+import shutil
 import logging
+import threading
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
-from src.utils import ensure_dir, setup_logging
+from src.utils import ensure_dir, load_config, setup_logging
+from src.instrumentation import count
+from src.cross_rates import save_cross_matrix
+from src.anomaly import anomaly_settings, detect_anomalies
+from src.shared_history import list_gold_partitions
 
-def save_to_gold(date=None):
+# Histórico consolidado da camada gold, particionado por ano/mês (estilo Hive).
+HISTORY_DIR = os.path.join("gold", "history")
+# O mesmo para a silver, fonte da janela de cotações anteriores da gold
+SILVER_HISTORY_DIR = os.path.join("silver", "history")
+
+# Janelas (em dias) das variações e volatilidades pré-calculadas na gold
+DEFAULT_WINDOWS = [7, 30, 90]
+# Dias extra lidos antes da maior janela, para encontrar uma observação de referência
+GAP_TOLERANCE_DAYS = 7
+
+
+def _silver_index(silver_dir="silver"):
+    """Índice ordenado das datas (YYYY-MM-DD) com ficheiro diário na camada silver."""
+    return sorted(
+        os.path.basename(path).split(".")[0]
+        for path in glob.glob(os.path.join(silver_dir, "*.parquet"))
+    )
+
+
+def _load_silver_window(start, end):
+    """
+    Cotações (date, currency, rate) da silver entre `start` e `end`,
+    inclusive, numa única leitura filtrada de silver/history/. O histórico é
+    reconstruído se não existir ou se lhe faltar algum dia que tenha ficheiro
+    diário (ex.: silver gravada fora de `transform_to_silver`).
+    """
+    columns = ["date", "currency", "rate"]
+    expected = {d for d in _silver_index() if start.strftime("%Y-%m-%d") <= d <= end.strftime("%Y-%m-%d")}
+    df = None
+    if os.path.exists(SILVER_HISTORY_DIR):
+        df = _scan_history(SILVER_HISTORY_DIR, start=start, end=end, columns=columns)
+        df["date"] = pd.to_datetime(df["date"])
+    if df is None or not expected <= set(df["date"].dt.strftime("%Y-%m-%d")):
+        logging.info("Histórico consolidado da silver em falta ou incompleto; a reconstruir.")
+        rebuild_silver_history()
+        df = _scan_history(SILVER_HISTORY_DIR, start=start, end=end, columns=columns)
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def save_to_gold(date=None, update_history=True):
     """
     Carrega os dados da camada silver e os enriquece com a variação
     percentual diária antes de salvar na camada gold.
+
+    A variação diária é calculada face à observação anterior mais recente de
+    cada moeda (e não apenas face ao dia anterior), para que falhas da API
+    não a anulem. As cotações anteriores vêm de silver/history/, numa única
+    leitura filtrada pela janela mais longa. Para cada janela N de
+    `gold_windows` no config.yaml (por defeito 7, 30 e 90 dias) são também
+    calculadas a variação face à última observação até N dias antes
+    (`change_<N>d_pct`) e o desvio padrão da cotação nos últimos N dias
+    (`volatility_<N>d`). A variação diária recebe ainda os scores e flags de
+    anomalia de `src.anomaly.detect_anomalies`.
+
+    Com `cross_rates.enabled` no config.yaml, grava também a matriz de taxas
+    cruzadas do dia em gold/cross/ (ver `src.cross_rates`).
+
+    Com `update_history=True`, o dia é também acrescentado ao histórico
+    consolidado em gold/history/ (ver `append_to_gold_history`).
     """
     setup_logging()
-    
+
     # Carregar dados da camada silver para a data atual
     silver_path = os.path.join("silver", f"{date}.parquet")
     if not os.path.exists(silver_path):
@@ -18,38 +85,292 @@ def save_to_gold(date=None):
 
     df_today = pd.read_parquet(silver_path)
 
-    # Calcular a data do dia anterior
-    current_date_obj = datetime.strptime(date, "%Y-%m-%d")
-    previous_date_obj = current_date_obj - timedelta(days=1)
-    previous_date_str = previous_date_obj.strftime("%Y-%m-%d")
-    
-    previous_silver_path = os.path.join("silver", f"{previous_date_str}.parquet")
-
-    if os.path.exists(previous_silver_path):
-        logging.info(f"Dados do dia anterior ({previous_date_str}) encontrados. Calculando a variação percentual.")
-        df_yesterday = pd.read_parquet(previous_silver_path)
-        
-        df_yesterday = df_yesterday[['currency', 'rate']].rename(columns={'rate': 'rate_yesterday'})
-        
-        df_gold = pd.merge(df_today, df_yesterday, on='currency', how='left')
-        
-        df_gold['daily_change_pct'] = ((df_gold['rate'] - df_gold['rate_yesterday']) / df_gold['rate_yesterday']) * 100
-        
-        df_gold['daily_change_pct'] = df_gold['daily_change_pct'].fillna(0.0)
-        
-        df_gold = df_gold.drop(columns=['rate_yesterday'])
-        
+    config = load_config()
+    windows = sorted(int(w) for w in config.get("gold_windows", DEFAULT_WINDOWS))
+    current_date = pd.Timestamp(date)
+    lookback = max(windows + [int(anomaly_settings(config)["window_days"])])
+    oldest = current_date - timedelta(days=lookback + GAP_TOLERANCE_DAYS)
+    df_prior = _load_silver_window(oldest, current_date - timedelta(days=1))
+    prior_dates = sorted(df_prior["date"].dt.strftime("%Y-%m-%d").unique())
+
+    # Matriz data × moeda com o dia atual na última linha
+    df_window = pd.concat([
+        df_prior if prior_dates else None,
+        df_today[["currency", "rate"]].assign(date=current_date),
+    ], ignore_index=True)
+    pivot = df_window.pivot_table(index="date", columns="currency", values="rate", aggfunc="last").sort_index()
+    filled = pivot.ffill()
+    today_rates = pivot.iloc[-1]
+
+    df_gold = df_today.copy()
+    if prior_dates:
+        logging.info(f"Observação anterior mais recente: {prior_dates[-1]}. Calculando a variação percentual.")
+        previous = filled.iloc[-2] if len(filled) > 1 else pd.Series(dtype="float64")
+        daily_change = (today_rates - previous) / previous * 100
+        df_gold["daily_change_pct"] = df_gold["currency"].map(daily_change).fillna(0.0)
     else:
-        logging.warning(f"Dados do dia anterior ({previous_date_str}) não encontrados. A variação diária será definida como 0.")
-        df_gold = df_today.copy()
-        df_gold['daily_change_pct'] = 0.0
+        logging.warning(f"Nenhuma observação anterior a {date} na silver. A variação diária será definida como 0.")
+        df_gold["daily_change_pct"] = 0.0
+
+    for window in windows:
+        reference_date = current_date - timedelta(days=window)
+        position = pivot.index.searchsorted(reference_date, side="right") - 1
+        if position >= 0:
+            reference = filled.iloc[position]
+            change = (today_rates - reference) / reference * 100
+        else:
+            change = pd.Series(dtype="float64")
+        volatility = pivot[pivot.index > reference_date].std()
+        df_gold[f"change_{window}d_pct"] = df_gold["currency"].map(change).astype("float64")
+        df_gold[f"volatility_{window}d"] = df_gold["currency"].map(volatility).astype("float64")
+
+    # Scores de anomalia da variação diária (ver src/anomaly.py)
+    df_gold = detect_anomalies(
+        df_gold, date,
+        previous_date=prior_dates[-1] if prior_dates else None,
+        prior_rates=filled.iloc[:-1],
+    )
 
     # Salvar na camada gold
     ensure_dir("gold")
     gold_path = os.path.join("gold", f"{date}.parquet")
     df_gold.to_parquet(gold_path, index=False)
+    count("gold_rows_written", len(df_gold))
+    count("gold_bytes_written", os.path.getsize(gold_path))
     logging.info(f"Dados enriquecidos da camada gold salvos com sucesso em {gold_path}")
 
+    if (config.get("cross_rates") or {}).get("enabled"):
+        save_cross_matrix(date)
+
+    if update_history:
+        append_to_gold_history(df_gold, date)
+
+
+def _partition_path(year, month, history_dir=HISTORY_DIR):
+    """Caminho do ficheiro da partição ano/mês no histórico consolidado."""
+    return os.path.join(history_dir, f"year={year}", f"month={month:02d}", "part-0.parquet")
+
+
+def _write_partition(df, year, month, history_dir=HISTORY_DIR):
+    """
+    Grava uma partição ordenada por data/moeda, de forma atómica, para que os
+    leitores nunca vejam um ficheiro incompleto. A ordenação mantém as
+    estatísticas de cada row group estreitas para o predicate pushdown.
+    """
+    df = df.sort_values(by=["date", "currency"]).reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.set_column(
+        table.schema.get_field_index("date"), "date", table.column("date").cast(pa.date32())
+    )
+    path = _partition_path(year, month, history_dir)
+    ensure_dir(os.path.dirname(path))
+    # Ficheiros começados por "." são ignorados pelos leitores do dataset.
+    tmp_path = os.path.join(os.path.dirname(path), ".part-0.parquet.tmp")
+    pq.write_table(table, tmp_path, write_statistics=True)
+    os.replace(tmp_path, path)
+
+
+def _append_to_history(df, date, history_dir, rebuild):
+    """
+    Acrescenta (ou substitui) um dia num histórico consolidado, reescrevendo
+    apenas a partição do mês. Se o histórico ainda não existir, chama
+    `rebuild` para o reconstruir a partir de todos os ficheiros diários.
+    """
+    if not os.path.exists(history_dir):
+        rebuild()
+        return
+
+    date_obj = datetime.strptime(date, "%Y-%m-%d").date()
+    df_day = df.copy()
+    df_day["date"] = date_obj
+
+    path = _partition_path(date_obj.year, date_obj.month, history_dir)
+    if os.path.exists(path):
+        df_month = pd.read_parquet(path)
+        df_month = df_month[df_month["date"] != date_obj]
+        df_day = pd.concat([df_month, df_day], ignore_index=True)
+
+    _write_partition(df_day, date_obj.year, date_obj.month, history_dir)
+    logging.info(f"Histórico consolidado atualizado para {date} em {path}")
+
+
+def _rebuild_history(daily_dir, history_dir):
+    """
+    Reconstrói um histórico consolidado a partir de todos os ficheiros
+    diários de `daily_dir`. As partições são gravadas numa pasta temporária
+    que depois substitui `history_dir`, para que meses cujos ficheiros
+    diários foram apagados deixem de ser servidos.
+    """
+    df_list = []
+    for file in sorted(glob.glob(os.path.join(daily_dir, "*.parquet"))):
+        df = pd.read_parquet(file)
+        df["date"] = datetime.strptime(os.path.basename(file).split(".")[0], "%Y-%m-%d").date()
+        df_list.append(df)
+
+    if not df_list:
+        logging.warning(f"Nenhum ficheiro encontrado em {daily_dir}/ para reconstruir o histórico.")
+        if os.path.exists(history_dir):
+            shutil.rmtree(history_dir)
+        return
+
+    # Pastas começadas por "." ficam fora do histórico e dos ficheiros diários
+    parent = os.path.dirname(history_dir)
+    tmp_dir = os.path.join(parent, f".history.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    df_all = pd.concat(df_list, ignore_index=True)
+    years = df_all["date"].map(lambda d: d.year)
+    months = df_all["date"].map(lambda d: d.month)
+    for (year, month), df_month in df_all.groupby([years, months]):
+        _write_partition(df_month, year, month, tmp_dir)
+
+    # Um diretório não vazio não pode ser substituído com os.replace: o
+    # antigo é primeiro afastado e só apagado depois da troca
+    old_dir = None
+    if os.path.exists(history_dir):
+        old_dir = os.path.join(parent, f".history.{os.getpid()}.{uuid.uuid4().hex}.old")
+        os.replace(history_dir, old_dir)
+    os.replace(tmp_dir, history_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    logging.info(f"Histórico consolidado reconstruído com {len(df_list)} dias em {history_dir}")
+
+
+def _scan_history(history_dir, start=None, end=None, currencies=None, columns=None):
+    """
+    Lê um histórico consolidado numa única leitura, com filtros empurrados
+    para o Parquet (partições ano/mês e estatísticas por row group).
+    """
+    if not os.path.exists(history_dir):
+        raise FileNotFoundError(f"Histórico consolidado não encontrado em {history_dir}")
+
+    dataset = ds.dataset(history_dir, format="parquet", partitioning="hive")
+    schema = pa.unify_schemas(
+        [fragment.physical_schema for fragment in dataset.get_fragments()] + [dataset.partitioning.schema]
+    )
+    dataset = ds.dataset(history_dir, format="parquet", partitioning="hive", schema=schema)
+
+    expression = None
+    conditions = []
+    if start is not None:
+        start = pd.to_datetime(start).date()
+        conditions += [ds.field("year") >= start.year, ds.field("date") >= start]
+    if end is not None:
+        end = pd.to_datetime(end).date()
+        conditions += [ds.field("year") <= end.year, ds.field("date") <= end]
+    if currencies is not None:
+        conditions.append(ds.field("currency").isin(list(currencies)))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    df = df.drop(columns=[c for c in ("year", "month") if c in df.columns])
+    if "date" in df.columns:
+        df = df.sort_values(by="date", kind="stable").reset_index(drop=True)
+    return df
+
+
+def append_to_gold_history(df_gold, date):
+    """
+    Acrescenta (ou substitui) um dia no histórico consolidado da camada gold.
+    Apenas a partição do mês do dia é reescrita. Se o histórico ainda não
+    existir, é reconstruído a partir de todos os ficheiros diários da gold.
+    """
+    _append_to_history(df_gold, date, HISTORY_DIR, rebuild_gold_history)
+
+
+def rebuild_gold_history(gold_dir="gold"):
+    """
+    Reconstrói o histórico consolidado a partir de todos os ficheiros diários
+    da gold, substituindo gold/history/ por inteiro (ver `_rebuild_history`).
+    """
+    _rebuild_history(gold_dir, HISTORY_DIR)
+
+
+def load_gold_history(start=None, end=None, currencies=None, columns=None):
+    """
+    Lê o histórico consolidado da gold numa única leitura, com filtros
+    empurrados para o Parquet (partições ano/mês e estatísticas por row group).
+    `start` e `end` aceitam datas ou strings YYYY-MM-DD e são inclusivos.
+    Partições gravadas antes de novas colunas existirem devolvem-nas a nulo.
+    """
+    return _scan_history(HISTORY_DIR, start, end, currencies, columns)
+
+
+def append_to_silver_history(df_silver, date):
+    """
+    Acrescenta (ou substitui) um dia no histórico consolidado da silver
+    (silver/history/), de onde `save_to_gold` lê a janela de cotações
+    anteriores numa única leitura.
+    """
+    _append_to_history(df_silver, date, SILVER_HISTORY_DIR, rebuild_silver_history)
+
+
+def rebuild_silver_history(silver_dir="silver"):
+    """Reconstrói silver/history/ a partir de todos os ficheiros diários da silver."""
+    _rebuild_history(silver_dir, SILVER_HISTORY_DIR)
+
+
+class IncrementalGoldLoader:
+    """
+    Mantém o histórico da gold em memória e, a cada `load()`, relê apenas as
+    partições novas ou alteradas, identificadas pelo nome e pelo mtime do
+    ficheiro. Usa as partições mensais de gold/history/ quando existem e, caso
+    contrário, os ficheiros diários gold/YYYY-MM-DD.parquet.
+
+    O DataFrame devolvido é partilhado entre chamadas e deve ser tratado como
+    só de leitura; `version` é incrementado sempre que ele muda. As colunas
+    `base_currency` e `currency` são devolvidas como categóricas.
+    """
+
+    def __init__(self, gold_dir="gold"):
+        self.gold_dir = gold_dir
+        self.files_read = 0
+        self.version = 0
+        self._partitions = {}
+        self._combined = None
+        self._lock = threading.Lock()
+
+    def _list_partitions(self):
+        return list_gold_partitions(self.gold_dir)
+
+    def _read_partition(self, path):
+        df = pd.read_parquet(path)
+        if "date" not in df.columns:
+            df["date"] = datetime.strptime(os.path.basename(path).split(".")[0], "%Y-%m-%d").date()
+        self.files_read += 1
+        return df
+
+    def load(self):
+        """Devolve o histórico completo, lendo do disco apenas o que mudou."""
+        with self._lock:
+            current = {path: os.stat(path).st_mtime_ns for path in self._list_partitions()}
+            changed = [p for p, mtime in current.items() if self._partitions.get(p, (None,))[0] != mtime]
+            removed = [p for p in self._partitions if p not in current]
+
+            if self._combined is not None and not changed and not removed:
+                return self._combined
+
+            for path in removed:
+                del self._partitions[path]
+            for path in changed:
+                self._partitions[path] = (current[path], self._read_partition(path))
+            if changed or removed:
+                logging.info(f"Histórico da gold atualizado: {len(changed)} partições lidas, {len(removed)} removidas.")
+
+            self.version += 1
+            if not self._partitions:
+                self._combined = pd.DataFrame()
+                return self._combined
+
+            combined = pd.concat([df for _, df in self._partitions.values()], ignore_index=True)
+            combined["date"] = pd.to_datetime(combined["date"])
+            combined["rate"] = pd.to_numeric(combined["rate"], errors="coerce")
+            # Códigos de moeda como categóricas: com o universo completo (~160
+            # moedas) evitam milhões de strings repetidas em memória.
+            for column in ("base_currency", "currency"):
+                if column in combined.columns:
+                    combined[column] = combined[column].astype("category")
+            self._combined = combined.sort_values(by="date", kind="stable").reset_index(drop=True)
+            return self._combined
 
 
 if __name__ == "__main__":
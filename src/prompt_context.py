@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Janelas (dias de calendário) das tendências descritas no prompt
+TREND_WINDOWS = (7, 30)
+# Janela das máximas/mínimas e mínimo de observações para as considerar
+EXTREME_WINDOW = 90
+EXTREME_MIN_OBSERVATIONS = 10
+# Regime de volatilidade: desvio padrão das variações diárias em 7 dias face a 90 dias
+REGIME_SHORT_WINDOW = 7
+REGIME_LONG_WINDOW = 90
+REGIME_HIGH = 1.5
+REGIME_LOW = 0.67
+
+CONTEXT_COLUMNS = [
+    "currency", "date", "rate", "trend_7d_pct", "trend_30d_pct", "streak_days",
+    "is_high_90d", "is_low_90d", "volatility_ratio", "volatility_regime",
+]
+
+
+class HistoryContext:
+    """
+    Contexto histórico de cada moeda, calculado de uma só vez sobre todo o
+    histórico da gold, para enriquecer os prompts da LLM.
+
+    Na construção, todas as métricas são calculadas em bloco sobre a matriz
+    data × moeda: tendências de 7 e 30 dias (face à última cotação até N dias
+    antes), sequência de dias seguidos em alta (positiva) ou em baixa
+    (negativa), máximas/mínimas de 90 dias e regime de volatilidade. Depois,
+    `for_date` é apenas uma consulta de linha, pelo que construir prompts
+    para centenas de datas custa praticamente o mesmo que para uma.
+    """
+
+    def __init__(self, df):
+        pivot = df.pivot_table(index="date", columns="currency", values="rate", aggfunc="last", observed=True).sort_index()
+        pivot.index = pd.to_datetime(pivot.index)
+        self.dates = pivot.index.values.astype("datetime64[D]")
+        self.currencies = [str(c) for c in pivot.columns]
+        self.rates = pivot.to_numpy(dtype="float64")
+        observed = ~np.isnan(self.rates)
+
+        # Tendências sobre o calendário diário, com a última cotação conhecida nos dias em falta
+        calendar = pd.date_range(pivot.index.min(), pivot.index.max(), freq="D")
+        filled_calendar = pivot.reindex(calendar).ffill()
+        self.trends = {
+            window: ((filled_calendar / filled_calendar.shift(window) - 1) * 100).reindex(pivot.index).to_numpy()
+            for window in TREND_WINDOWS
+        }
+
+        # Variação face à observação anterior da mesma moeda, só nos dias com cotação
+        changes = pivot.ffill().pct_change(fill_method=None).where(observed)
+        self.streaks = _streaks(np.sign(changes.to_numpy()), observed)
+
+        rolling_max = pivot.rolling(f"{EXTREME_WINDOW}D", min_periods=EXTREME_MIN_OBSERVATIONS).max().to_numpy()
+        rolling_min = pivot.rolling(f"{EXTREME_WINDOW}D", min_periods=EXTREME_MIN_OBSERVATIONS).min().to_numpy()
+        with np.errstate(invalid="ignore"):
+            self.is_high = observed & (self.rates >= rolling_max)
+            self.is_low = observed & (self.rates <= rolling_min)
+
+        short_std = changes.rolling(f"{REGIME_SHORT_WINDOW}D", min_periods=3).std()
+        long_std = changes.rolling(f"{REGIME_LONG_WINDOW}D", min_periods=EXTREME_MIN_OBSERVATIONS).std()
+        self.volatility_ratio = (short_std / long_std.where(long_std > 0)).to_numpy()
+
+    def for_date(self, date, currencies=None):
+        """
+        Contexto de cada moeda no dia `date` (ou no último dia com dados
+        anterior a ele), com uma linha por moeda cotada nesse dia.
+        """
+        row = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date).date(), "D"), side="right") - 1
+        if row < 0:
+            return pd.DataFrame(columns=CONTEXT_COLUMNS)
+        cols = np.arange(len(self.currencies))
+        if currencies is not None:
+            wanted = set(currencies)
+            cols = np.array([i for i, c in enumerate(self.currencies) if c in wanted], dtype=int)
+        cols = cols[~np.isnan(self.rates[row, cols])]
+
+        ratio = self.volatility_ratio[row, cols]
+        regime = np.select([ratio >= REGIME_HIGH, ratio <= REGIME_LOW, ~np.isnan(ratio)], ["alta", "baixa", "normal"], None)
+        return pd.DataFrame({
+            "currency": [self.currencies[c] for c in cols],
+            "date": pd.Timestamp(self.dates[row]),
+            "rate": self.rates[row, cols],
+            "trend_7d_pct": self.trends[7][row, cols],
+            "trend_30d_pct": self.trends[30][row, cols],
+            "streak_days": self.streaks[row, cols],
+            "is_high_90d": self.is_high[row, cols],
+            "is_low_90d": self.is_low[row, cols],
+            "volatility_ratio": ratio,
+            "volatility_regime": regime,
+        }, columns=CONTEXT_COLUMNS)
+
+
+def _streaks(signs, observed):
+    """
+    Número de observações seguidas com o mesmo sinal de variação, com o sinal
+    da sequência (ex.: -3 = três dias seguidos em baixa). Dias sem cotação não
+    interrompem nem prolongam a sequência; variações nulas valem 0.
+    """
+    signs = pd.DataFrame(np.where(observed, signs, np.nan)).ffill().fillna(0).to_numpy()
+    n = len(signs)
+    rows = np.arange(n)[:, None]
+    previous = np.vstack([np.full((1, signs.shape[1]), np.nan), signs[:-1]])
+    run_start = np.maximum.accumulate(np.where(signs != previous, rows, 0), axis=0)
+    observed_count = np.vstack([np.zeros((1, signs.shape[1])), np.cumsum(observed, axis=0)])
+    length = observed_count[rows + 1, np.arange(signs.shape[1])] - observed_count[run_start, np.arange(signs.shape[1])]
+    return (length * signs).astype(int)
+
+
+def format_context(context):
+    """Texto, uma linha por moeda, com as tendências e sinais do contexto histórico."""
+    lines = []
+    for currency, trend_7d, trend_30d, streak, is_high, is_low, regime, ratio in zip(
+        context["currency"], context["trend_7d_pct"], context["trend_30d_pct"], context["streak_days"],
+        context["is_high_90d"], context["is_low_90d"], context["volatility_regime"], context["volatility_ratio"],
+    ):
+        parts = [
+            f"{label} {value:+.2f}%"
+            for label, value in (("7 dias", trend_7d), ("30 dias", trend_30d))
+            if pd.notna(value)
+        ]
+        if abs(streak) >= 2:
+            parts.append(f"{abs(streak)} dias seguidos em {'alta' if streak > 0 else 'baixa'}")
+        if is_high:
+            parts.append(f"máxima de {EXTREME_WINDOW} dias")
+        if is_low:
+            parts.append(f"mínima de {EXTREME_WINDOW} dias")
+        if regime is not None:
+            parts.append(f"volatilidade {regime} ({ratio:.1f}x a de {REGIME_LONG_WINDOW} dias)")
+        if parts:
+            lines.append(f"- {currency}: " + "; ".join(parts))
+    return "\n".join(lines)
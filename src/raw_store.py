@@ -0,0 +1,147 @@
+import os
+import glob
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+from src.utils import ensure_dir, setup_logging
+
+RAW_DIR = "raw"
+RECORD_EXTENSION = ".arrow"
+
+RECORD_SCHEMA = pa.schema([
+    ("currency", pa.dictionary(pa.int16(), pa.string())),
+    ("rate", pa.float64()),
+])
+
+
+def record_path_for(json_path):
+    """Caminho do registo colunar correspondente a um ficheiro raw JSON."""
+    return os.path.splitext(json_path)[0] + RECORD_EXTENSION
+
+
+def is_record_current(json_path, record_path=None):
+    """
+    Indica se o registo colunar existe e não é mais antigo que o JSON (ou se
+    o JSON já não existe). Um JSON buscado de novo ou editado depois da
+    conversão torna o registo obsoleto.
+    """
+    record_path = record_path or record_path_for(json_path)
+    if not os.path.exists(record_path):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(record_path) >= os.path.getmtime(json_path)
+
+
+def write_raw_record(data, path, date):
+    """
+    Grava uma resposta da API como registo colunar Arrow IPC: os códigos de
+    moeda ficam codificados em dicionário e as cotações num vetor float64.
+    A data, a moeda base e o timestamp são guardados uma única vez, nos
+    metadados do ficheiro.
+    """
+    rates = data.get("conversion_rates", {})
+    metadata = {
+        "date": date,
+        "base_currency": data.get("base_code") or "",
+        "timestamp": str(data.get("time_last_update_unix") or ""),
+    }
+    table = pa.table({
+        "currency": pa.array(list(rates.keys()), pa.string()).dictionary_encode().cast(RECORD_SCHEMA.field("currency").type),
+        "rate": pa.array(list(rates.values()), pa.float64()),
+    }, schema=RECORD_SCHEMA.with_metadata(metadata))
+
+    ensure_dir(os.path.dirname(path) or ".")
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_raw_record(path, currencies=None):
+    """
+    Lê um registo colunar (por memory-map) e devolve (tabela, metadados),
+    opcionalmente apenas com as moedas indicadas.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = ipc.open_file(source).read_all()
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+    if currencies is not None:
+        mask = pc.is_in(table.column("currency").cast(pa.string()), value_set=pa.array(list(currencies), pa.string()))
+        table = table.filter(mask)
+    return table, metadata
+
+
+def load_raw_history(currencies=None, start=None, end=None, base_currency=None, raw_dir=RAW_DIR):
+    """
+    Carrega todo o histórico raw colunar (ou só as moedas/período/moeda base
+    indicados) num único DataFrame, sem interpretar JSON. As colunas de moeda
+    são devolvidas como categóricas.
+    """
+    files = sorted(glob.glob(os.path.join(raw_dir, f"*{RECORD_EXTENSION}")))
+    if not files:
+        raise FileNotFoundError(f"Nenhum registo colunar encontrado em {raw_dir}/")
+
+    start = str(start)[:10] if start is not None else None
+    end = str(end)[:10] if end is not None else None
+
+    dates, bases, timestamps, counts, currency_chunks, rate_chunks = [], [], [], [], [], []
+    for path in files:
+        date = os.path.basename(path)[:10]
+        if (start and date < start) or (end and date > end):
+            continue
+        table, metadata = read_raw_record(path)
+        if base_currency is not None and metadata.get("base_currency") != base_currency:
+            continue
+        dates.append(metadata.get("date", date))
+        bases.append(metadata.get("base_currency"))
+        timestamps.append(int(metadata["timestamp"]) if metadata.get("timestamp") else 0)
+        counts.append(table.num_rows)
+        currency_chunks.append(table.column("currency").combine_chunks().cast(pa.string()))
+        rate_chunks.append(table.column("rate").to_numpy())
+
+    columns = ["date", "base_currency", "currency", "rate", "timestamp"]
+    if not counts:
+        return pd.DataFrame(columns=columns)
+
+    # Concatena os vetores de todos os dias de uma só vez e volta a codificar
+    # as moedas num único dicionário para todo o histórico.
+    df = pd.DataFrame({
+        "date": np.repeat(np.array(dates, dtype="datetime64[D]"), counts).astype("datetime64[ns]"),
+        "base_currency": pd.Categorical(np.repeat(np.array(bases, dtype=object), counts)),
+        "currency": pa.concat_arrays(currency_chunks).dictionary_encode().to_pandas(),
+        "rate": np.concatenate(rate_chunks),
+        "timestamp": np.repeat(np.array(timestamps, dtype="int64"), counts),
+    }, columns=columns)
+    if currencies is not None:
+        df = df[df["currency"].isin(list(currencies))]
+        df = df.assign(currency=df["currency"].cat.remove_unused_categories())
+    return df.sort_values(by=["date", "currency"], kind="stable").reset_index(drop=True)
+
+
+def convert_raw_directory(raw_dir=RAW_DIR, overwrite=False):
+    """
+    Conversão única dos ficheiros raw/*.json existentes para registos
+    colunares. Ficheiros já convertidos (e com registo não mais antigo que o
+    JSON) são ignorados, salvo `overwrite=True`.
+    """
+    setup_logging()
+    converted = 0
+    for json_path in sorted(glob.glob(os.path.join(raw_dir, "*.json"))):
+        record_path = record_path_for(json_path)
+        if is_record_current(json_path, record_path) and not overwrite:
+            continue
+        date = os.path.basename(json_path)[:10]
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        write_raw_record(data, record_path, date)
+        converted += 1
+    logging.info(f"{converted} ficheiros raw convertidos para o formato colunar em {raw_dir}/")
+    return converted
+
+
+if __name__ == "__main__":
+    convert_raw_directory()
@@ -0,0 +1,140 @@
+import os
+import logging
+import sqlite3
+import argparse
+from src.report_index import REPORTS_DIR, load_report_index
+from src.utils import ensure_dir, setup_logging
+
+ARCHIVE_PATH = os.path.join(REPORTS_DIR, "archive.sqlite")
+DEFAULT_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    base_currency TEXT,
+    path TEXT NOT NULL UNIQUE,
+    sha256 TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (date);
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    content, content='reports', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+    INSERT INTO reports_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+    INSERT INTO reports_fts (reports_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+def connect(path=ARCHIVE_PATH):
+    """Abre (e cria, se preciso) o arquivo SQLite dos relatórios com o índice FTS5."""
+    ensure_dir(os.path.dirname(path) or ".")
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def sync_archive(report_dir=REPORTS_DIR, path=ARCHIVE_PATH):
+    """
+    Acrescenta ao arquivo os relatórios do índice reports/index.json que ainda
+    não estão lá (ou cujo hash mudou). Só esses ficheiros são abertos.
+    Devolve o número de relatórios acrescentados.
+    """
+    entries = load_report_index(report_dir)
+    with connect(path) as conn:
+        archived = dict(conn.execute("SELECT path, sha256 FROM reports"))
+        pending = [e for e in entries if archived.get(e["path"]) != e["sha256"]]
+        for entry in pending:
+            with open(entry["path"], "r", encoding="utf-8") as f:
+                content = f.read()
+            conn.execute("DELETE FROM reports WHERE path = ?", (entry["path"],))
+            conn.execute(
+                "INSERT INTO reports (date, base_currency, path, sha256, content) VALUES (?, ?, ?, ?, ?)",
+                (entry["date"], entry["base_currency"], entry["path"], entry["sha256"], content),
+            )
+    conn.close()
+    if pending:
+        logging.info(f"{len(pending)} relatórios acrescentados ao arquivo {path}")
+    return len(pending)
+
+
+def match_expression(query, any_terms=False):
+    """
+    Converte o texto pesquisado numa expressão FTS5: cada termo entre aspas
+    (um `*` final pesquisa por prefixo), todos obrigatórios ou, com
+    `any_terms=True`, basta um deles.
+    """
+    terms = []
+    for term in query.replace("/", " ").replace(",", " ").split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return (" OR " if any_terms else " ").join(terms)
+
+
+def search_reports(query=None, currency=None, start=None, end=None, base_currency=None,
+                   any_terms=False, limit=DEFAULT_LIMIT, report_dir=REPORTS_DIR, path=ARCHIVE_PATH, sync=True):
+    """
+    Pesquisa os relatórios arquivados que mencionam os termos de `query`
+    e/ou a moeda `currency`, opcionalmente num período e para uma moeda base.
+    Devolve uma lista de dicionários (date, base_currency, path, snippet),
+    do dia mais recente para o mais antigo.
+    """
+    if sync:
+        sync_archive(report_dir, path)
+
+    expression = match_expression(query or "", any_terms)
+    if currency:
+        currency_term = match_expression(currency)
+        expression = f"({expression}) AND {currency_term}" if expression else currency_term
+
+    conditions, params = [], []
+    if expression:
+        conditions.append("reports_fts MATCH ?")
+        params.append(expression)
+    for clause, value in (("r.date >= ?", start), ("r.date <= ?", end), ("r.base_currency = ?", base_currency)):
+        if value:
+            conditions.append(clause)
+            params.append(str(value)[:10] if clause.startswith("r.date") else value)
+
+    if expression:
+        sql = (
+            "SELECT r.date, r.base_currency, r.path, snippet(reports_fts, 0, '**', '**', '…', 16) AS snippet "
+            "FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid"
+        )
+    else:
+        sql = "SELECT r.date, r.base_currency, r.path, substr(r.content, 1, 160) AS snippet FROM reports r"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY r.date DESC, r.path LIMIT ?"
+    params.append(limit)
+
+    conn = connect(path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Pesquisa de texto integral nos relatórios da LLM")
+    parser.add_argument("query", nargs="?", default="", help="Termos a pesquisar (ex.: \"Fed juros\"; `jur*` pesquisa por prefixo)")
+    parser.add_argument("--any", action="store_true", help="Basta um dos termos (por defeito, todos)")
+    parser.add_argument("--currency", help="Só relatórios que mencionam a moeda (ex.: USD)")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD)")
+    parser.add_argument("--base", help="Moeda base dos relatórios")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    results = search_reports(args.query, args.currency, args.start, args.end, args.base, args.any, args.limit)
+    for result in results:
+        print(f"{result['date']}  {result['path']}\n    {' '.join(result['snippet'].split())}")
+    print(f"{len(results)} relatórios encontrados.")
@@ -0,0 +1,110 @@
+import os
+import glob
+import json
+import hashlib
+import logging
+import functools
+import threading
+from src.utils import ensure_dir, setup_logging
+
+REPORTS_DIR = "reports"
+INDEX_FILENAME = "index.json"
+# Corpos de relatórios mantidos em memória pelo dashboard
+REPORT_CACHE_SIZE = 32
+
+_LOCK = threading.Lock()
+
+
+def index_path(report_dir=REPORTS_DIR):
+    return os.path.join(report_dir, INDEX_FILENAME)
+
+
+def report_entry(path, content=None):
+    """
+    Entrada do índice para um relatório `YYYY-MM-DD_<BASE>_summary.txt`:
+    data, moeda base, caminho, tamanho e hash do conteúdo.
+    """
+    if content is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        data = content.encode("utf-8")
+    parts = os.path.basename(path).split("_")
+    return {
+        "date": parts[0],
+        "base_currency": parts[1] if len(parts) > 2 else None,
+        "path": path,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def _scan(report_dir):
+    return {
+        os.path.basename(path): report_entry(path)
+        for path in glob.glob(os.path.join(report_dir, "*.txt"))
+    }
+
+
+def _read_entries(report_dir):
+    path = index_path(report_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["reports"]
+
+
+def _write_entries(entries, report_dir):
+    ensure_dir(report_dir)
+    path = index_path(report_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"reports": dict(sorted(entries.items()))}, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def update_report_index(path, content=None, report_dir=REPORTS_DIR):
+    """
+    Acrescenta (ou atualiza) um relatório acabado de gravar no índice
+    reports/index.json. Se o índice ainda não existir, é criado a partir dos
+    relatórios já presentes no diretório.
+    """
+    with _LOCK:
+        entries = _read_entries(report_dir)
+        if entries is None:
+            entries = _scan(report_dir)
+        entries[os.path.basename(path)] = report_entry(path, content)
+        _write_entries(entries, report_dir)
+
+
+def rebuild_report_index(report_dir=REPORTS_DIR):
+    """Reconstrói o índice a partir de todos os relatórios do diretório."""
+    with _LOCK:
+        entries = _scan(report_dir)
+        _write_entries(entries, report_dir)
+    return entries
+
+
+def load_report_index(report_dir=REPORTS_DIR):
+    """
+    Lista de entradas do índice, da data mais recente para a mais antiga.
+    Sem índice no disco, reconstrói-o uma vez a partir dos relatórios existentes.
+    """
+    entries = _read_entries(report_dir)
+    if entries is None:
+        entries = rebuild_report_index(report_dir)
+    return sorted(entries.values(), key=lambda e: (e["date"], e["path"]), reverse=True)
+
+
+@functools.lru_cache(maxsize=REPORT_CACHE_SIZE)
+def read_report(path, sha256):
+    """Conteúdo de um relatório; memoizado pelo caminho e pelo hash registado no índice."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    entries = rebuild_report_index()
+    logging.info(f"Índice com {len(entries)} relatórios gravado em {index_path()}")
@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+class RollingMetrics:
+    """
+    Estrutura pré-calculada sobre o histórico da gold para responder, em O(1)
+    por moeda, à média, volatilidade (desvio padrão) e delta vs. média de
+    qualquer período.
+
+    O histórico é guardado numa matriz densa data × moeda (NaN nos dias sem
+    cotação) acompanhada das somas acumuladas do número de observações, das
+    cotações e dos seus quadrados. As cotações são centradas na média de cada
+    moeda antes de acumular, para evitar perda de precisão nas somas dos
+    quadrados de moedas com cotações altas (ex.: LBP).
+    """
+
+    def __init__(self, df):
+        pivot = df.pivot_table(index="date", columns="currency", values="rate", aggfunc="last", observed=True).sort_index()
+        self.dates = pd.to_datetime(pivot.index).values.astype("datetime64[D]")
+        self.currencies = [str(c) for c in pivot.columns]
+        self.base_currency = df["base_currency"].iloc[0] if "base_currency" in df.columns and len(df) else None
+        self._index = {currency: i for i, currency in enumerate(self.currencies)}
+
+        values = pivot.to_numpy(dtype="float64")
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        self._offset = np.divide(
+            np.where(valid, values, 0.0).sum(axis=0), counts,
+            out=np.zeros(values.shape[1]), where=counts > 0,
+        )
+        centered = np.where(valid, values - self._offset, 0.0)
+
+        zeros = np.zeros((1, values.shape[1]))
+        self._values = values
+        self._cum_n = np.vstack([zeros, np.cumsum(valid, axis=0)])
+        self._cum_sum = np.vstack([zeros, np.cumsum(centered, axis=0)])
+        self._cum_sq = np.vstack([zeros, np.cumsum(centered ** 2, axis=0)])
+
+        # Índice da última observação válida até cada linha (inclusive), -1 se nenhuma
+        positions = np.where(valid, np.arange(len(values))[:, None], -1)
+        self._last_valid = np.maximum.accumulate(positions, axis=0)
+
+        # Resultados derivados destas métricas (ex.: `analyze_period`),
+        # libertados junto com o objeto quando a gold muda. O objeto é
+        # partilhado entre sessões do dashboard: acessos à cache só com o lock
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+
+    def window(self, start, end, currencies=None):
+        """
+        Métricas do período [start, end] para as moedas indicadas (todas, por
+        defeito). O último dia do período é o dia mais recente com cotação de
+        alguma das moedas; só as moedas cotadas nesse dia são devolvidas, com
+        colunas `rate`, `rate_avg_period`, `rate_std_period` e
+        `delta_vs_period_pct`.
+        """
+        columns = ["base_currency", "currency", "rate", "date",
+                   "rate_avg_period", "rate_std_period", "delta_vs_period_pct"]
+        if currencies is None:
+            currencies = self.currencies
+        cols = np.array(sorted(self._index[c] for c in currencies if c in self._index), dtype=int)
+
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start).date(), "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end).date(), "D"), side="right")
+        if len(cols) == 0 or hi <= lo:
+            return pd.DataFrame(columns=columns)
+
+        last = self._last_valid[hi - 1, cols]
+        if (last < lo).all():
+            return pd.DataFrame(columns=columns)
+        end_idx = last.max()
+        cols = cols[~np.isnan(self._values[end_idx, cols])]
+
+        n = self._cum_n[hi, cols] - self._cum_n[lo, cols]
+        s = self._cum_sum[hi, cols] - self._cum_sum[lo, cols]
+        sq = self._cum_sq[hi, cols] - self._cum_sq[lo, cols]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_centered = s / n
+            var = (sq - s * mean_centered) / (n - 1)
+        std = np.where(n > 1, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+        mean = mean_centered + self._offset[cols]
+        rate = self._values[end_idx, cols]
+
+        return pd.DataFrame({
+            "base_currency": self.base_currency,
+            "currency": [self.currencies[c] for c in cols],
+            "rate": rate,
+            "date": pd.Timestamp(self.dates[end_idx]),
+            "rate_avg_period": mean,
+            "rate_std_period": std,
+            "delta_vs_period_pct": (rate - mean) / mean * 100,
+        }, columns=columns)
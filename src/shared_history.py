@@ -0,0 +1,122 @@
+import os
+import glob
+import logging
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from src.utils import ensure_dir
+
+SHARED_HISTORY_PATH = os.path.join("gold", "history.arrow")
+CATEGORICAL_COLUMNS = ("base_currency", "currency")
+
+
+def list_gold_partitions(gold_dir="gold"):
+    """
+    Ficheiros que compõem o histórico da gold: as partições mensais de
+    gold/history/ quando existem e, caso contrário, os ficheiros diários.
+    """
+    history_dir = os.path.join(gold_dir, "history")
+    if os.path.exists(history_dir):
+        return glob.glob(os.path.join(history_dir, "year=*", "month=*", "*.parquet"))
+    return glob.glob(os.path.join(gold_dir, "*.parquet"))
+
+
+def _column_array(series):
+    if series.name in CATEGORICAL_COLUMNS:
+        return pa.array(series.astype(str).to_numpy(), pa.string()).dictionary_encode()
+    if series.name == "date":
+        return pa.array(pd.to_datetime(series).to_numpy(dtype="datetime64[ns]"), pa.timestamp("ns"))
+    if pd.api.types.is_float_dtype(series):
+        # NaN mantém-se como valor (sem bitmap de nulos), para a leitura sem cópia
+        return pa.array(series.to_numpy(dtype="float64"))
+    if pd.api.types.is_integer_dtype(series):
+        return pa.array(series.to_numpy())
+    return pa.array(series.astype(object).where(series.notna(), None).tolist())
+
+
+def write_shared_history(df, path=SHARED_HISTORY_PATH):
+    """
+    Grava o histórico num único ficheiro Arrow IPC, ordenado por data e
+    moeda: códigos de moeda em dicionário, datas em datetime64 e cotações e
+    métricas em vetores float64 contíguos. A escrita é atómica.
+    """
+    df = df.sort_values(by=["date", "currency"], kind="stable").reset_index(drop=True)
+    table = pa.table({column: _column_array(df[column]) for column in df.columns})
+
+    directory = os.path.dirname(path) or "."
+    ensure_dir(directory)
+    # Temporário único na mesma pasta, para o os.replace ser atómico e
+    # reconstruções concorrentes (vários processos do dashboard) não colidirem
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    os.close(fd)
+    with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    logging.info(f"Histórico partilhado ({len(df)} linhas) gravado em {path}")
+    return path
+
+
+def gold_version(gold_dir="gold"):
+    """mtime (ns) da partição da gold alterada mais recentemente, ou None se a gold estiver vazia."""
+    return max((os.stat(p).st_mtime_ns for p in list_gold_partitions(gold_dir)), default=None)
+
+
+def is_stale(path=SHARED_HISTORY_PATH, gold_dir="gold"):
+    """True se o ficheiro não existir ou for mais antigo que alguma partição da gold."""
+    if not os.path.exists(path):
+        return True
+    version = gold_version(gold_dir)
+    return version is not None and version > os.stat(path).st_mtime_ns
+
+
+def build_shared_history(gold_dir="gold", path=SHARED_HISTORY_PATH):
+    """
+    Reconstrói o ficheiro partilhado a partir do histórico da gold. Chamado
+    pelo pipeline depois de gravar a gold; o dashboard só o abre. Devolve
+    None se a gold estiver vazia.
+    """
+    from src.load import IncrementalGoldLoader
+    df = IncrementalGoldLoader(gold_dir).load()
+    if df.empty:
+        return None
+    return write_shared_history(df, path)
+
+
+def history_version(path=SHARED_HISTORY_PATH):
+    """mtime (ns) do ficheiro partilhado, ou None se ainda não tiver sido gerado."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class SharedHistory:
+    """
+    Histórico da gold só de leitura, mapeado em memória a partir do ficheiro
+    Arrow IPC. As colunas numéricas e as datas do `frame` apontam
+    diretamente para as páginas do ficheiro, pelo que várias sessões e
+    processos do dashboard partilham uma única cópia física, mantida pela
+    cache de páginas do sistema operativo.
+    """
+
+    def __init__(self, path=SHARED_HISTORY_PATH):
+        self.path = path
+        self.version = os.stat(path).st_mtime_ns
+        with pa.memory_map(path, "r") as source:
+            self.table = ipc.open_file(source).read_all()
+        self.frame = self.table.to_pandas(split_blocks=True)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    @classmethod
+    def open(cls, gold_dir="gold", path=SHARED_HISTORY_PATH):
+        """
+        Abre o histórico partilhado, reconstruindo primeiro o ficheiro se a
+        gold tiver mudado desde a última escrita. Devolve None se não houver dados.
+        """
+        if is_stale(path, gold_dir) and build_shared_history(gold_dir, path) is None:
+            return None
+        return cls(path)
@@ -1,66 +1,163 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
 import json
-import yaml
 import logging
-from src.utils import ensure_dir, setup_logging
+from src.utils import ensure_dir, load_config, setup_logging
+from src.raw_store import is_record_current, read_raw_record, record_path_for, write_raw_record
+from src.instrumentation import count
+from src.load import append_to_silver_history, rebuild_silver_history
 
-def transform_to_silver(date=None):
-    """
-    Carrega os dados brutos, transforma-os e filtra pelas moedas de interesse
-    definidas no config.yaml antes de salvar na camada silver.
-    """
-    setup_logging()
-    
-    # Carregar as moedas de interesse a partir do config.yaml
-    config_path = "config.yaml"
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Arquivo de configuração não encontrado: {config_path}")
-    
-    with open(config_path, "r") as file:
-        config = yaml.safe_load(file)
-    
-    target_currencies = config.get("target_currencies")
+SILVER_COLUMNS = ["base_currency", "currency", "rate", "timestamp"]
+
+
+def _load_target_currencies():
+    """Carrega as moedas de interesse a partir do config.yaml."""
+    config = load_config()
+    if not config.exists:
+        raise FileNotFoundError(f"Arquivo de configuração não encontrado: {config.path}")
+
+    target_currencies = list(config.target_currencies)
     if not target_currencies:
         raise ValueError("A lista 'target_currencies' não foi encontrada ou está vazia no config.yaml")
+    return target_currencies
+
+
+def _silver_currencies():
+    """
+    Moedas guardadas na silver: as `target_currencies` ou, com
+    `full_universe: true` no config.yaml, None (todas as moedas da API).
+    """
+    target_currencies = set(_load_target_currencies())
+    return None if load_config().get("full_universe", False) else target_currencies
 
-    # Carregar os dados brutos
+
+def _read_filtered_rates(date, targets):
+    """
+    Lê o raw de uma data e devolve (moeda base, timestamp, moedas, cotações)
+    já filtrados pelas moedas-alvo (todas exceto a própria moeda base, se
+    `targets` for None) e por cotação positiva, numa única passagem.
+    Usa o registo colunar quando existe e não é mais antigo que o JSON,
+    evitando interpretar o JSON; um registo obsoleto é regenerado a partir
+    do JSON. Devolve None se o raw não tiver cotações.
+    """
     raw_path = os.path.join("raw", f"{date}.json")
+    record_path = record_path_for(raw_path)
+
+    if is_record_current(raw_path, record_path):
+        table, metadata = read_raw_record(record_path)
+        if table.num_rows == 0:
+            return None
+        currencies = table.column("currency").combine_chunks().cast(pa.string())
+        rates = table.column("rate").combine_chunks()
+        if targets is None:
+            wanted = pc.not_equal(currencies, metadata.get("base_currency") or "")
+        else:
+            wanted = pc.is_in(currencies, value_set=pa.array(sorted(targets), pa.string()))
+        keep = pc.and_(wanted, pc.greater(rates, 0))
+        timestamp = int(metadata["timestamp"]) if metadata.get("timestamp") else None
+        return metadata.get("base_currency"), timestamp, currencies.filter(keep).to_pylist(), rates.filter(keep).to_numpy()
+
     if not os.path.exists(raw_path):
         raise FileNotFoundError(f"Arquivo raw não encontrado para a data {date}")
-        
+
     with open(raw_path, 'r') as f:
         data = json.load(f)
+    if os.path.exists(record_path):
+        logging.info(f"Registo colunar {record_path} mais antigo que o JSON; a regenerar.")
+        write_raw_record(data, record_path, date)
 
-    # Lógica de transformação
-    base_currency = data.get("base_code")
     rates = data.get("conversion_rates", {})
-    timestamp = data.get("time_last_update_unix")
+    if not rates:
+        return None
 
-    transformed_data = []
+    base_currency = data.get("base_code")
+    currencies, values = [], []
     for currency, rate in rates.items():
-        transformed_data.append({
-            "base_currency": base_currency,
-            "currency": currency,
-            "rate": rate,
-            "timestamp": timestamp
-        })
-
-    if not transformed_data:
-        logging.warning("Nenhum dado para transformar.")
-        return
+        if (currency != base_currency if targets is None else currency in targets) and rate > 0:
+            currencies.append(currency)
+            values.append(rate)
+    return base_currency, data.get("time_last_update_unix"), currencies, values
 
-    df_silver = pd.DataFrame(transformed_data)
-    
-    # Filtrar pelas moedas-alvo definidas no config.yaml
-    logging.info(f"Filtrando o DataFrame pelas moedas de interesse: {target_currencies}")
-    df_silver = df_silver[df_silver['currency'].isin(target_currencies)]
 
-    # Verificação de qualidade dos dados
-    df_silver = df_silver[df_silver["rate"] > 0]
+def _build_silver(date, targets):
+    """Constrói o DataFrame silver de uma data diretamente a partir dos vetores de colunas."""
+    parsed = _read_filtered_rates(date, targets)
+    if parsed is None:
+        return None
+    base_currency, timestamp, currencies, rates = parsed
+    n = len(currencies)
+    return pd.DataFrame({
+        "base_currency": [base_currency] * n,
+        "currency": currencies,
+        "rate": np.asarray(rates, dtype="float64"),
+        "timestamp": [timestamp] * n,
+    }, columns=SILVER_COLUMNS)
 
-    # Salvar na camada silver
+
+def _write_silver(df_silver, date):
     ensure_dir("silver")
     silver_path = os.path.join("silver", f"{date}.parquet")
     df_silver.to_parquet(silver_path, index=False)
+    count("silver_rows_written", len(df_silver))
+    count("silver_bytes_written", os.path.getsize(silver_path))
     logging.info(f"Dados transformados e salvos com sucesso em {silver_path}")
+    return silver_path
+
+
+def transform_to_silver(date=None, update_history=True):
+    """
+    Carrega os dados brutos, transforma-os e filtra pelas moedas de interesse
+    definidas no config.yaml antes de salvar na camada silver. Com
+    `full_universe: true`, guarda todas as moedas devolvidas pela API.
+
+    Com `update_history=True`, o dia é também acrescentado a silver/history/
+    (ver `src.load.append_to_silver_history`). O backfill, que transforma
+    vários dias em paralelo, passa False e reconstrói o histórico no fim.
+    """
+    setup_logging()
+
+    currencies = _silver_currencies()
+    if currencies is None:
+        logging.info("Modo universo completo: todas as moedas da API seguem para a silver.")
+    else:
+        logging.info(f"Filtrando os dados pelas moedas de interesse: {sorted(currencies)}")
+
+    df_silver = _build_silver(date, currencies)
+    if df_silver is None:
+        logging.warning("Nenhum dado para transformar.")
+        return
+
+    silver_path = _write_silver(df_silver, date)
+    if update_history:
+        append_to_silver_history(df_silver, date)
+    return silver_path
+
+
+def transform_many(dates):
+    """
+    Converte várias datas da camada raw para a silver numa única chamada,
+    lendo o config.yaml uma só vez. Útil para retransformar o histórico após
+    uma alteração de `target_currencies`. O histórico consolidado da silver é
+    reconstruído uma só vez no fim. Devolve os caminhos gravados.
+    """
+    setup_logging()
+
+    currencies = _silver_currencies()
+    logging.info(
+        f"A transformar {len(dates)} datas para a camada silver com "
+        + ("todas as moedas da API" if currencies is None else f"as moedas {sorted(currencies)}")
+    )
+
+    written = []
+    for date in dates:
+        df_silver = _build_silver(date, currencies)
+        if df_silver is None:
+            logging.warning(f"Nenhum dado para transformar em {date}.")
+            continue
+        written.append(_write_silver(df_silver, date))
+    if written:
+        rebuild_silver_history()
+    return written
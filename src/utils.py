@@ -1,17 +1,98 @@
 import os
 import yaml
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from dotenv import find_dotenv, load_dotenv
 import logging
 from datetime import datetime
 
+# Estado partilhado por todas as etapas do pipeline no mesmo processo
+_ENV_CACHE = {}
+_CONFIG_CACHE = {}
+_LOGGING_CONFIGURED = False
+
+# Variáveis de ambiente que se sobrepõem às chaves do config.yaml
+ENV_OVERRIDES = {"api_url": "API_URL", "base_currency": "BASE_CURRENCY"}
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Configuração do pipeline, lida do config.yaml e das variáveis de ambiente."""
+    path: str
+    exists: bool
+    base_currency: str = "BRL"
+    target_currencies: tuple = ()
+    api_url: str = None
+    values: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def get(self, key, default=None):
+        """Acesso às restantes chaves do config.yaml, como num dicionário."""
+        return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+
 def load_env():
-    load_dotenv()
+    """Carrega o .env uma única vez por processo, ou novamente se o ficheiro mudar."""
+    path = find_dotenv()
+    if not path:
+        return
+    mtime = os.stat(path).st_mtime_ns
+    if _ENV_CACHE.get(path) != mtime:
+        load_dotenv(path)
+        _ENV_CACHE[path] = mtime
+
+
+def load_config(path=None):
+    """
+    Devolve a configuração do pipeline como um objeto imutável e memoizado.
+
+    O caminho vem de `path`, da variável CONFIG_PATH ou, por defeito, de
+    config.yaml. O YAML só é relido quando o ficheiro muda (mtime/tamanho) ou
+    quando mudam as variáveis de ambiente API_URL/BASE_CURRENCY, que têm
+    prioridade sobre as chaves correspondentes. Se o ficheiro não existir,
+    devolve uma configuração com `exists=False` e os valores por defeito.
+    """
+    path = os.path.abspath(path or os.getenv("CONFIG_PATH", "config.yaml"))
+    try:
+        stat = os.stat(path)
+        file_key = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        file_key = None
+    env_key = tuple(os.getenv(var) for var in ENV_OVERRIDES.values())
+
+    key = (path, file_key, env_key)
+    config = _CONFIG_CACHE.get(path)
+    if config is not None and config[0] == key:
+        return config[1]
+
+    values = {}
+    if file_key is not None:
+        logging.info(f"A carregar configurações de {path}")
+        with open(path, 'r') as f:
+            values = yaml.safe_load(f) or {}
+
+    resolved = {
+        name: os.getenv(var) or values.get(name)
+        for name, var in ENV_OVERRIDES.items()
+    }
+    config = PipelineConfig(
+        path=path,
+        exists=file_key is not None,
+        base_currency=resolved["base_currency"] or "BRL",
+        target_currencies=tuple(values.get("target_currencies") or ()),
+        api_url=resolved["api_url"],
+        values=MappingProxyType(values),
+    )
+    _CONFIG_CACHE[path] = (key, config)
+    return config
 
-def load_config(path="config.yaml"):
-    with open(path, 'r') as f:
-        return yaml.safe_load(f)
 
 def setup_logging():
+    global _LOGGING_CONFIGURED
+    if _LOGGING_CONFIGURED:
+        return
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
@@ -19,6 +100,7 @@ def setup_logging():
             logging.StreamHandler()
         ]
     )
+    _LOGGING_CONFIGURED = True
 
 def ensure_dir(path):
     if not os.path.exists(path):
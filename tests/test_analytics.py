@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from src.analytics import POSITION_COLUMN, RISK_COLUMN, STATUS_COLUMN, STATUS_LOSS, analyze_period
+from src.rolling import RollingMetrics
+
+
+def _history():
+    dates = pd.date_range("2025-09-01", "2025-09-10", freq="D")
+    return pd.DataFrame({
+        "date": list(dates) * 2,
+        "base_currency": "BRL",
+        "currency": ["USD"] * 10 + ["EUR"] * 10,
+        "rate": [0.18 + 0.001 * i for i in range(10)] + [0.16] * 9 + [0.15],
+    })
+
+
+def test_analyze_period_builds_frame_and_outlier():
+    """
+    Testa se a análise do período calcula as colunas do dashboard, a
+    volatilidade média e a moeda mais distante da origem do gráfico.
+    """
+    metrics = RollingMetrics(_history())
+    analysis = analyze_period(metrics, "2025-09-01", "2025-09-10", ["USD", "EUR"])
+
+    df = analysis.frame.set_index("currency")
+    usd_mean = sum(0.18 + 0.001 * i for i in range(10)) / 10
+    assert df.loc["USD", POSITION_COLUMN] == pytest.approx((0.189 - usd_mean) / usd_mean * 100)
+    assert df.loc["USD", "brl_strength_pct"] == pytest.approx(-df.loc["USD", POSITION_COLUMN])
+    assert df.loc["USD", STATUS_COLUMN] == STATUS_LOSS
+    assert analysis.avg_volatility == pytest.approx(df[RISK_COLUMN].mean())
+    assert analysis.outlier["currency"] == df["distancia"].idxmax()
+    assert str(analysis.end_date) == "2025-09-10"
+    assert analysis.base_currency == "BRL"
+
+
+def test_analyze_period_is_memoized_on_inputs():
+    """
+    Testa se a mesma consulta (mesmo objeto de métricas e filtros, em
+    qualquer ordem) devolve o resultado memoizado, e se um período sem dados devolve None.
+    """
+    metrics = RollingMetrics(_history())
+    first = analyze_period(metrics, "2025-09-01", "2025-09-10", ["USD", "EUR"])
+    assert analyze_period(metrics, pd.Timestamp("2025-09-01"), "2025-09-10", ["EUR", "USD"]) is first
+    assert analyze_period(RollingMetrics(_history()), "2025-09-01", "2025-09-10", ["USD", "EUR"]) is not first
+    assert analyze_period(metrics, "2025-08-01", "2025-08-10", ["USD"]) is None
+    assert len(metrics.cache) == 2
+
+    # Sessões em simultâneo: a cache fica limitada e cada consulta tem um só resultado
+    from concurrent.futures import ThreadPoolExecutor
+    from src.analytics import ANALYSIS_CACHE_SIZE
+    days = [f"2025-08-{d:02d}" for d in range(11, 31)] * 8
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda day: analyze_period(metrics, day, "2025-09-10", ["USD"]), days))
+    assert len(metrics.cache) <= ANALYSIS_CACHE_SIZE
+    assert all(result is results[i % 20] for i, result in enumerate(results))
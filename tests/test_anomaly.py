@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.anomaly import score_changes
+from src.load import save_to_gold
+
+
+def test_score_changes_flags_outliers_and_jumps():
+    """
+    Testa o z-score, o score robusto (MAD) e o salto absoluto, e se moedas
+    sem histórico suficiente ficam sem score.
+    """
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2025-08-01", periods=30)
+    window = pd.DataFrame({"USD": rng.normal(0, 0.3, 30), "EUR": rng.normal(0, 0.3, 30)}, index=dates)
+    window.loc[dates[:25], "EUR"] = np.nan
+    today = pd.Series({"USD": 2.5, "EUR": 6.0, "GBP": 0.1})
+
+    scores = score_changes(window, today)
+    usd = (2.5 - window["USD"].mean()) / window["USD"].std()
+    assert scores.loc["USD", "anomaly_zscore"] == pytest.approx(usd)
+    assert scores.loc["USD", "anomaly_score"] >= abs(usd)
+    assert scores.loc["USD", "is_anomaly"] and not scores.loc["USD", "is_jump"]
+
+    assert np.isnan(scores.loc["EUR", "anomaly_zscore"])
+    assert scores.loc["EUR", "is_jump"] and scores.loc["EUR", "is_anomaly"]
+    assert not scores.loc["GBP", "is_anomaly"]
+
+
+def test_save_to_gold_scores_daily_change_against_prior_window(tmp_path, monkeypatch):
+    """
+    Testa se a gold recebe as colunas de anomalia, com os scores calculados
+    face às variações diárias anteriores lidas da silver.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("silver", exist_ok=True)
+    rng = np.random.default_rng(1)
+    dates = [d.strftime("%Y-%m-%d") for d in pd.date_range("2025-08-01", periods=25)]
+    rates = 0.2 * np.cumprod(1 + rng.normal(0, 0.003, len(dates)))
+    rates[-1] = rates[-2] * 1.03
+    for date, rate in zip(dates, rates):
+        pd.DataFrame({"currency": ["USD", "EUR"], "rate": [rate, 0.18]}).to_parquet(f"silver/{date}.parquet")
+
+    for date in dates:
+        save_to_gold(date)
+    gold = pd.read_parquet(f"gold/{dates[-1]}.parquet").set_index("currency")
+    assert gold.loc["USD", "is_anomaly"]
+    assert not gold.loc["EUR", "is_anomaly"]
+
+    changes = pd.Series(rates).pct_change().to_numpy()[1:-1] * 100
+    expected = (3.0 - changes.mean()) / changes.std(ddof=1)
+    assert gold.loc["USD", "anomaly_zscore"] == pytest.approx(expected, rel=1e-6)
+    assert np.isnan(pd.read_parquet(f"gold/{dates[0]}.parquet")["anomaly_zscore"]).all()
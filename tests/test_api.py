@@ -0,0 +1,57 @@
+import os
+import json
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytest
+from src.api import create_server
+
+
+def _write_gold(date, usd, eur):
+    pd.DataFrame({
+        "base_currency": ["BRL", "BRL"], "currency": ["USD", "EUR"],
+        "rate": [usd, eur], "daily_change_pct": [1.0, -1.0],
+    }).to_parquet(f"gold/{date}.parquet", index=False)
+
+
+def test_api_serves_latest_history_and_stats(tmp_path, monkeypatch):
+    """
+    Testa os endpoints da API sobre a gold e se novos ficheiros passam a ser
+    servidos após a atualização incremental do índice.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("gold", exist_ok=True)
+    for day, usd in [("2025-09-15", 0.18), ("2025-09-16", 0.19), ("2025-09-17", 0.20)]:
+        _write_gold(day, usd, 0.16)
+
+    server = create_server(port=0, refresh_interval=None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path):
+        with urllib.request.urlopen(base + path) as response:
+            return json.loads(response.read())
+
+    try:
+        latest = get("/latest?currencies=USD")
+        assert latest["rates"] == {"USD": {"date": "2025-09-17", "rate": 0.20, "daily_change_pct": 1.0}}
+
+        history = get("/history?currency=usd&start=2025-09-16")["history"]
+        assert history == [{"date": "2025-09-16", "rate": 0.19}, {"date": "2025-09-17", "rate": 0.20}]
+
+        stats = get("/stats?start=2025-09-15&end=2025-09-17&currencies=USD")["stats"][0]
+        assert stats["rate_avg_period"] == pytest.approx(0.19)
+        assert stats["delta_vs_period_pct"] == pytest.approx((0.20 - 0.19) / 0.19 * 100)
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get("/history?currency=XXX")
+        assert error.value.code == 404
+
+        _write_gold("2025-09-18", 0.21, 0.17)
+        server.index.refresh()
+        assert get("/latest")["rates"]["EUR"]["date"] == "2025-09-18"
+        assert server.index.loader.files_read == 4
+    finally:
+        server.shutdown()
+        server.server_close()
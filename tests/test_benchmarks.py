@@ -0,0 +1,22 @@
+from benchmarks.run import compare, run_benchmarks
+
+
+def test_benchmarks_run_on_small_synthetic_history(tmp_path):
+    """
+    Testa se a suite de benchmarks gera um histórico sintético pequeno, mede
+    todos os casos e deteta regressões face à baseline.
+    """
+    results = run_benchmarks(years=0.1, currencies=8, repeat=1, workdir=str(tmp_path / "bench"))
+
+    assert set(results) == {
+        "transform_to_silver", "save_to_gold", "load_gold_data_cold", "load_gold_data_warm", "shared_history_open",
+        "period_metrics_build", "period_metrics_window", "analyze_period", "history_context_build", "gerar_prompt",
+    }
+    assert all(result["median_s"] > 0 for result in results.values())
+    assert (tmp_path / "bench" / "gold" / "history").exists()
+
+    baseline = {case: result["median_s"] for case, result in results.items()}
+    baseline["gerar_prompt"] = results["gerar_prompt"]["median_s"] / 10
+    assert [case for case, *_ in compare(results, baseline, min_delta=0)] == ["gerar_prompt"]
+    # Abaixo da diferença mínima, um rácio alto é tratado como ruído
+    assert compare(results, baseline, min_delta=results["gerar_prompt"]["median_s"]) == []
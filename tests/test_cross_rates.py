@@ -0,0 +1,55 @@
+import os
+import pytest
+import pandas as pd
+from src.cross_rates import cross_rates, load_cross_matrix
+from src.load import save_to_gold
+from src.raw_store import write_raw_record
+from src.transformation import transform_to_silver
+
+
+def _write_day(date, usd, eur):
+    data = {"base_code": "BRL", "conversion_rates": {"BRL": 1, "USD": usd, "EUR": eur, "JPY": 25.5}}
+    write_raw_record(data, os.path.join("raw", f"{date}.arrow"), date)
+
+
+def test_cross_rates_derives_any_pair_from_raw(tmp_path, monkeypatch):
+    """
+    Testa se as cotações face a outra moeda base são derivadas dos vetores
+    BRL guardados, incluindo a própria moeda base original.
+    """
+    monkeypatch.chdir(tmp_path)
+    _write_day("2025-09-17", 0.20, 0.18)
+    _write_day("2025-09-18", 0.25, 0.20)
+
+    df = cross_rates("USD", ["EUR", "BRL"], start="2025-09-18")
+    assert list(df.columns) == ["date", "base_currency", "currency", "rate"]
+    assert df["date"].tolist() == [pd.Timestamp("2025-09-18")] * 2
+    assert df["currency"].tolist() == ["EUR", "BRL"]
+    assert df["rate"].tolist() == pytest.approx([0.8, 4.0])
+
+    everything = cross_rates("EUR")
+    assert set(everything["currency"]) == {"BRL", "JPY", "USD"}
+    assert len(everything) == 6
+
+    with pytest.raises(ValueError):
+        cross_rates("XYZ", ["USD"])
+
+
+def test_save_to_gold_writes_cross_matrix_when_enabled(tmp_path, monkeypatch):
+    """
+    Testa se, com `cross_rates.enabled`, a gold inclui a matriz de taxas
+    cruzadas do dia entre a moeda base e as moedas alvo.
+    """
+    monkeypatch.chdir(tmp_path)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR]\ncross_rates:\n  enabled: true\n")
+    _write_day("2025-09-17", 0.20, 0.18)
+    transform_to_silver("2025-09-17")
+    save_to_gold("2025-09-17", update_history=False)
+
+    matrix = load_cross_matrix("2025-09-17")
+    assert list(matrix.index) == ["BRL", "USD", "EUR"]
+    assert list(matrix.columns) == ["BRL", "USD", "EUR"]
+    assert matrix.loc["USD", "EUR"] == pytest.approx(0.9)
+    assert matrix.loc["EUR", "BRL"] == pytest.approx(1 / 0.18)
+    assert matrix.loc["USD", "USD"] == pytest.approx(1.0)
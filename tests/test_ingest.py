@@ -41,6 +41,7 @@ def test_ingest_creates_raw_file(monkeypatch, tmp_path):
         with open(output_path, 'r') as f:
             saved_data = json.load(f)
         assert saved_data == mock_response_data
+        assert os.path.exists(os.path.join("raw", f"{date}.arrow"))
 
 
 def test_fetch_exchange_rates_api_error(monkeypatch, tmp_path):
@@ -61,3 +62,71 @@ def test_fetch_exchange_rates_api_error(monkeypatch, tmp_path):
         with pytest.raises(requests.exceptions.RequestException):
             fetch_exchange_rates("2025-09-17")
 
+
+def test_fetch_exchange_rates_bulk_against_stub_server(monkeypatch, tmp_path):
+    """
+    Testa a ingestão concorrente contra um servidor HTTP local: endpoints
+    'latest' e 'history', várias moedas base, repetição após 429 e reutilização
+    das ligações keep-alive.
+    """
+    import threading
+    from datetime import datetime
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from src.ingest import fetch_exchange_rates_bulk
+
+    requests_seen = []
+    client_ports = set()
+    throttled = set()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            requests_seen.append(self.path)
+            client_ports.add(self.client_address[1])
+            if self.path not in throttled:
+                throttled.add(self.path)
+                self._reply(429, {"result": "error"}, {"Retry-After": "0"})
+                return
+            base = self.path.split("/")[4]
+            self._reply(200, {"result": "success", "base_code": base, "conversion_rates": {"USD": 0.19}})
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("EXCHANGE_API_KEY", "fake_api_key_for_testing")
+        monkeypatch.setenv("API_URL", f"http://127.0.0.1:{server.server_address[1]}/v6")
+        monkeypatch.setenv("BASE_CURRENCY", "BRL")
+
+        today = datetime.today().strftime("%Y-%m-%d")
+        dates = ["2025-09-17", "2025-09-18", today]
+        results = fetch_exchange_rates_bulk(dates, bases=["USD"], max_workers=2, backoff=0)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert all(results.values())
+    assert results[("BRL", "2025-09-17")] == os.path.join("raw", "2025-09-17.json")
+    assert results[("USD", "2025-09-17")] == os.path.join("raw", "2025-09-17_USD.json")
+    with open(results[("USD", "2025-09-18")]) as f:
+        assert json.load(f)["base_code"] == "USD"
+
+    assert "/v6/fake_api_key_for_testing/history/BRL/2025/9/17" in requests_seen
+    assert "/v6/fake_api_key_for_testing/latest/USD" in requests_seen
+    # 6 pares, cada um com um 429 seguido de sucesso, em no máximo 2 ligações
+    assert len(requests_seen) == 12
+    assert len(client_ports) <= 2
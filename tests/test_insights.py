@@ -0,0 +1,59 @@
+import os
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from src.insights import build_insight_prompt, find_insight, generate_insights, load_insights
+
+
+def test_generate_insights_for_standard_windows(tmp_path, monkeypatch):
+    """
+    Testa se são gerados insights para cada janela padrão e moeda-alvo, com
+    as mesmas métricas e prompts do dashboard, e se podem ser procurados pelo período.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("gold", exist_ok=True)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR]")
+
+    dates = pd.date_range("2025-06-01", "2025-09-17", freq="D")
+    for i, day in enumerate(dates):
+        pd.DataFrame({
+            "base_currency": ["BRL", "BRL", "BRL"],
+            "currency": ["USD", "EUR", "JPY"],
+            "rate": [0.18 + i * 0.0001, 0.16, 27.0],
+        }).to_parquet(f"gold/{day:%Y-%m-%d}.parquet", index=False)
+
+    prompts = []
+
+    def create(**kwargs):
+        prompt = kwargs["messages"][1]["content"]
+        prompts.append(prompt)
+        response = MagicMock()
+        response.choices[0].message.content = f"Ação Recomendada: {prompt.split('A moeda ')[1][:3]}"
+        return response
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = create
+    with patch("src.llm_summary.get_openai_client", return_value=mock_client):
+        path = generate_insights("2025-09-17")
+
+    assert path == os.path.join("reports", "insights", "2025-09-17_BRL_insights.json")
+    # O EUR não varia: o prompt é igual nas três janelas e só é pedido uma vez
+    assert len(prompts) == 4
+
+    insights = load_insights("2025-09-17", "BRL")
+    assert sorted(insights["windows"]) == ["30", "7", "90"]
+    assert sorted(insights["windows"]["30"]["currencies"]) == ["EUR", "USD"]
+    usd = insights["windows"]["30"]["currencies"]["USD"]
+    avg_volatility = insights["windows"]["30"]["avg_volatility"]
+    assert build_insight_prompt("USD", usd["delta_pct"], usd["volatility"], avg_volatility) in prompts
+
+    assert find_insight(insights, "2025-08-18", "2025-09-17", "USD") == "Ação Recomendada: USD"
+    assert find_insight(insights, "2025-06-19", "2025-09-17", "EUR") == "Ação Recomendada: EUR"
+    assert find_insight(insights, "2025-08-20", "2025-09-17", "USD") is None
+    assert find_insight(insights, "2025-08-17", "2025-09-16", "USD") is None
+
+    # Com o prompt do dashboard, só serve se a volatilidade média for a mesma
+    prompt = build_insight_prompt("USD", usd["delta_pct"], usd["volatility"], avg_volatility)
+    assert find_insight(insights, "2025-08-18", "2025-09-17", "USD", prompt) == "Ação Recomendada: USD"
+    only_usd = build_insight_prompt("USD", usd["delta_pct"], usd["volatility"], usd["volatility"])
+    assert find_insight(insights, "2025-08-18", "2025-09-17", "USD", only_usd) is None
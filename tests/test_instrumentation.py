@@ -0,0 +1,58 @@
+import os
+import json
+import pytest
+from src.instrumentation import count, run_metrics, stage, timed
+from src.transformation import transform_to_silver
+
+
+def test_run_metrics_records_stages_counters_and_prometheus(tmp_path, monkeypatch):
+    """
+    Testa se a execução regista a duração das etapas, os contadores das
+    camadas e os tempos acumulados, e se exporta o JSON e o textfile do Prometheus.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR]")
+    with open("raw/2025-09-17.json", "w") as f:
+        json.dump({"base_code": "BRL", "conversion_rates": {"USD": 0.2, "EUR": 0.18, "JPY": 25.5}}, f)
+
+    with run_metrics("silver", "2025-09-17", prometheus_textfile="textfile/pipeline.prom") as metrics:
+        with stage("silver"):
+            transform_to_silver("2025-09-17")
+        with timed("api_wait_seconds"):
+            pass
+
+    record_path = os.path.join("metrics", os.listdir("metrics")[0])
+    with open(record_path) as f:
+        record = json.load(f)
+    assert record["status"] == "ok"
+    assert record["stages"]["silver"]["status"] == "ok"
+    assert record["counters"]["silver_rows_written"] == 2
+    assert record["counters"]["silver_bytes_written"] == os.path.getsize("silver/2025-09-17.parquet")
+    assert "api_wait_seconds" in record["timers"]
+
+    with open("textfile/pipeline.prom") as f:
+        textfile = f.read()
+    assert 'cambio_pipeline_stage_duration_seconds{command="silver",stage="silver"}' in textfile
+    assert 'cambio_pipeline_silver_rows_written{command="silver"} 2' in textfile
+    assert 'cambio_pipeline_run_success{command="silver"} 1' in textfile
+
+    # Fora de uma execução ativa, os contadores não fazem nada
+    count("silver_rows_written", 10)
+    assert metrics.counters["silver_rows_written"] == 2
+
+
+def test_run_metrics_marks_failed_runs(tmp_path):
+    """
+    Testa se uma execução interrompida por erro fica registada como falhada.
+    """
+    with pytest.raises(RuntimeError):
+        with run_metrics("gold", "2025-09-17", metrics_dir=str(tmp_path), prometheus_textfile=""):
+            with stage("gold"):
+                raise RuntimeError("falha")
+
+    with open(tmp_path / os.listdir(tmp_path)[0]) as f:
+        record = json.load(f)
+    assert record["status"] == "failed"
+    assert record["stages"]["gold"]["status"] == "failed"
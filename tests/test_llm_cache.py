@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.llm_cache import LLMCache, cache_key
+
+
+def _fake_client(content):
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices[0].message.content = content
+    return client
+
+
+def test_completion_is_served_from_disk_cache(tmp_path):
+    """
+    Testa se um prompt repetido é servido da cache, mesmo por outra instância
+    (como após um reinício), e se a temperatura faz parte da chave.
+    """
+    client = _fake_client(" Resposta ")
+    cache = LLMCache(str(tmp_path / "cache"))
+
+    assert cache.completion(client, "gpt-4o-mini", "sistema", "prompt") == "Resposta"
+    assert cache.completion(client, "gpt-4o-mini", "sistema", "prompt") == "Resposta"
+    assert client.chat.completions.create.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    restarted = LLMCache(str(tmp_path / "cache"))
+    assert restarted.completion(client, "gpt-4o-mini", "sistema", "prompt") == "Resposta"
+    assert client.chat.completions.create.call_count == 1
+
+    restarted.completion(client, "gpt-4o-mini", "sistema", "prompt", temperature=0.5)
+    assert client.chat.completions.create.call_count == 2
+    assert cache_key("m", "s", "p", 0.5) != cache_key("m", "s", "p", None)
+
+
+def test_eviction_by_age_and_size(tmp_path):
+    """
+    Testa se entradas expiradas deixam de ser servidas e se, acima do limite
+    de tamanho, as entradas usadas há mais tempo são removidas primeiro.
+    """
+    cache = LLMCache(str(tmp_path / "cache"), max_size_mb=None, max_age_days=1)
+    cache.set("aa01", "antiga")
+    old = time.time() - 2 * 86400
+    os.utime(cache._path("aa01"), (old, old))
+    assert cache.get("aa01") is None
+    assert not os.path.exists(cache._path("aa01"))
+
+    cache = LLMCache(str(tmp_path / "small"), max_size_mb=400 / (1024 * 1024), max_age_days=None)
+    for i, key in enumerate(["bb01", "bb02", "bb03"]):
+        cache.set(key, "x" * 50)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.get("bb01")
+    cache.set("bb04", "x" * 50)
+
+    assert cache.get("bb02") is None
+    assert cache.get("bb01") == "x" * 50
+    assert cache.stats()["entries"] == 3
+
+
+def test_stream_completion_in_background_caches_full_response(tmp_path):
+    """
+    Testa se os fragmentos chegam pela ordem através da thread em segundo
+    plano, se a resposta completa é guardada e se, depois, é servida de uma vez.
+    """
+    from src.llm_cache import stream_in_background
+
+    def chunk(text):
+        item = MagicMock()
+        item.choices[0].delta.content = text
+        return item
+
+    client = MagicMock()
+    client.chat.completions.create.return_value = iter([chunk("Ação "), chunk(None), chunk("Recomendada")])
+    cache = LLMCache(str(tmp_path / "cache"))
+
+    parts = list(stream_in_background(cache.stream_completion(client, "m", "s", "p", temperature=0.5)))
+    assert parts == ["Ação ", "Recomendada"]
+    assert client.chat.completions.create.call_args.kwargs["stream"] is True
+
+    assert list(cache.stream_completion(client, "m", "s", "p", temperature=0.5)) == ["Ação Recomendada"]
+    assert client.chat.completions.create.call_count == 1
+
+    client.chat.completions.create.side_effect = RuntimeError("falha")
+    with pytest.raises(RuntimeError, match="falha"):
+        list(stream_in_background(cache.stream_completion(client, "m", "s", "outro")))
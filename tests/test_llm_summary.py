@@ -19,11 +19,9 @@ def test_gerar_resumo_llm_success(tmp_path, monkeypatch):
     mock_response = MagicMock()
     mock_response.choices[0].message.content = "Resumo simulado da OpenAI"
     
-    with patch('src.llm_summary.OpenAI') as mock_openai:
-        mock_client = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_response
-        mock_openai.return_value = mock_client
-
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = mock_response
+    with patch('src.llm_summary.get_openai_client', return_value=mock_client):
         resumo = gerar_resumo_llm(date="2025-09-17")
 
         mock_client.chat.completions.create.assert_called_once()
@@ -49,13 +47,96 @@ def test_gerar_resumo_llm_is_idempotent(tmp_path, monkeypatch, caplog):
     with open(report_path, "w") as f:
         f.write("Já existe.")
 
-    with patch('src.llm_summary.OpenAI') as mock_openai:
-        mock_client = MagicMock()
-        mock_openai.return_value = mock_client
-
+    mock_client = MagicMock()
+    with patch('src.llm_summary.get_openai_client', return_value=mock_client):
         gerar_resumo_llm(date=date_str)
 
         mock_client.chat.completions.create.assert_not_called()
 
 
 
+
+def test_gerar_resumos_llm_against_fake_server(tmp_path, monkeypatch):
+    """
+    Testa a geração em lote contra um servidor local compatível com a API de
+    chat completions: datas com relatório são ignoradas, os pedidos correm em
+    simultâneo até ao limite de workers e cada relatório é gravado.
+    """
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from src.llm_summary import gerar_resumos_llm
+
+    state = {"in_flight": 0, "max_in_flight": 0, "calls": 0}
+    lock = threading.Lock()
+
+    class FakeChatHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["calls"] += 1
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(0.1)
+            with lock:
+                state["in_flight"] -= 1
+            date = payload["messages"][1]["content"].split("na data ")[1][:10]
+            body = json.dumps({
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": payload["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"Resumo de {date}"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        os.makedirs("gold", exist_ok=True)
+        os.makedirs("reports", exist_ok=True)
+
+        dates = [f"2025-09-{day:02d}" for day in range(10, 16)]
+        for date_str in dates:
+            pd.DataFrame({"currency": ["USD"], "rate": [0.2], "daily_change_pct": [0.1]}).to_parquet(f"gold/{date_str}.parquet")
+        with open("reports/2025-09-10_BRL_summary.txt", "w") as f:
+            f.write("Já existe.")
+
+        results = gerar_resumos_llm(dates, max_workers=3)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert sorted(results) == dates[1:]
+    assert state["calls"] == 5
+    assert 1 < state["max_in_flight"] <= 3
+    with open("reports/2025-09-15_BRL_summary.txt", encoding="utf-8") as f:
+        assert f.read() == "Resumo de 2025-09-15"
+    with open("reports/2025-09-10_BRL_summary.txt", encoding="utf-8") as f:
+        assert f.read() == "Já existe."
+
+
+def test_rate_limiter_blocks_when_window_is_full():
+    """
+    Testa se o limitador bloqueia quando o limite de pedidos da janela é atingido.
+    """
+    import time
+    from src.llm_summary import RateLimiter
+
+    limiter = RateLimiter(requests_per_minute=2, period=0.2)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.15
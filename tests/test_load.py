@@ -1,7 +1,7 @@
 import pandas as pd
 import os
 import pytest
-from src.load import save_to_gold
+from src.load import save_to_gold, load_gold_history, rebuild_gold_history, IncrementalGoldLoader
 from datetime import datetime, timedelta
 
 def test_save_to_gold_calculates_daily_change(tmp_path, monkeypatch):
@@ -86,3 +86,113 @@ def test_save_to_gold_no_silver_file(tmp_path, monkeypatch):
 
     assert "Arquivo silver não encontrado" in str(excinfo.value)
 
+
+def test_save_to_gold_appends_to_history(tmp_path, monkeypatch):
+    """
+    Testa se save_to_gold mantém o histórico consolidado particionado por
+    ano/mês e se a leitura filtrada por período e moeda devolve apenas esses dados.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("silver", exist_ok=True)
+
+    for date_str, usd in [("2025-09-30", 5.0), ("2025-10-01", 5.5), ("2025-10-02", 5.4)]:
+        pd.DataFrame({"currency": ["USD", "EUR"], "rate": [usd, 6.0]}).to_parquet(f"silver/{date_str}.parquet")
+        save_to_gold(date=date_str)
+
+    assert os.path.exists("gold/history/year=2025/month=09/part-0.parquet")
+    assert os.path.exists("gold/history/year=2025/month=10/part-0.parquet")
+
+    # Reprocessar um dia substitui as suas linhas em vez de as duplicar
+    save_to_gold(date="2025-10-01")
+    assert len(load_gold_history()) == 6
+
+    df = load_gold_history(start="2025-10-01", end="2025-10-02", currencies=["USD"])
+    assert df["rate"].tolist() == [5.5, 5.4]
+    assert pytest.approx(df["daily_change_pct"].iloc[0]) == 10.0
+
+    # Reconstruir depois de apagar os dias de setembro remove a partição do mês
+    os.remove("gold/2025-09-30.parquet")
+    rebuild_gold_history()
+    assert not os.path.exists("gold/history/year=2025/month=09")
+    assert sorted(os.listdir("gold/history")) == ["year=2025"]
+    assert len(load_gold_history()) == 4
+
+
+def test_incremental_gold_loader_reads_only_changed_partitions(tmp_path):
+    """
+    Testa se o carregador incremental relê apenas as partições novas ou alteradas.
+    """
+    gold_dir = tmp_path / "gold"
+    gold_dir.mkdir()
+    for date_str in ["2025-09-17", "2025-09-18"]:
+        pd.DataFrame({"currency": ["USD"], "rate": [5.0]}).to_parquet(gold_dir / f"{date_str}.parquet")
+
+    loader = IncrementalGoldLoader(gold_dir=str(gold_dir))
+    df = loader.load()
+    assert len(df) == 2
+    assert loader.files_read == 2
+
+    # Sem alterações, nenhuma leitura adicional
+    loader.load()
+    assert loader.files_read == 2
+
+    # Um novo dia custa exatamente uma leitura
+    pd.DataFrame({"currency": ["USD"], "rate": [5.2]}).to_parquet(gold_dir / "2025-09-19.parquet")
+    df = loader.load()
+    assert loader.files_read == 3
+    assert df["rate"].tolist() == [5.0, 5.0, 5.2]
+    assert str(df["date"].iloc[-1].date()) == "2025-09-19"
+
+
+def test_save_to_gold_uses_latest_prior_observation_and_windows(tmp_path, monkeypatch):
+    """
+    Testa se, sem silver do dia anterior, a variação diária usa a observação
+    anterior mais recente, e se as colunas das janelas configuradas são calculadas.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("silver", exist_ok=True)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD]\ngold_windows: [7]")
+
+    for date_str, usd in [("2025-09-01", 4.0), ("2025-09-08", 5.0), ("2025-09-12", 5.2)]:
+        pd.DataFrame({"currency": ["USD"], "rate": [usd]}).to_parquet(f"silver/{date_str}.parquet")
+
+    # Sem silver de 2025-09-13 (falha da API): a referência passa a ser 2025-09-12
+    pd.DataFrame({"currency": ["USD"], "rate": [5.5]}).to_parquet("silver/2025-09-14.parquet")
+    save_to_gold(date="2025-09-14")
+
+    df = pd.read_parquet("gold/2025-09-14.parquet")
+    assert pytest.approx(df["daily_change_pct"].iloc[0]) == (5.5 - 5.2) / 5.2 * 100
+    # Referência de 7 dias: última observação até 2025-09-07, ou seja, 2025-09-01
+    assert pytest.approx(df["change_7d_pct"].iloc[0]) == (5.5 - 4.0) / 4.0 * 100
+    # Volatilidade dos últimos 7 dias: 2025-09-08, 2025-09-12 e 2025-09-14
+    assert pytest.approx(df["volatility_7d"].iloc[0]) == pd.Series([5.0, 5.2, 5.5]).std()
+    assert "change_30d_pct" not in df.columns
+
+
+def test_save_to_gold_reads_prior_rates_in_one_scan(tmp_path, monkeypatch):
+    """
+    Testa se a janela de cotações anteriores vem do histórico consolidado da
+    silver, sem abrir os ficheiros diários, e se um dia em falta no histórico
+    o faz reconstruir.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("silver", exist_ok=True)
+    for date_str, usd in [("2025-09-28", 5.0), ("2025-09-29", 5.2), ("2025-09-30", 5.5)]:
+        pd.DataFrame({"currency": ["USD", "EUR"], "rate": [usd, 6.0]}).to_parquet(f"silver/{date_str}.parquet")
+    save_to_gold(date="2025-09-30")
+    assert os.path.exists("silver/history/year=2025/month=09/part-0.parquet")
+
+    opened = []
+    read_parquet = pd.read_parquet
+    monkeypatch.setattr(pd, "read_parquet", lambda path, *a, **k: opened.append(path) or read_parquet(path, *a, **k))
+    save_to_gold(date="2025-09-30", update_history=False)
+    assert [p for p in opened if str(p).startswith("silver")] == [os.path.join("silver", "2025-09-30.parquet")]
+
+    # Silver gravada sem passar pelo histórico: o dia em falta força a reconstrução
+    for date_str, usd in [("2025-10-01", 6.0), ("2025-10-02", 6.6)]:
+        pd.DataFrame({"currency": ["USD", "EUR"], "rate": [usd, 6.0]}).to_parquet(f"silver/{date_str}.parquet")
+    save_to_gold(date="2025-10-02", update_history=False)
+    assert os.path.exists("silver/history/year=2025/month=10/part-0.parquet")
+    df = pd.read_parquet("gold/2025-10-02.parquet")
+    assert pytest.approx(df[df["currency"] == "USD"]["daily_change_pct"].iloc[0]) == 10.0
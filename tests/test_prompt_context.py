@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.prompt_context import HistoryContext
+from src.llm_summary import gerar_prompt
+
+
+def _history():
+    dates = pd.date_range("2025-06-01", "2025-09-17", freq="D")
+    usd = 0.18 + 0.0001 * np.arange(len(dates))
+    eur = 0.16 + 0.002 * np.sin(np.arange(len(dates)))
+    df = pd.DataFrame({
+        "date": np.concatenate([dates, dates]),
+        "currency": ["USD"] * len(dates) + ["EUR"] * len(dates),
+        "rate": np.concatenate([usd, eur]),
+    })
+    # Falha da API num dia: não deve interromper a sequência do USD
+    return df[~((df["currency"] == "USD") & (df["date"] == "2025-09-10"))]
+
+
+def test_history_context_trends_streaks_and_extremes():
+    """
+    Testa as tendências (com falhas de dados), as sequências, as máximas de
+    90 dias e o regime de volatilidade calculados sobre todo o histórico.
+    """
+    context = HistoryContext(_history()).for_date("2025-09-17").set_index("currency")
+
+    usd = context.loc["USD"]
+    # 7 dias antes (10/09) não há cotação: usa-se a de 09/09
+    assert usd["trend_7d_pct"] == pytest.approx((0.18 + 0.0108) / (0.18 + 0.0100) * 100 - 100)
+    assert usd["streak_days"] == 107
+    assert usd["is_high_90d"] and not usd["is_low_90d"]
+
+    eur = context.loc["EUR"]
+    signs = np.sign(np.diff(np.sin(np.arange(109))))
+    trailing = len(signs) - np.flatnonzero(signs != signs[-1])[-1] - 1
+    assert eur["streak_days"] == trailing * signs[-1]
+    assert eur["volatility_regime"] == "normal"
+
+    assert HistoryContext(_history()).for_date("2025-05-01").empty
+
+
+def test_gerar_prompt_includes_history_context():
+    """
+    Testa se o prompt inclui o contexto histórico das moedas em destaque e
+    se, sem contexto, fica inalterado.
+    """
+    df = pd.DataFrame({"currency": ["USD", "EUR"], "rate": [0.19, 0.16], "daily_change_pct": [0.5, -0.1]})
+    context = HistoryContext(_history()).for_date("2025-09-17")
+
+    prompt = gerar_prompt(df, "2025-09-17", top_n=1, context=context)
+    assert "**Contexto Histórico:**\n- USD: 7 dias +" in prompt
+    assert "máxima de 90 dias" in prompt
+    assert "- EUR:" not in prompt.split("**Contexto Histórico:**")[1]
+    assert "Contexto Histórico" not in gerar_prompt(df, "2025-09-17", top_n=1)
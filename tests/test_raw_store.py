@@ -0,0 +1,52 @@
+import os
+import json
+import pandas as pd
+from src.raw_store import convert_raw_directory, load_raw_history, read_raw_record, write_raw_record
+
+
+def _raw_data(usd, eur):
+    return {
+        "base_code": "BRL",
+        "conversion_rates": {"BRL": 1, "USD": usd, "EUR": eur, "JPY": 25.5},
+        "time_last_update_unix": 1631836800
+    }
+
+
+def test_write_and_read_raw_record(tmp_path):
+    """
+    Testa se o registo colunar preserva as cotações e permite ler só as moedas pedidas.
+    """
+    path = str(tmp_path / "raw" / "2025-09-17.arrow")
+    write_raw_record(_raw_data(0.2, 0.18), path, "2025-09-17")
+
+    table, metadata = read_raw_record(path)
+    assert table.num_rows == 4
+    assert str(table.schema.field("currency").type) == "dictionary<values=string, indices=int16, ordered=0>"
+    assert metadata == {"date": "2025-09-17", "base_currency": "BRL", "timestamp": "1631836800"}
+
+    table, _ = read_raw_record(path, currencies=["USD"])
+    assert table.column("rate").to_pylist() == [0.2]
+
+
+def test_convert_raw_directory_and_load_history(tmp_path, monkeypatch):
+    """
+    Testa a conversão única dos JSON existentes e a leitura do histórico
+    completo ou filtrado por moeda e período.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    for date_str, usd in [("2025-09-17", 0.20), ("2025-09-18", 0.21), ("2025-09-19", 0.22)]:
+        with open(f"raw/{date_str}.json", "w") as f:
+            json.dump(_raw_data(usd, 0.18), f, indent=2)
+
+    assert convert_raw_directory() == 3
+    assert convert_raw_directory() == 0
+
+    df = load_raw_history()
+    assert len(df) == 12
+    assert isinstance(df["currency"].dtype, pd.CategoricalDtype)
+    assert df["timestamp"].iloc[0] == 1631836800
+
+    df = load_raw_history(currencies=["USD"], start="2025-09-18")
+    assert df["rate"].tolist() == [0.21, 0.22]
+    assert df["date"].tolist() == [pd.Timestamp("2025-09-18"), pd.Timestamp("2025-09-19")]
@@ -0,0 +1,38 @@
+import os
+from src.llm_summary import _salvar_relatorio
+from src.report_archive import match_expression, search_reports, sync_archive
+
+
+def test_search_reports_by_terms_currency_and_period(tmp_path, monkeypatch):
+    """
+    Testa a pesquisa de texto integral (com e sem acentos, todos ou algum
+    dos termos), o filtro por moeda e período, e a sincronização incremental.
+    """
+    monkeypatch.chdir(tmp_path)
+    _salvar_relatorio("reports/2025-09-17_BRL_summary.txt", "O Fed manteve os juros. O USD subiu.")
+    _salvar_relatorio("reports/2025-09-18_BRL_summary.txt", "O turismo no Líbano sofre com a LBP.")
+    _salvar_relatorio("reports/2025-09-19_BRL_summary.txt", "Juros altos favorecem o real face ao EUR.")
+
+    results = search_reports("juros")
+    assert [r["date"] for r in results] == ["2025-09-19", "2025-09-17"]
+    assert "**juros**" in results[1]["snippet"]
+
+    assert [r["date"] for r in search_reports("Fed turismo")] == []
+    assert [r["date"] for r in search_reports("Fed turismo", any_terms=True)] == ["2025-09-18", "2025-09-17"]
+    assert [r["date"] for r in search_reports("libano")] == ["2025-09-18"]
+    assert [r["date"] for r in search_reports("jur*", currency="EUR")] == ["2025-09-19"]
+    assert [r["date"] for r in search_reports(start="2025-09-18", end="2025-09-18")] == ["2025-09-18"]
+
+    assert sync_archive() == 0
+    _salvar_relatorio("reports/2025-09-20_BRL_summary.txt", "Sem novidades no Fed.")
+    assert sync_archive() == 1
+    assert len(search_reports("fed")) == 2
+    assert os.path.exists("reports/archive.sqlite")
+
+
+def test_match_expression_quotes_user_input():
+    """
+    Testa se o texto pesquisado não é interpretado como sintaxe FTS5.
+    """
+    assert match_expression('Fed/juros "x" -y') == '"Fed" "juros" """x""" "-y"'
+    assert match_expression("jur* usd", any_terms=True) == '"jur"* OR "usd"'
@@ -0,0 +1,52 @@
+import os
+import json
+from src.report_index import load_report_index, read_report, update_report_index
+from src.llm_summary import _salvar_relatorio
+
+
+def test_report_index_bootstraps_and_updates_incrementally(tmp_path, monkeypatch):
+    """
+    Testa se o índice é criado a partir dos relatórios existentes e
+    atualizado a cada relatório gravado, sem voltar a percorrer o diretório.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("reports", exist_ok=True)
+    with open("reports/2025-09-17_BRL_summary.txt", "w", encoding="utf-8") as f:
+        f.write("Resumo antigo")
+
+    _salvar_relatorio("reports/2025-09-18_BRL_summary.txt", "Resumo novo")
+
+    entries = load_report_index()
+    assert [e["date"] for e in entries] == ["2025-09-18", "2025-09-17"]
+    assert entries[0] == {
+        "date": "2025-09-18",
+        "base_currency": "BRL",
+        "path": os.path.join("reports", "2025-09-18_BRL_summary.txt"),
+        "size": len("Resumo novo"),
+        "sha256": entries[0]["sha256"],
+    }
+
+    # Ficheiros fora do índice já não são descobertos por glob
+    with open("reports/2025-09-19_BRL_summary.txt", "w", encoding="utf-8") as f:
+        f.write("Sem índice")
+    assert len(load_report_index()) == 2
+
+    update_report_index("reports/2025-09-19_BRL_summary.txt")
+    with open("reports/index.json", encoding="utf-8") as f:
+        assert len(json.load(f)["reports"]) == 3
+
+
+def test_read_report_is_keyed_by_hash(tmp_path):
+    """
+    Testa se o corpo do relatório é servido da cache enquanto o hash do
+    índice não muda, e relido quando muda.
+    """
+    path = str(tmp_path / "2025-09-17_BRL_summary.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("v1")
+    assert read_report(path, "hash-1") == "v1"
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("v2")
+    assert read_report(path, "hash-1") == "v1"
+    assert read_report(path, "hash-2") == "v2"
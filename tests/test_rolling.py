@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.rolling import RollingMetrics
+
+
+def _history():
+    dates = pd.date_range("2025-09-01", periods=40, freq="D")
+    rng = np.random.default_rng(0)
+    rows = []
+    for currency, level in [("USD", 0.19), ("EUR", 0.16), ("LBP", 16800.0)]:
+        for d in dates:
+            rows.append({"base_currency": "BRL", "currency": currency, "date": d,
+                         "rate": level * (1 + rng.normal(0, 0.01))})
+    df = pd.DataFrame(rows)
+    # Lacuna: EUR sem cotação nos últimos dois dias
+    return df[~((df["currency"] == "EUR") & (df["date"] >= "2025-10-09"))]
+
+
+def test_window_matches_groupby():
+    """
+    Testa se média, volatilidade e delta vs. média coincidem com o cálculo
+    direto em pandas sobre o período filtrado.
+    """
+    df = _history()
+    metrics = RollingMetrics(df)
+
+    start, end = pd.Timestamp("2025-09-10"), pd.Timestamp("2025-10-05")
+    result = metrics.window(start, end, ["USD", "LBP"]).set_index("currency")
+
+    period = df[(df["date"] >= start) & (df["date"] <= end) & df["currency"].isin(["USD", "LBP"])]
+    expected = period.groupby("currency")["rate"].agg(["mean", "std"])
+    latest = period[period["date"] == end].set_index("currency")["rate"]
+
+    assert sorted(result.index) == ["LBP", "USD"]
+    assert (result["date"] == end).all()
+    for currency in ["USD", "LBP"]:
+        assert pytest.approx(result.loc[currency, "rate_avg_period"], rel=1e-9) == expected.loc[currency, "mean"]
+        assert pytest.approx(result.loc[currency, "rate_std_period"], rel=1e-6) == expected.loc[currency, "std"]
+        mean = expected.loc[currency, "mean"]
+        assert pytest.approx(result.loc[currency, "delta_vs_period_pct"]) == (latest[currency] - mean) / mean * 100
+
+
+def test_window_uses_last_day_with_data():
+    """
+    Testa se apenas as moedas cotadas no último dia do período são devolvidas
+    e se um período sem dados devolve um DataFrame vazio.
+    """
+    metrics = RollingMetrics(_history())
+
+    result = metrics.window("2025-10-01", "2025-10-10", ["USD", "EUR"])
+    assert result["currency"].tolist() == ["USD"]
+    assert result["date"].iloc[0] == pd.Timestamp("2025-10-10")
+
+    assert metrics.window("2024-01-01", "2024-02-01").empty
+    assert metrics.window("2025-09-10", "2025-10-05", ["XYZ"]).empty
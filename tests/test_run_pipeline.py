@@ -0,0 +1,152 @@
+import os
+import json
+import pandas as pd
+import pytest
+import run_pipeline
+from run_pipeline import date_range, read_dates_from, run_backfill, run_gold
+
+
+def _write_raw(date, usd, eur):
+    raw_data = {
+        "base_code": "BRL",
+        "conversion_rates": {"USD": usd, "EUR": eur, "JPY": 25.5},
+        "time_last_update_unix": 1631836800
+    }
+    with open(f"raw/{date}.json", "w") as f:
+        json.dump(raw_data, f)
+
+
+def test_date_range_and_dates_from(tmp_path):
+    """
+    Testa a geração do intervalo de datas e a leitura das datas a partir de um diretório.
+    """
+    assert date_range("2025-09-30", "2025-10-02") == ["2025-09-30", "2025-10-01", "2025-10-02"]
+    with pytest.raises(ValueError):
+        date_range("2025-10-02", "2025-09-30")
+
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    for name in ["2025-09-22.json", "2025-09-21.json", "notas.txt"]:
+        (raw_dir / name).write_text("{}")
+    assert read_dates_from(str(raw_dir)) == ["2025-09-21", "2025-09-22"]
+
+
+def test_run_backfill_builds_gold_for_range(tmp_path, monkeypatch):
+    """
+    Testa se o backfill gera silver, gold e insights para todas as datas com
+    raw disponível, respeitando a dependência da gold em relação à silver do dia anterior.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR]")
+
+    _write_raw("2025-09-17", 0.20, 0.18)
+    _write_raw("2025-09-18", 0.22, 0.18)
+    import src.insights
+    insights = []
+    monkeypatch.setattr(src.insights, "generate_insights", insights.append)
+
+    processed = run_backfill(["2025-09-18", "2025-09-17", "2020-01-01"], workers=2)
+
+    assert processed == ["2025-09-17", "2025-09-18"]
+    assert insights == processed
+    assert not os.path.exists("silver/2020-01-01.parquet")
+    assert os.path.exists("gold/history.arrow")
+
+    df = pd.read_parquet("gold/2025-09-18.parquet")
+    usd_change = df[df["currency"] == "USD"]["daily_change_pct"].iloc[0]
+    assert pytest.approx(usd_change) == 10.0
+
+
+def test_run_gold_reruns_when_an_earlier_silver_changes(tmp_path, monkeypatch):
+    """
+    Testa se a etapa gold é refeita quando uma silver anterior dentro da
+    janela fica mais recente que a gold, e ignorada quando nada mudou.
+    """
+    import src.anomaly
+    import src.load
+    import src.shared_history
+    assert run_pipeline.GOLD_DEFAULT_WINDOWS == src.load.DEFAULT_WINDOWS
+    assert run_pipeline.GOLD_GAP_TOLERANCE_DAYS == src.load.GAP_TOLERANCE_DAYS
+    assert run_pipeline.ANOMALY_DEFAULT_WINDOW_DAYS == src.anomaly.DEFAULT_SETTINGS["window_days"]
+
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    monkeypatch.setattr(src.load, "save_to_gold", calls.append)
+    monkeypatch.setattr(src.shared_history, "build_shared_history", lambda: None)
+    os.makedirs("silver")
+    os.makedirs("gold")
+    for name in ["silver/2025-09-10.parquet", "silver/2025-09-18.parquet", "gold/2025-09-18.parquet", "gold/history.arrow"]:
+        open(name, "w").close()
+    os.utime("silver/2025-09-10.parquet", (1000, 1000))
+    os.utime("silver/2025-09-18.parquet", (1000, 1000))
+    os.utime("gold/2025-09-18.parquet", (2000, 2000))
+
+    run_gold("2025-09-18")
+    assert calls == []
+    os.utime("silver/2025-09-10.parquet", (3000, 3000))
+    run_gold("2025-09-18")
+    assert calls == ["2025-09-18"]
+
+
+def test_idempotent_ingest_runs_without_heavy_imports(tmp_path):
+    """
+    Testa se o comando 'ingest' com o raw já existente termina sem importar
+    pandas, pyarrow, requests, openai ou streamlit.
+    """
+    import subprocess
+    import sys
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.makedirs(tmp_path / "raw")
+    (tmp_path / "raw" / "2025-09-17.json").write_text("{}")
+
+    script = (
+        "import json, runpy, sys\n"
+        "sys.argv = ['run_pipeline.py', 'ingest', '--date', '2025-09-17']\n"
+        f"runpy.run_path({os.path.join(repo_root, 'run_pipeline.py')!r}, run_name='__main__')\n"
+        "heavy = [m for m in ('pandas', 'pyarrow', 'requests', 'openai', 'streamlit') if m in sys.modules]\n"
+        "print(json.dumps({'heavy': heavy}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": repo_root}, check=True,
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert stats["heavy"] == []
+
+
+def test_parallel_backfill_scores_anomalies_like_sequential_run(tmp_path, monkeypatch):
+    """
+    Testa se o backfill com vários processos dá os mesmos scores de anomalia
+    de um processamento sequencial, dia a dia.
+    """
+    import src.insights
+    from src.load import save_to_gold
+
+    monkeypatch.setattr(src.insights, "generate_insights", lambda date: None)
+    dates = date_range("2025-08-01", "2025-09-10")
+    usd = 0.2
+    for directory in ("parallel", "sequential"):
+        os.makedirs(tmp_path / directory / "raw")
+        (tmp_path / directory / "config.yaml").write_text("target_currencies: [USD, EUR]")
+    monkeypatch.chdir(tmp_path / "parallel")
+    for i, date in enumerate(dates):
+        usd *= 1.03 if i == len(dates) - 1 else 1 + 0.002 * ((-1) ** i) * (i % 5)
+        _write_raw(date, usd, 0.18 + 0.0005 * (i % 3))
+
+    processed = run_backfill(dates, workers=4)
+    assert processed == dates
+    parallel_last = pd.read_parquet(f"gold/{dates[-1]}.parquet").set_index("currency")
+
+    monkeypatch.chdir(tmp_path / "sequential")
+    os.symlink(tmp_path / "parallel" / "silver", "silver")
+    for date in dates:
+        save_to_gold(date)
+    sequential_last = pd.read_parquet(f"gold/{dates[-1]}.parquet").set_index("currency")
+
+    assert parallel_last.loc["USD", "is_anomaly"]
+    for column in ("anomaly_zscore", "anomaly_mad_score"):
+        assert parallel_last[column].to_dict() == pytest.approx(sequential_last[column].to_dict(), nan_ok=True)
@@ -0,0 +1,57 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.load import IncrementalGoldLoader
+from src.shared_history import SHARED_HISTORY_PATH, SharedHistory, history_version, is_stale
+
+
+def _write_gold(date, usd, eur):
+    os.makedirs("gold", exist_ok=True)
+    pd.DataFrame({
+        "base_currency": ["BRL", "BRL"], "currency": ["USD", "EUR"],
+        "rate": [usd, eur], "daily_change_pct": [np.nan, 1.5],
+    }).to_parquet(f"gold/{date}.parquet", index=False)
+
+
+def test_shared_history_matches_gold_and_is_read_only(tmp_path, monkeypatch):
+    """
+    Testa se o histórico mapeado em memória tem os mesmos dados da gold,
+    com códigos categóricos, datas datetime64 e vetores só de leitura.
+    """
+    monkeypatch.chdir(tmp_path)
+    _write_gold("2025-09-17", 0.20, 0.18)
+    _write_gold("2025-09-18", 0.21, 0.19)
+
+    history = SharedHistory.open()
+    df = history.frame
+    assert os.path.exists(SHARED_HISTORY_PATH)
+    assert str(df["currency"].dtype) == "category"
+    assert df["date"].dtype == "datetime64[ns]"
+    assert not df["rate"].to_numpy().flags.writeable
+
+    expected = IncrementalGoldLoader().load().sort_values(by=["date", "currency"]).reset_index(drop=True)
+    pd.testing.assert_series_equal(df["rate"], expected["rate"])
+    assert df["currency"].astype(str).tolist() == expected["currency"].astype(str).tolist()
+    assert np.isnan(df["daily_change_pct"]).sum() == 2
+
+
+def test_shared_history_rebuilds_when_gold_changes(tmp_path, monkeypatch):
+    """
+    Testa se o ficheiro partilhado só é reconstruído quando a gold muda, sem
+    deixar temporários, e se a versão aberta antes continua válida.
+    """
+    monkeypatch.chdir(tmp_path)
+    assert history_version() is None
+    _write_gold("2025-09-17", 0.20, 0.18)
+    first = SharedHistory.open()
+    assert not is_stale()
+    assert SharedHistory.open().version == first.version == history_version()
+
+    time.sleep(0.01)
+    _write_gold("2025-09-18", 0.21, 0.19)
+    assert is_stale()
+    assert len(SharedHistory.open().frame) == 4
+    assert len(first.frame) == 2
+    assert history_version() > first.version
+    assert not [f for f in os.listdir("gold") if f.endswith(".tmp")]
@@ -72,3 +72,92 @@ def test_transform_with_malformed_raw_file(tmp_path, monkeypatch):
     with pytest.raises(json.JSONDecodeError):
         transform_to_silver(date="2025-09-17")
 
+
+def test_transform_many_uses_columnar_record(tmp_path, monkeypatch):
+    """
+    Testa a transformação em lote de várias datas, lendo o registo colunar
+    quando existe e o JSON caso contrário, com o mesmo resultado.
+    """
+    from src.raw_store import write_raw_record
+    from src.transformation import transform_many
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    raw_data = {
+        "base_code": "BRL",
+        "conversion_rates": {"USD": 0.2, "EUR": 0.18, "JPY": 25.5, "GBP": 0},
+        "time_last_update_unix": 1631836800
+    }
+    with open("raw/2025-09-17.json", 'w') as f:
+        json.dump(raw_data, f)
+    write_raw_record(raw_data, "raw/2025-09-18.arrow", "2025-09-18")
+
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR, GBP]")
+
+    written = transform_many(["2025-09-17", "2025-09-18"])
+    assert written == [os.path.join("silver", "2025-09-17.parquet"), os.path.join("silver", "2025-09-18.parquet")]
+
+    df_json = pd.read_parquet("silver/2025-09-17.parquet")
+    df_record = pd.read_parquet("silver/2025-09-18.parquet")
+    pd.testing.assert_frame_equal(df_json, df_record)
+    assert df_json["currency"].tolist() == ["USD", "EUR"]
+    assert df_json["timestamp"].tolist() == [1631836800, 1631836800]
+
+
+def test_full_universe_keeps_every_currency(tmp_path, monkeypatch):
+    """
+    Testa se, com `full_universe: true`, a silver guarda todas as moedas da
+    API (exceto a própria moeda base), tanto a partir do JSON como do
+    registo colunar, e se a LLM continua a ver só as moedas-alvo.
+    """
+    from src.raw_store import convert_raw_directory
+    from src.llm_summary import select_llm_currencies
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    raw_data = {
+        "base_code": "BRL",
+        "conversion_rates": {"BRL": 1, "USD": 0.2, "EUR": 0.18, "JPY": 25.5, "XXX": 0},
+        "time_last_update_unix": 1631836800
+    }
+    with open("raw/2025-09-17.json", 'w') as f:
+        json.dump(raw_data, f)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD, EUR]\nfull_universe: true\n")
+
+    transform_to_silver(date="2025-09-17")
+    from_json = pd.read_parquet("silver/2025-09-17.parquet")
+    assert from_json["currency"].tolist() == ["USD", "EUR", "JPY"]
+
+    convert_raw_directory()
+    transform_to_silver(date="2025-09-17")
+    df = pd.read_parquet("silver/2025-09-17.parquet")
+    assert df["currency"].tolist() == ["USD", "EUR", "JPY"]
+    assert df["rate"].dtype == "float64"
+
+    assert select_llm_currencies(df)["currency"].tolist() == ["USD", "EUR"]
+
+
+def test_transform_ignores_record_older_than_json(tmp_path, monkeypatch):
+    """
+    Testa se um JSON buscado de novo depois da conversão prevalece sobre o
+    registo colunar obsoleto, que é regenerado.
+    """
+    from src.raw_store import read_raw_record, write_raw_record
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw", exist_ok=True)
+    with open("config.yaml", "w") as f:
+        f.write("target_currencies: [USD]")
+    old = {"base_code": "BRL", "conversion_rates": {"USD": 0.2}, "time_last_update_unix": 1631836800}
+    new = {"base_code": "BRL", "conversion_rates": {"USD": 0.25}, "time_last_update_unix": 1631840400}
+    write_raw_record(old, "raw/2025-09-17.arrow", "2025-09-17")
+    with open("raw/2025-09-17.json", "w") as f:
+        json.dump(new, f)
+    os.utime("raw/2025-09-17.arrow", (1000, 1000))
+
+    transform_to_silver("2025-09-17")
+    assert pd.read_parquet("silver/2025-09-17.parquet")["rate"].tolist() == [0.25]
+    table, _ = read_raw_record("raw/2025-09-17.arrow")
+    assert table.column("rate").to_pylist() == [0.25]
@@ -0,0 +1,45 @@
+import os
+from src.utils import load_config
+
+
+def test_load_config_is_memoized_and_invalidated(tmp_path, monkeypatch):
+    """
+    Testa se a configuração é reutilizada entre chamadas e relida quando o
+    ficheiro ou as variáveis de ambiente mudam.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("CONFIG_PATH", raising=False)
+    monkeypatch.delenv("API_URL", raising=False)
+    monkeypatch.delenv("BASE_CURRENCY", raising=False)
+    with open("config.yaml", "w") as f:
+        f.write("base_currency: BRL\ntarget_currencies: [USD, EUR]\napi_url: https://fakeapi.com/v6")
+
+    config = load_config()
+    assert config.exists
+    assert config.target_currencies == ("USD", "EUR")
+    assert config.get("api_url") == "https://fakeapi.com/v6"
+    assert load_config() is config
+
+    with open("config.yaml", "w") as f:
+        f.write("base_currency: BRL\ntarget_currencies: [USD, EUR, GBP]")
+    os.utime("config.yaml", ns=(0, 0))
+    config = load_config()
+    assert config.target_currencies == ("USD", "EUR", "GBP")
+    assert config.api_url is None
+
+    monkeypatch.setenv("BASE_CURRENCY", "USD")
+    assert load_config().base_currency == "USD"
+
+
+def test_load_config_without_file(tmp_path, monkeypatch):
+    """
+    Testa os valores por defeito quando o config.yaml não existe.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("CONFIG_PATH", raising=False)
+    monkeypatch.delenv("BASE_CURRENCY", raising=False)
+
+    config = load_config()
+    assert not config.exists
+    assert config.base_currency == "BRL"
+    assert config.target_currencies == ()